@@ -0,0 +1,77 @@
+""" Benchmark of the construction of the mesh cell index.
+
+Compares the former per-cell ``get_point`` loop of ``run_calc`` with
+``CellIndex.from_mesh`` on regular meshes of growing size::
+
+    python benchmarks/bench_cell_index.py
+"""
+from __future__ import division, print_function
+
+import timeit
+
+import numpy as np
+
+from simphony_ui.openfoam_model.mesh_index import CellIndex
+from simphony_ui.tests.test_utils import create_cartesian_mesh
+
+CHANNEL_SIZE = (1.0e-1, 1.0e-2, 2.0e-3)
+
+GRIDS = [
+    (25, 10, 1),
+    (50, 20, 1),
+    (100, 40, 1),
+    (200, 40, 1),
+    (400, 40, 1),
+]
+
+
+def legacy_cell_index(mesh, channel_size, num_grid):
+    """ The cell list construction as formerly done by run_calc """
+    cellmat = {}
+    index = np.zeros(3, dtype=int)
+    gridsize = [
+        channel_size[0] / num_grid[0],
+        channel_size[1] / num_grid[1],
+        channel_size[2] / num_grid[2]
+    ]
+
+    for cell in mesh.iter_cells():
+        lln = [
+            channel_size[0] * 2,
+            channel_size[1] * 2,
+            channel_size[2] * 2]
+        for k in range(8):
+            for i in range(3):
+                if mesh.get_point(
+                        cell.points[k]).coordinates[i] < lln[i]:
+                    lln[i] = mesh.get_point(
+                        cell.points[k]).coordinates[i]
+
+        for i in range(0, 3):
+            index[i] = round(lln[i]/gridsize[i])
+
+        cellmat[index[0], index[1], index[2]] = cell.uid
+
+    return cellmat
+
+
+def best_of(function, repeat=3):
+    return min(timeit.repeat(function, number=1, repeat=repeat))
+
+
+def main():
+    print('{:>10} {:>12} {:>12} {:>10}'.format(
+        'cells', 'legacy (s)', 'index (s)', 'speedup'))
+    for num_grid in GRIDS:
+        mesh = create_cartesian_mesh(CHANNEL_SIZE, num_grid)
+        legacy = best_of(
+            lambda: legacy_cell_index(mesh, CHANNEL_SIZE, num_grid))
+        vectorized = best_of(
+            lambda: CellIndex.from_mesh(mesh, CHANNEL_SIZE, num_grid))
+        print('{:>10} {:>12.4f} {:>12.4f} {:>9.1f}x'.format(
+            int(np.prod(num_grid)), legacy, vectorized,
+            legacy / vectorized))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+""" Benchmark of the creation of the LIGGGHTS datasets, which shifts the
+particles of the data file to a box origin at (0, 0, 0).
+
+Compares the former per-particle shift, with one update_particles call
+per particle of the datasets read by liggghts.read_data_file, with the
+array shift of create_liggghts_datasets, on synthetic data files of
+growing size::
+
+    python benchmarks/bench_create_liggghts_datasets.py
+"""
+from __future__ import division, print_function
+
+import os
+import shutil
+import tempfile
+import timeit
+
+from simphony.engine import liggghts
+
+from simphony_ui.liggghts_model.data_file_reader import load_data_file
+from simphony_ui.liggghts_model.liggghts_model import LiggghtsModel
+from simphony_ui.liggghts_model.liggghts_wrapper_creation import (
+    create_liggghts_datasets)
+
+from liggghts_data import write_liggghts_data_file
+
+PARTICLE_COUNTS = [1000, 10000, 100000]
+
+OFFSET = (1.0e-3, 1.0e-3, 1.0e-3)
+
+
+def shift_one_by_one(particles, offset):
+    for particle in particles.iter_particles():
+        particle.coordinates = (
+            particle.coordinates[0] - offset[0],
+            particle.coordinates[1] - offset[1],
+            particle.coordinates[2] - offset[2])
+        particles.update_particles([particle])
+
+
+def main():
+    temp_dir = tempfile.mkdtemp()
+    try:
+        print('{:>10} {:>16} {:>12} {:>10} {:>14}'.format(
+            'particles', 'per particle (s)', 'array (s)', 'speedup',
+            'datasets (s)'))
+        for count in PARTICLE_COUNTS:
+            path = os.path.join(temp_dir, 'particles_{}.dat'.format(count))
+            write_liggghts_data_file(path, count, count // 10)
+            datasets = liggghts.read_data_file(path)
+            data = load_data_file(path)
+            settings = LiggghtsModel(input_file=path)
+
+            one_by_one = min(timeit.repeat(
+                lambda: [shift_one_by_one(particles, OFFSET)
+                         for particles in datasets],
+                number=1, repeat=3))
+            array = min(timeit.repeat(
+                lambda: data.coordinates - OFFSET, number=1, repeat=3))
+            create = min(timeit.repeat(
+                lambda: create_liggghts_datasets(settings),
+                number=1, repeat=3))
+            print('{:>10} {:>16.4f} {:>12.4f} {:>9.1f}x {:>14.4f}'.format(
+                count, one_by_one, array, one_by_one / array, create))
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == '__main__':
+    main()
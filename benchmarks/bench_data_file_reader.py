@@ -0,0 +1,53 @@
+""" Benchmark of the reading of LIGGGHTS data files.
+
+Compares liggghts.read_data_file with the array parser of
+data_file_reader and with loading its binary sidecar, on synthetic data
+files of growing size::
+
+    python benchmarks/bench_data_file_reader.py
+"""
+from __future__ import division, print_function
+
+import os
+import shutil
+import tempfile
+import timeit
+
+from simphony.engine import liggghts
+
+from simphony_ui.liggghts_model.data_file_reader import (
+    load_data_file, parse_data_file, read_data_file)
+
+from liggghts_data import write_liggghts_data_file
+
+PARTICLE_COUNTS = [1000, 10000, 100000]
+
+
+def main():
+    temp_dir = tempfile.mkdtemp()
+    cache_dir = os.path.join(temp_dir, 'cache')
+    try:
+        print('{:>10} {:>14} {:>10} {:>10} {:>14}'.format(
+            'particles', 'liggghts (s)', 'parse (s)', 'load (s)',
+            'datasets (s)'))
+        for count in PARTICLE_COUNTS:
+            path = os.path.join(temp_dir, 'particles_{}.dat'.format(count))
+            write_liggghts_data_file(path, count, count // 10)
+            load_data_file(path, cache_dir)
+
+            reference = min(timeit.repeat(
+                lambda: liggghts.read_data_file(path), number=1, repeat=3))
+            parse = min(timeit.repeat(
+                lambda: parse_data_file(path), number=1, repeat=3))
+            load = min(timeit.repeat(
+                lambda: load_data_file(path, cache_dir), number=1, repeat=3))
+            datasets = min(timeit.repeat(
+                lambda: read_data_file(path, cache_dir), number=1, repeat=3))
+            print('{:>10} {:>14.4f} {:>10.4f} {:>10.4f} {:>14.4f}'.format(
+                count, reference, parse, load, datasets))
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,30 @@
+""" Benchmark of the import time of the simphony_ui entry modules.
+
+Each module is imported in a fresh interpreter and compared with its
+budget. On Python 3.7 and later, the slowest imported modules are listed
+from ``python -X importtime``::
+
+    python benchmarks/bench_import_time.py
+"""
+from __future__ import division, print_function
+
+from simphony_ui.tests.import_time import IMPORT_BUDGETS, measure_import
+
+NUM_SLOWEST = 10
+
+
+def main():
+    print('{:<40} {:>10} {:>10}  {}'.format(
+        'module', 'time (s)', 'budget (s)', 'heavy modules'))
+    for module, budget in sorted(IMPORT_BUDGETS.items()):
+        elapsed, heavy, modules = measure_import(module)
+        print('{:<40} {:>10.3f} {:>10.3f}  {}'.format(
+            module, elapsed, budget, ', '.join(heavy) or '-'))
+        slowest = sorted(modules, key=lambda item: item[1], reverse=True)
+        for name, self_time, cumulative in slowest[:NUM_SLOWEST]:
+            print('    {:<36} {:>10.3f} {:>10.3f}'.format(
+                name, self_time, cumulative))
+
+
+if __name__ == '__main__':
+    main()
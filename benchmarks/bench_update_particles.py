@@ -0,0 +1,71 @@
+""" Benchmark of the particle updates of a LIGGGHTS dataset.
+
+Compares one update_particles call per particle, as formerly done
+during each coupling iteration, with a single bulk call, for a growing
+number of particles::
+
+    python benchmarks/bench_update_particles.py
+"""
+from __future__ import division, print_function
+
+import os
+import shutil
+import tempfile
+import timeit
+
+from simphony.core.cuba import CUBA
+
+from simphony_ui.liggghts_model.liggghts_model import LiggghtsModel
+from simphony_ui.liggghts_model.liggghts_wrapper_creation import (
+    create_liggghts_wrapper, create_liggghts_datasets)
+
+from liggghts_data import write_liggghts_data_file
+
+PARTICLE_COUNTS = [1000, 10000, 100000]
+
+
+def update_one_by_one(dataset, particles):
+    for particle in particles:
+        dataset.update_particles([particle])
+
+
+def update_in_bulk(dataset, particles):
+    dataset.update_particles(particles)
+
+
+def main():
+    temp_dir = tempfile.mkdtemp()
+    try:
+        print('{:>10} {:>16} {:>12} {:>10}'.format(
+            'particles', 'per particle (s)', 'bulk (s)', 'speedup'))
+        for count in PARTICLE_COUNTS:
+            settings = LiggghtsModel()
+            settings.input_file = os.path.join(
+                temp_dir, 'particles_{}.dat'.format(count))
+            write_liggghts_data_file(settings.input_file, count, 10)
+
+            wrapper = create_liggghts_wrapper(settings)
+            flow_dataset, wall_dataset = create_liggghts_datasets(settings)
+            wrapper.add_dataset(flow_dataset)
+            wrapper.add_dataset(wall_dataset)
+            dataset = wrapper.get_dataset(flow_dataset.name)
+
+            particles = list(dataset.iter_particles())
+            for particle in particles:
+                particle.data[CUBA.EXTERNAL_APPLIED_FORCE] = (
+                    1.0, 0.0, 0.0)
+
+            one_by_one = min(timeit.repeat(
+                lambda: update_one_by_one(dataset, particles),
+                number=1, repeat=3))
+            bulk = min(timeit.repeat(
+                lambda: update_in_bulk(dataset, particles),
+                number=1, repeat=3))
+            print('{:>10} {:>16.4f} {:>12.4f} {:>9.1f}x'.format(
+                count, one_by_one, bulk, one_by_one / bulk))
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == '__main__':
+    main()
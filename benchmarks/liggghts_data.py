@@ -0,0 +1,48 @@
+""" Generation of synthetic LIGGGHTS data files for the benchmarks """
+import numpy as np
+
+CHANNEL_SIZE = (1.0e-1, 1.0e-2, 2.0e-3)
+
+
+def write_liggghts_data_file(path, num_flow, num_wall, seed=0):
+    """ Writes a LIGGGHTS data file in the format of the test fixture,
+    with randomly placed flow (type 1) and wall (type 2) particles.
+
+    Parameters
+    ----------
+    path : str
+        The path of the data file to write
+    num_flow : int
+        The number of flow particles
+    num_wall : int
+        The number of wall particles
+    seed : int
+        The seed of the random number generator
+    """
+    random = np.random.RandomState(seed)
+    num_atoms = num_flow + num_wall
+
+    atoms = np.empty((num_atoms, 10))
+    atoms[:, 0] = np.arange(num_atoms)
+    atoms[:, 1] = np.where(np.arange(num_atoms) < num_flow, 1, 2)
+    atoms[:, 2] = np.where(atoms[:, 1] == 1, 0.001, 0.0004)
+    atoms[:, 3] = 1.0
+    atoms[:, 4:7] = random.uniform(size=(num_atoms, 3)) * CHANNEL_SIZE
+    atoms[:, 7:] = 0
+
+    velocities = np.zeros((num_atoms, 7))
+    velocities[:, 0] = np.arange(num_atoms)
+
+    with open(path, 'w') as data_file:
+        data_file.write(
+            '# Synthetic particle file\n\n'
+            '{} atoms\n'
+            '2 atom types\n\n'
+            '0.0 {} xlo xhi\n'
+            '0.0 {} ylo yhi\n'
+            '0.0 {} zlo zhi\n\n'
+            'Atoms\n\n'.format(num_atoms, *CHANNEL_SIZE))
+        np.savetxt(data_file, atoms,
+                   fmt=['%d', '%d'] + ['%.12g'] * 5 + ['%d'] * 3)
+        data_file.write('\nVelocities\n\n')
+        np.savetxt(data_file, velocities, fmt=['%d'] + ['%.12g'] * 6)
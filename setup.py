@@ -40,9 +40,16 @@ setup(
         by established use-cases.'''),
     long_description=README_TEXT,
     install_requires=requirements,
+    extras_require={
+        'yaml': ['pyyaml'],
+    },
     packages=find_packages(),
     package_data={'': ['tests/fixtures/*']},
     entry_points={
+        'console_scripts': [
+            'simphony-ui-batch = simphony_ui.cli.batch:main',
+            'simphony-ui-sweep = simphony_ui.cli.sweep:main'
+        ],
         'gui_scripts': [
             ('openfoam_liggghts_ui = '
              'simphony_ui.cli.openfoam_liggghts_ui:main')
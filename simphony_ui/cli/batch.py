@@ -0,0 +1,107 @@
+""" Headless entry point running a calculation from a settings file.
+
+The settings file is a JSON or YAML mapping with optional ``global``,
+``openfoam`` and ``liggghts`` sections, holding the traits of
+GlobalParametersModel, OpenfoamModel and LiggghtsModel. For instance::
+
+    {
+        "global": {"num_iterations": 100, "force_type": "Dala"},
+        "openfoam": {
+            "input_file": "openfoam_input.txt",
+            "output_path": "run",
+            "boundary_conditions": {
+                "inlet_BC": {
+                    "pressure_boundary_condition": {"fixed_value": 0.01}
+                }
+            }
+        },
+        "liggghts": {"input_file": "liggghts_input.dat"}
+    }
+
+No GUI toolkit, Mayavi or TVTK module is imported.
+"""
+import argparse
+import logging
+import os
+
+from traits.api import TraitError
+
+from simphony_ui.couple_openfoam_liggghts import run_calc
+from simphony_ui.frames import (
+    FRAMES_DIRECTORY, FrameWriter, snapshot_datasets)
+from simphony_ui.settings_file import load_settings
+
+log = logging.getLogger(__name__)
+
+
+def main(argv=None):
+    """ Runs a calculation from a settings file and writes its frames
+    to disk
+
+    Parameters
+    ----------
+    argv : list of str
+        The command line arguments. If None, sys.argv is used.
+
+    Returns
+    -------
+    status : int
+        The exit status of the command
+    """
+    parser = argparse.ArgumentParser(
+        prog='simphony-ui-batch',
+        description='Runs a coupled OpenFOAM/LIGGGHTS calculation without '
+                    'user interface.')
+    parser.add_argument(
+        'settings_file', help='JSON or YAML file of the settings')
+    parser.add_argument(
+        '-o', '--frames-directory',
+        help='directory of the frames, <output_path>/frames by default')
+    parser.add_argument(
+        '-v', '--verbose', action='store_true', help='log the progress')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING)
+
+    try:
+        global_settings, openfoam_settings, liggghts_settings = \
+            load_settings(args.settings_file)
+    except (IOError, ValueError, RuntimeError, TraitError) as e:
+        log.error('Unable to load %s: %s', args.settings_file, e)
+        return 1
+
+    if not (openfoam_settings.valid and liggghts_settings.valid):
+        log.error('The OpenFOAM and LIGGGHTS input files are required')
+        return 1
+
+    frames_directory = args.frames_directory
+    if frames_directory is None:
+        frames_directory = os.path.join(
+            openfoam_settings.output_path, FRAMES_DIRECTORY)
+    writer = FrameWriter(frames_directory)
+    # The mesh topology of the snapshots, shared with the last frame
+    mesh = []
+
+    def progress_callback(snapshot, current_iteration, total_iterations):
+        mesh[:] = [snapshot.mesh]
+        path = writer.write(snapshot)
+        log.info('Iteration %d/%d written to %s',
+                 current_iteration + 1, total_iterations, path)
+
+    datasets = run_calc(
+        global_settings,
+        openfoam_settings,
+        liggghts_settings,
+        progress_callback)
+
+    # The last iteration is only passed to the callback when it falls
+    # on the update frequency
+    last_iteration = global_settings.num_iterations - 1
+    if (datasets is not None and
+            last_iteration % global_settings.update_frequency != 0):
+        writer.write(snapshot_datasets(
+            datasets, last_iteration, mesh[0] if mesh else None))
+
+    log.info('%d frames written to %s', writer.num_frames, frames_directory)
+    return 0
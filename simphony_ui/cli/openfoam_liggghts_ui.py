@@ -1,9 +1,10 @@
 import logging
-from ..ui import Application
 
 
 def main():
     """Instantiate and start the application"""
+    from ..ui import Application
+
     logging.basicConfig()
     ui = Application()
     ui.configure_traits()
@@ -0,0 +1,93 @@
+""" Entry point running a parameter sweep from a sweep file.
+
+The sweep file is a JSON or YAML mapping with a ``settings`` section,
+holding the settings shared by the runs in the layout of a settings
+file, and a ``grid`` section giving the values of each varying setting
+by dotted path. For instance::
+
+    {
+        "settings": {
+            "global": {"num_iterations": 100},
+            "openfoam": {"input_file": "openfoam_input.txt"},
+            "liggghts": {"input_file": "liggghts_input.dat"}
+        },
+        "grid": {
+            "global.force_type": ["Stokes", "Dala", "Coul"],
+            "openfoam.viscosity": [1.0e-3, 2.0e-3]
+        }
+    }
+
+Each run writes its case files and summary.json in its own run-NNNN
+directory. The summaries of all the runs are collected in summary.json.
+"""
+import argparse
+import logging
+import os
+
+from simphony_ui.settings_file import check_sections, read_mapping_file
+from simphony_ui.sweep import run_sweep
+
+log = logging.getLogger(__name__)
+
+#: The sections of a sweep file
+SWEEP_SECTIONS = ('settings', 'grid')
+
+
+def main(argv=None):
+    """ Runs a parameter sweep from a sweep file
+
+    Parameters
+    ----------
+    argv : list of str
+        The command line arguments. If None, sys.argv is used.
+
+    Returns
+    -------
+    status : int
+        The exit status of the command: 0 if all the runs completed,
+        1 otherwise
+    """
+    parser = argparse.ArgumentParser(
+        prog='simphony-ui-sweep',
+        description='Runs a coupled OpenFOAM/LIGGGHTS calculation for '
+                    'every combination of a grid of settings.')
+    parser.add_argument('sweep_file', help='JSON or YAML file of the sweep')
+    parser.add_argument(
+        '-o', '--output-path', default='sweep',
+        help='directory of the run outputs, ./sweep by default')
+    parser.add_argument(
+        '-j', '--jobs', type=int, default=None,
+        help='maximum number of concurrent runs, the number of cores by '
+             'default')
+    parser.add_argument(
+        '-v', '--verbose', action='store_true', help='log the progress')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING)
+
+    try:
+        content = read_mapping_file(args.sweep_file)
+        for section in content:
+            if section not in SWEEP_SECTIONS:
+                raise ValueError(
+                    '{} is not a sweep section'.format(section))
+        check_sections(content.get('settings', {}))
+        summaries = run_sweep(
+            content.get('settings', {}),
+            content.get('grid', {}),
+            args.output_path,
+            base_directory=os.path.dirname(
+                os.path.abspath(args.sweep_file)),
+            max_workers=args.jobs)
+    except (IOError, ValueError, RuntimeError) as e:
+        log.error('Unable to run the sweep %s: %s', args.sweep_file, e)
+        return 1
+
+    failed = [summary for summary in summaries
+              if summary['status'] != 'completed']
+    for summary in failed:
+        log.error('%s failed:\n%s',
+                  summary['run_directory'], summary.get('error'))
+
+    return 1 if failed else 0
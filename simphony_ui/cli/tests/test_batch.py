@@ -0,0 +1,101 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import mock
+
+from simphony_ui.cli.batch import main
+from simphony_ui.tests.test_utils import cleanup_garbage
+
+
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        with cleanup_garbage(self.temp_dir):
+            self.settings_file = os.path.join(self.temp_dir, 'settings.json')
+            with open(self.settings_file, 'w') as settings_file:
+                json.dump({
+                    'global': {'num_iterations': 5, 'update_frequency': 2},
+                    'openfoam': {
+                        'input_file': 'openfoam_input.txt',
+                        'output_path': self.temp_dir,
+                    },
+                    'liggghts': {'input_file': 'liggghts_input.dat'},
+                }, settings_file)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_execution(self):
+        datasets = mock.Mock()
+
+        def run_calc(global_settings, openfoam_settings, liggghts_settings,
+                     progress_callback):
+            for iteration in range(0, global_settings.num_iterations,
+                                   global_settings.update_frequency):
+                progress_callback(
+                    mock.Mock(iteration=iteration), iteration,
+                    global_settings.num_iterations)
+            return datasets
+
+        with mock.patch('simphony_ui.cli.batch.run_calc',
+                        side_effect=run_calc), \
+                mock.patch('simphony_ui.cli.batch.FrameWriter') as writer:
+            self.assertEqual(main([self.settings_file]), 0)
+
+        writer.assert_called_once_with(
+            os.path.join(self.temp_dir, 'frames'))
+        self.assertEqual(
+            [call[0][0].iteration
+             for call in writer.return_value.write.call_args_list],
+            [0, 2, 4])
+
+    def test_last_iteration(self):
+        with open(self.settings_file, 'w') as settings_file:
+            json.dump({
+                'global': {'num_iterations': 4, 'update_frequency': 2},
+                'openfoam': {'input_file': 'openfoam_input.txt'},
+                'liggghts': {'input_file': 'liggghts_input.dat'},
+            }, settings_file)
+
+        with mock.patch('simphony_ui.cli.batch.run_calc') as run_calc, \
+                mock.patch('simphony_ui.cli.batch.snapshot_datasets') as \
+                snapshot_datasets, \
+                mock.patch('simphony_ui.cli.batch.FrameWriter') as writer:
+            main([self.settings_file, '-o', self.temp_dir])
+
+        writer.assert_called_once_with(self.temp_dir)
+        snapshot_datasets.assert_called_once_with(
+            run_calc.return_value, 3, None)
+        writer.return_value.write.assert_called_once_with(
+            snapshot_datasets.return_value)
+
+    def test_invalid_settings(self):
+        with open(self.settings_file, 'w') as settings_file:
+            json.dump({'global': {'num_iterations': 'many'}}, settings_file)
+        with mock.patch('simphony_ui.cli.batch.run_calc') as run_calc:
+            self.assertEqual(main([self.settings_file]), 1)
+        self.assertFalse(run_calc.called)
+
+    def test_missing_input_files(self):
+        with open(self.settings_file, 'w') as settings_file:
+            json.dump({}, settings_file)
+        with mock.patch('simphony_ui.cli.batch.run_calc') as run_calc:
+            self.assertEqual(main([self.settings_file]), 1)
+        self.assertFalse(run_calc.called)
+
+    def test_no_gui_imports(self):
+        code = (
+            'import sys\n'
+            'import simphony_ui.cli.batch\n'
+            'heavy = [name for name in ("mayavi", "tvtk", "simphony_mayavi",'
+            ' "pyface.gui", "pyface.qt", "pyface.wx")\n'
+            '         if sys.modules.get(name) is not None]\n'
+            'sys.stdout.write(",".join(heavy))\n')
+        output = subprocess.check_output([sys.executable, '-c', code])
+        self.assertEqual(output.strip(), b'')
@@ -0,0 +1,69 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+from simphony_ui.cli.sweep import main
+
+
+class TestSweep(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.sweep_file = os.path.join(self.temp_dir, 'sweep.json')
+        self.output_path = os.path.join(self.temp_dir, 'output')
+        self.write_sweep_file({
+            'settings': {'global': {'num_iterations': 5}},
+            'grid': {'global.force_type': ['Stokes', 'Dala']},
+        })
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write_sweep_file(self, content):
+        with open(self.sweep_file, 'w') as sweep_file:
+            json.dump(content, sweep_file)
+
+    def test_execution(self):
+        with mock.patch('simphony_ui.cli.sweep.run_sweep',
+                        return_value=[{'status': 'completed'}]) as run_sweep:
+            self.assertEqual(
+                main([self.sweep_file, '-o', self.output_path, '-j', '3']),
+                0)
+
+        run_sweep.assert_called_once_with(
+            {'global': {'num_iterations': 5}},
+            {'global.force_type': ['Stokes', 'Dala']},
+            self.output_path,
+            base_directory=self.temp_dir,
+            max_workers=3)
+
+    def test_failed_run(self):
+        with mock.patch('simphony_ui.cli.sweep.run_sweep', return_value=[
+                {'status': 'completed'},
+                {'status': 'failed', 'run_directory': 'run-0001',
+                 'error': 'Traceback'}]):
+            self.assertEqual(main([self.sweep_file]), 1)
+
+    def test_invalid_sweep_file(self):
+        self.write_sweep_file({'runs': []})
+        with mock.patch('simphony_ui.cli.sweep.run_sweep') as run_sweep:
+            self.assertEqual(main([self.sweep_file]), 1)
+        self.assertFalse(run_sweep.called)
+
+        self.write_sweep_file({'settings': {'lammps': {}}})
+        self.assertEqual(main([self.sweep_file]), 1)
+
+        self.write_sweep_file({'grid': {'lammps.timestep': [1.0]}})
+        self.assertEqual(main([self.sweep_file, '-o', self.output_path]), 1)
+
+    def test_missing_sweep_file(self):
+        self.assertEqual(
+            main([os.path.join(self.temp_dir, 'missing.json')]), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,16 +4,33 @@ import math
 import numpy as np
 from simphony.core.cuba import CUBA
 
+from simphony_ui.frames import take_snapshot
 from simphony_ui.liggghts_model.liggghts_wrapper_creation import (
     create_liggghts_wrapper, create_liggghts_datasets)
 from simphony_ui.openfoam_model.openfoam_wrapper_creation import (
-    create_openfoam_wrapper, create_openfoam_mesh)
+    MESH_NAME, create_openfoam_wrapper, create_openfoam_mesh)
+from simphony_ui.openfoam_model.openfoam_process import (
+    OpenfoamProcess, copy_mesh, needs_cell_fields)
+from simphony_ui.openfoam_model.cell_locator import IncrementalCellLocator
+from simphony_ui.openfoam_model.mesh_cache import (
+    CellLocatorCache, cached_cell_locator, default_cache_directory,
+    mesh_cache_key)
+from simphony_ui.openfoam_model.mesh_index import (
+    extract_cell_data, update_cell_data)
+from simphony_ui.particle_store import ParticleStore
 
 
 def run_calc(global_settings, openfoam_settings,
-             liggghts_settings, progress_callback, event_lock=None):
+             liggghts_settings, progress_callback, cache_directory=None):
     """ Main routine which creates the wrappers and run the calculation
 
+    In the 'pipelined' coupling mode of global_settings, the Openfoam
+    wrapper runs in a child process, one step ahead of Liggghts. Since the
+    flow does not depend on the particles, the results are the same as in
+    the 'sequential' mode. The mesh of the returned datasets is then an
+    in-memory copy holding the cell velocities and pressures of the
+    reported steps.
+
     Parameters
     ----------
     global_settings : GlobalParametersModel
@@ -23,16 +40,16 @@ def run_calc(global_settings, openfoam_settings,
     liggghts_settings : LiggghtsModel
         The trait model containing the Liggghts parameters
     progress_callback
-        A callback function which will return the progress of the computation
-        which will be called with the progress state of the calculation as an
-        integer in the range [0, 100]
-    event_lock: threading.Event
-        An event to trigger the continuation of the calculation so that
-        the callback routine has a chance for copying the datasets.
-        The callback routine must .set() the event, otherwise the
-        calculation will be suspended and eventually timeout.
-        The default None disables the check and let the evaluation continues
-        to the end.
+        A callback function called every update_frequency iterations with
+        a FrameSnapshot of the calculation, the current iteration and the
+        total number of iterations. The snapshot holds copies of the
+        arrays of the calculation, so the callback can hand it over to
+        another thread and return at once: the calculation only waits for
+        the callback to return.
+    cache_directory : str
+        The directory of the mesh, cell locator and data file caches,
+        which can be shared by several calculations. If None, the caches
+        are in <output_path>/cache.
 
     Returns
     -------
@@ -56,107 +73,123 @@ def run_calc(global_settings, openfoam_settings,
         openfoam_settings.num_grid_z
     ]
 
-    openfoam_mesh = create_openfoam_mesh(openfoam_wrapper, openfoam_settings)
+    # The mesh input file is only read and hashed once for both caches
+    mesh_key = mesh_cache_key(openfoam_settings)
+    openfoam_mesh = create_openfoam_mesh(
+        openfoam_wrapper, openfoam_settings,
+        default_cache_directory(openfoam_settings, 'mesh', cache_directory),
+        mesh_key)
 
     # Create Liggghts wrapper
     liggghts_wrapper = create_liggghts_wrapper(liggghts_settings)
 
-    flow_dataset, wall_dataset = create_liggghts_datasets(liggghts_settings)
+    flow_dataset, wall_dataset = create_liggghts_datasets(
+        liggghts_settings,
+        default_cache_directory(
+            openfoam_settings, 'data_file', cache_directory))
 
     liggghts_wrapper.add_dataset(flow_dataset)
     liggghts_wrapper.add_dataset(wall_dataset)
 
     flow_dataset = liggghts_wrapper.get_dataset(flow_dataset.name)
+    wall_dataset = liggghts_wrapper.get_dataset(wall_dataset.name)
 
     # Generate cell list
-    cellmat = {}
-    index = np.zeros(3, dtype=np.int)
-    gridsize = [
-        channel_size[0] / num_grid[0],
-        channel_size[1] / num_grid[1],
-        channel_size[2] / num_grid[2]
-    ]
-
-    for cell in openfoam_mesh.iter_cells():
-        lln = [
-            channel_size[0] * 2,
-            channel_size[1] * 2,
-            channel_size[2] * 2]
-        for k in range(8):
-            for i in range(3):
-                if openfoam_mesh.get_point(
-                        cell.points[k]).coordinates[i] < lln[i]:
-                    lln[i] = openfoam_mesh.get_point(
-                        cell.points[k]).coordinates[i]
-
-        for i in range(0, 3):
-            index[i] = round(lln[i]/gridsize[i])
-
-        cellmat[index[0], index[1], index[2]] = cell.uid
+    mesh_arrays, cell_locator = cached_cell_locator(
+        openfoam_mesh, openfoam_settings, channel_size, num_grid,
+        CellLocatorCache(default_cache_directory(
+            openfoam_settings, 'cell_locator', cache_directory)),
+        mesh_key)
+    particle_locator = IncrementalCellLocator(cell_locator)
+
+    flow_store = ParticleStore.from_particles(flow_dataset)
+    wall_store = ParticleStore()
+    num_cells = len(cell_locator.cell_rows)
+    cell_velocities = None
+    cell_pressures = None
+
+    openfoam_process = None
+    if global_settings.coupling_mode == 'pipelined':
+        openfoam_process = OpenfoamProcess(
+            openfoam_wrapper, openfoam_mesh, cell_locator.cell_rows,
+            global_settings.num_iterations, global_settings.update_frequency)
+        frame_mesh = copy_mesh(openfoam_mesh, MESH_NAME)
+        cell_velocities = np.zeros((num_cells, 3))
+        cell_pressures = np.zeros(num_cells)
+        openfoam_process.start()
 
     # Main loop
 
     datasets = None
-    # Repeating OF calculation several times with modified pressure drop last
-    # result from previous iteration as input for new iteration
-    for numrun in xrange(global_settings.num_iterations):
-        # Perform Openfoam calculations
-        openfoam_wrapper.run()
-
-        # Compute relative velocity & drag force
-        for particle in flow_dataset.iter_particles():
-            testpoint = particle.coordinates
-            index = np.zeros(3, dtype=np.int)
-
-            for i in range(3):
-                index[i] = int(math.floor(
-                    testpoint[i] / (channel_size[i] /
-                                    float(num_grid[i]))))
-
-                if index[i] == num_grid[i]:
-                    index[i] = 0
-                elif index[i] == -1:
-                    index[i] = num_grid[i] - 1
-
-            cell_id = cellmat[index[0], index[1], index[2]]
-            cell = openfoam_mesh.get_cell(cell_id)
-
-            rel_velo = np.zeros(3, dtype=np.int)
-            for i in range(3):
-                rel_velo[i] = cell.data[CUBA.VELOCITY][i] - \
-                    list(particle.data[CUBA.VELOCITY])[i]
-
-            dragforce = compute_drag_force(
+    try:
+        # Repeating OF calculation several times with modified pressure
+        # drop last result from previous iteration as input for new
+        # iteration
+        for numrun in xrange(global_settings.num_iterations):
+            cell_fields = needs_cell_fields(
+                numrun, global_settings.num_iterations,
+                global_settings.update_frequency)
+
+            # Perform Openfoam calculations
+            if openfoam_process is None:
+                openfoam_wrapper.run()
+
+                cell_velocities = extract_cell_data(
+                    openfoam_mesh, cell_locator.cell_rows, CUBA.VELOCITY,
+                    out=cell_velocities)
+                if cell_fields:
+                    cell_pressures = extract_cell_data(
+                        openfoam_mesh, cell_locator.cell_rows,
+                        CUBA.PRESSURE, out=cell_pressures)
+            else:
+                openfoam_process.fetch(
+                    numrun, cell_velocities,
+                    cell_pressures if cell_fields else None)
+
+            # Compute relative velocity & drag force
+            rows = particle_locator.locate(flow_store.coordinates)
+
+            flow_store.forces[...] = compute_drag_forces(
                 global_settings.force_type,
-                particle.data[CUBA.RADIUS],
-                rel_velo,
+                flow_store.radii,
+                cell_velocities[rows] - flow_store.velocities,
                 viscosity,
                 density
             )
-
-            particle.data[CUBA.EXTERNAL_APPLIED_FORCE] = tuple(dragforce)
-            flow_dataset.update_particles([particle])
-
-        # Perform Liggghts calculations
-        liggghts_wrapper.run()
-
-        datasets = (
-            openfoam_wrapper.get_dataset('mesh'),
-            liggghts_wrapper.get_dataset('flow_particles'),
-            liggghts_wrapper.get_dataset('wall_particles'))
-
-        if numrun % global_settings.update_frequency == 0:
-            progress_callback(datasets,
-                              numrun,
-                              global_settings.num_iterations)
-            if event_lock is not None:
-                # We wait 10 seconds for the UI to give us the chance
-                # to continue. The operation should actually be fast
-                # (we just copy the datasets). If we timeout, it's likely
-                # that the UI is stuck, so we want to quit.
-                if not event_lock.wait(10.0):
-                    return None
-                event_lock.clear()
+            flow_store.write(flow_dataset, ('forces',))
+
+            # Perform Liggghts calculations
+            liggghts_wrapper.run()
+            flow_store.read(flow_dataset)
+
+            if openfoam_process is None:
+                mesh_dataset = openfoam_wrapper.get_dataset(MESH_NAME)
+            else:
+                if cell_fields:
+                    update_cell_data(
+                        frame_mesh, cell_locator.cell_rows, {
+                            CUBA.VELOCITY: cell_velocities,
+                            CUBA.PRESSURE: cell_pressures})
+                mesh_dataset = frame_mesh
+
+            datasets = (
+                mesh_dataset,
+                liggghts_wrapper.get_dataset('flow_particles'),
+                liggghts_wrapper.get_dataset('wall_particles'))
+
+            if numrun % global_settings.update_frequency == 0:
+                wall_store.read(wall_dataset)
+                snapshot = take_snapshot(
+                    numrun, mesh_arrays,
+                    {'velocity': cell_velocities,
+                     'pressure': cell_pressures},
+                    {'flow': flow_store, 'wall': wall_store})
+                progress_callback(snapshot,
+                                  numrun,
+                                  global_settings.num_iterations)
+    finally:
+        if openfoam_process is not None:
+            openfoam_process.close()
 
     return datasets
 
@@ -212,3 +245,62 @@ def compute_drag_force(force_type, radius, rel_velo, viscosity, density):
                 'type'.format(force_type))
 
     return dragforce
+
+
+def compute_drag_forces(force_type, radii, rel_velos, viscosity, density):
+    """ Function which compute the forces applied on a set of particles
+    at once. It is the array counterpart of compute_drag_force.
+
+    Parameters
+    ----------
+    force_type : Str
+        The type of the applied force. Supported force types are
+        "Stokes", "Dala" and "Coul"
+    radii : (N,) float array
+        The radii of the particles
+    rel_velos : (N, 3) float array
+        The relative velocities of the particles
+    viscosity : Float
+        The fluid viscosity
+    density : Float
+        The fluid density
+
+    Returns
+    -------
+    dragforces : (N, 3) float array
+        The computed forces applied on the particles. Particles with
+        a null relative velocity get a null force.
+    """
+    radii = np.asarray(radii, dtype=np.float64)
+    rel_velos = np.asarray(rel_velos, dtype=np.float64).reshape(-1, 3)
+
+    if force_type == "Stokes":
+        return (3.0 * math.pi * viscosity * radii * 2.0)[:, np.newaxis] * \
+            rel_velos
+
+    if force_type not in ("Dala", "Coul"):
+        raise ValueError(
+            '{} is not a supported force '
+            'type'.format(force_type))
+
+    speeds = np.sqrt((rel_velos ** 2).sum(axis=1))
+    reynold_numbers = density * speeds * radii * 2.0 / viscosity
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if force_type == "Dala":
+            coeffs = (0.63 + 4.8 / np.sqrt(reynold_numbers)) ** 2
+            dragforces = (
+                0.5 * coeffs * math.pi * radii ** 2 *
+                density * speeds)[:, np.newaxis] * rel_velos
+        else:
+            # As in compute_drag_force, the same value is applied
+            # on every component.
+            magnitudes = \
+                math.pi * radii ** 2 * density * speeds * \
+                (1.84 * reynold_numbers ** (-0.31) +
+                 0.293 * reynold_numbers ** 0.06) ** 3.45
+            dragforces = np.repeat(magnitudes[:, np.newaxis], 3, axis=1)
+
+    dragforces[speeds == 0.0] = 0.0
+
+    return dragforces
@@ -0,0 +1,237 @@
+""" Storage of the frames of a calculation on disk, with a bounded number
+of frames loaded in memory.
+"""
+import glob
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from simphony_ui.frames import (
+    FRAME_FILE_PATTERN, FrameWriter, MESH_FILE, frame_file_name, read_frame,
+    read_mesh)
+
+log = logging.getLogger(__name__)
+
+#: The default number of frames kept in memory
+DEFAULT_CACHE_SIZE = 16
+
+
+class FrameStore(object):
+    """ The frames of a calculation, written to a directory in the format
+    of FrameWriter and loaded on demand.
+
+    The store behaves as a read-only sequence of FrameSnapshot. The last
+    accessed frames are kept in memory, up to cache_size frames, the least
+    recently used frames being dropped first. Frames can be prefetched in
+    a background thread, so that they are in memory when accessed.
+
+    Frames are appended by one thread, and can be accessed concurrently
+    by other threads.
+    """
+
+    def __init__(self, directory, num_frames=0,
+                 cache_size=DEFAULT_CACHE_SIZE):
+        """
+        Parameters
+        ----------
+        directory : str
+            The directory of the frames
+        num_frames : int
+            The number of frames already in the directory
+        cache_size : int
+            The maximum number of frames kept in memory. It must be
+            positive.
+
+        Raises
+        ------
+        ValueError
+            If cache_size is not positive
+        """
+        _check_cache_size(cache_size)
+
+        #: The directory of the frames
+        self.directory = directory
+
+        self._writer = FrameWriter(directory, num_frames)
+        self._cache_size = cache_size
+        self._cache = OrderedDict()
+        self._pending = set()
+        self._mesh = None
+        self._lock = threading.Lock()
+        self._executor = None
+
+    @classmethod
+    def create(cls, directory, cache_size=DEFAULT_CACHE_SIZE):
+        """ Creates an empty store, removing the frames previously written
+        to the directory
+
+        Parameters
+        ----------
+        directory : str
+            The directory of the frames
+        cache_size : int
+            The maximum number of frames kept in memory
+
+        Returns
+        -------
+        store : FrameStore
+            The empty store
+        """
+        for path in _frame_files(directory):
+            os.remove(path)
+        mesh_path = os.path.join(directory, MESH_FILE)
+        if os.path.exists(mesh_path):
+            os.remove(mesh_path)
+        return cls(directory, 0, cache_size)
+
+    @classmethod
+    def open(cls, directory, cache_size=DEFAULT_CACHE_SIZE):
+        """ Opens the frames of a directory, without loading any of them
+
+        Parameters
+        ----------
+        directory : str
+            The directory of the frames
+        cache_size : int
+            The maximum number of frames kept in memory
+
+        Returns
+        -------
+        store : FrameStore
+            The store of the frames
+        """
+        return cls(directory, len(_frame_files(directory)), cache_size)
+
+    @property
+    def cache_size(self):
+        """ The maximum number of frames kept in memory """
+        return self._cache_size
+
+    @cache_size.setter
+    def cache_size(self, cache_size):
+        _check_cache_size(cache_size)
+        with self._lock:
+            self._cache_size = cache_size
+            self._evict()
+
+    @property
+    def num_cached(self):
+        """ The number of frames currently in memory """
+        return len(self._cache)
+
+    def __len__(self):
+        return self._writer.num_frames
+
+    def __getitem__(self, index):
+        """ The snapshot of a frame, loaded from disk if it is not in
+        memory
+
+        Raises
+        ------
+        IndexError
+            If there is no such frame
+        """
+        index = self._check_index(index)
+        with self._lock:
+            snapshot = self._cache.pop(index, None)
+            if snapshot is not None:
+                self._cache[index] = snapshot
+                return snapshot
+
+        return self._load(index)
+
+    def append(self, snapshot):
+        """ Writes a frame to disk and keeps it in memory
+
+        Parameters
+        ----------
+        snapshot : FrameSnapshot
+            The snapshot of the frame
+        """
+        if self._mesh is None:
+            self._mesh = snapshot.mesh
+        self._writer.write(snapshot)
+        with self._lock:
+            self._cache[len(self) - 1] = snapshot
+            self._evict()
+
+    def prefetch(self, indices):
+        """ Loads frames in a background thread, if they are not already
+        in memory
+
+        Parameters
+        ----------
+        indices : iterable of int
+            The indices of the frames. Invalid indices are ignored.
+        """
+        num_frames = len(self)
+        for index in indices:
+            if not 0 <= index < num_frames:
+                continue
+            with self._lock:
+                if index in self._cache or index in self._pending:
+                    continue
+                self._pending.add(index)
+            self._get_executor().submit(self._prefetch, index)
+
+    def close(self):
+        """ Stops the prefetching and drops the frames in memory """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        with self._lock:
+            self._cache.clear()
+
+    def _check_index(self, index):
+        num_frames = len(self)
+        if index < 0:
+            index += num_frames
+        if not 0 <= index < num_frames:
+            raise IndexError('frame index out of range')
+        return index
+
+    def _load(self, index):
+        """ Loads a frame from disk and keeps it in memory """
+        if self._mesh is None:
+            self._mesh = read_mesh(self.directory)
+        snapshot = read_frame(
+            os.path.join(self.directory, frame_file_name(index)), self._mesh)
+        with self._lock:
+            self._cache.pop(index, None)
+            self._cache[index] = snapshot
+            self._evict()
+        return snapshot
+
+    def _prefetch(self, index):
+        try:
+            self._load(index)
+        except Exception:
+            log.exception('Unable to prefetch the frame %d', index)
+        finally:
+            with self._lock:
+                self._pending.discard(index)
+
+    def _evict(self):
+        """ Drops the least recently used frames above the cache size. The
+        lock must be held.
+        """
+        while len(self._cache) > max(self._cache_size, 0):
+            self._cache.popitem(last=False)
+
+    def _get_executor(self):
+        if self._executor is None:
+            from concurrent import futures
+            self._executor = futures.ThreadPoolExecutor(max_workers=1)
+        return self._executor
+
+
+def _check_cache_size(cache_size):
+    if cache_size < 1:
+        raise ValueError(
+            'The cache size must be positive, not {}'.format(cache_size))
+
+
+def _frame_files(directory):
+    """ The paths of the frame files of a directory """
+    return glob.glob(os.path.join(directory, FRAME_FILE_PATTERN))
@@ -0,0 +1,241 @@
+import os
+from collections import namedtuple
+
+import numpy as np
+from simphony.core.cuba import CUBA
+
+from simphony_ui.openfoam_model.mesh_index import (
+    MeshArrays, extract_cell_data, extract_mesh_arrays)
+from simphony_ui.particle_store import ParticleStore
+
+#: The CUBA keys of the cell data saved in the frames, by array name
+CELL_DATA = {
+    'velocity': CUBA.VELOCITY,
+    'pressure': CUBA.PRESSURE,
+}
+
+#: The names of the particle datasets of a frame, in dataset order
+PARTICLE_DATASETS = ('flow', 'wall')
+
+#: The name of the directory of the frames, under the output path
+FRAMES_DIRECTORY = 'frames'
+
+#: The name of the file holding the mesh topology
+MESH_FILE = 'mesh.npz'
+
+#: The arrays of a particles dataset held by a frame snapshot
+ParticleArrays = namedtuple(
+    'ParticleArrays', ['coordinates', 'velocities', 'radii'])
+
+#: A copy of the state of a calculation at a coupling iteration, made of
+#: plain arrays, so that it can be consumed by another thread while the
+#: calculation goes on.
+#:
+#: iteration : int, the coupling iteration.
+#: mesh : MeshArrays of the mesh topology. It does not change during a
+#:     calculation and is shared by all its snapshots.
+#: cell_data : dict of the (ncells,) or (ncells, 3) arrays of cell data, in
+#:     the row order of mesh, by name in CELL_DATA.
+#: particles : dict of the ParticleArrays of the particle datasets, by
+#:     name in PARTICLE_DATASETS.
+FrameSnapshot = namedtuple(
+    'FrameSnapshot', ['iteration', 'mesh', 'cell_data', 'particles'])
+
+
+#: The glob pattern of the names of the frame files
+FRAME_FILE_PATTERN = 'frame-*.npz'
+
+
+def frame_file_name(index):
+    """ The name of the file of a frame """
+    return 'frame-{:05d}.npz'.format(index)
+
+
+def take_snapshot(iteration, mesh, cell_data, particle_stores):
+    """ Takes a snapshot of the arrays of a calculation, with one copy
+    per array
+
+    Parameters
+    ----------
+    iteration : int
+        The coupling iteration
+    mesh : MeshArrays
+        The mesh topology, which is shared and not copied
+    cell_data : dict
+        The arrays of cell data, in the row order of mesh, by name in
+        CELL_DATA
+    particle_stores : dict
+        The ParticleStore of each particles dataset, by name in
+        PARTICLE_DATASETS
+
+    Returns
+    -------
+    snapshot : FrameSnapshot
+        The snapshot
+    """
+    return FrameSnapshot(
+        iteration,
+        mesh,
+        {name: np.array(values) for name, values in cell_data.items()},
+        {name: ParticleArrays(
+            np.array(store.coordinates),
+            np.array(store.velocities),
+            np.array(store.radii))
+         for name, store in particle_stores.items()})
+
+
+def snapshot_datasets(datasets, iteration, mesh=None):
+    """ Takes a snapshot of the CUDS datasets of a calculation. This reads
+    every cell and particle of the datasets, and is meant for the final
+    datasets returned by run_calc.
+
+    Parameters
+    ----------
+    datasets : tuple
+        The mesh, flow particles and wall particles datasets, as
+        returned by run_calc
+    iteration : int
+        The coupling iteration of the datasets
+    mesh : MeshArrays
+        The topology of the mesh dataset, if already known. If None, it
+        is extracted from the mesh dataset.
+
+    Returns
+    -------
+    snapshot : FrameSnapshot
+        The snapshot of the datasets
+    """
+    mesh_dataset = datasets[0]
+    if mesh is None:
+        mesh = extract_mesh_arrays(mesh_dataset)
+    cell_rows = {uid: row for row, uid in enumerate(mesh.cell_uids)}
+
+    cell_data = {}
+    first_cell = next(mesh_dataset.iter_cells(), None)
+    for name, cuba_key in CELL_DATA.items():
+        if first_cell is not None and cuba_key in first_cell.data:
+            cell_data[name] = extract_cell_data(
+                mesh_dataset, cell_rows, cuba_key)
+
+    particle_stores = {
+        name: ParticleStore.from_particles(particles)
+        for name, particles in zip(PARTICLE_DATASETS, datasets[1:])}
+
+    return take_snapshot(iteration, mesh, cell_data, particle_stores)
+
+
+def read_mesh(directory):
+    """ Reads the mesh topology written by a FrameWriter
+
+    Parameters
+    ----------
+    directory : str
+        The directory of the frames
+
+    Returns
+    -------
+    mesh : MeshArrays
+        The mesh topology. The cell uids are not stored, so its cell_uids
+        is None.
+    """
+    with np.load(os.path.join(directory, MESH_FILE)) as arrays:
+        return MeshArrays(
+            arrays['points'], arrays['connectivity'],
+            arrays['point_counts'], None)
+
+
+def read_frame(path, mesh):
+    """ Reads a frame written by a FrameWriter
+
+    Parameters
+    ----------
+    path : str
+        The path of the frame file
+    mesh : MeshArrays
+        The mesh topology of the frames, as returned by read_mesh
+
+    Returns
+    -------
+    snapshot : FrameSnapshot
+        The snapshot of the frame
+    """
+    with np.load(path) as arrays:
+        return FrameSnapshot(
+            int(arrays['iteration']),
+            mesh,
+            {name: arrays['cell_' + name] for name in CELL_DATA
+             if 'cell_' + name in arrays.files},
+            {name: ParticleArrays(
+                arrays[name + '_coordinates'],
+                arrays[name + '_velocities'],
+                arrays[name + '_radii'])
+             for name in PARTICLE_DATASETS})
+
+
+class FrameWriter(object):
+    """ Writes the frames of a calculation to a directory.
+
+    The mesh points and connectivity, which do not change during a
+    calculation, are written once in ``mesh.npz``. Each frame is then
+    written in a ``frame-NNNNN.npz`` file holding the cell data of the
+    mesh and the coordinates, velocities and radii of the flow and wall
+    particles.
+    """
+
+    def __init__(self, directory, num_frames=0):
+        """
+        Parameters
+        ----------
+        directory : str
+            The directory of the frames
+        num_frames : int
+            The number of frames already in the directory. The frames
+            written are appended after them.
+        """
+        #: The directory of the frames
+        self.directory = directory
+
+        #: The number of frames written so far
+        self.num_frames = num_frames
+
+    def write(self, snapshot):
+        """ Writes a frame
+
+        Parameters
+        ----------
+        snapshot : FrameSnapshot
+            The snapshot of the frame
+
+        Returns
+        -------
+        path : str
+            The path of the frame file
+        """
+        if self.num_frames == 0:
+            self._write_mesh(snapshot.mesh)
+
+        arrays = {'iteration': snapshot.iteration}
+
+        for name, values in snapshot.cell_data.items():
+            arrays['cell_' + name] = values
+
+        for name, particles in snapshot.particles.items():
+            arrays[name + '_coordinates'] = particles.coordinates
+            arrays[name + '_velocities'] = particles.velocities
+            arrays[name + '_radii'] = particles.radii
+
+        path = os.path.join(self.directory, frame_file_name(self.num_frames))
+        np.savez(path, **arrays)
+        self.num_frames += 1
+        return path
+
+    def _write_mesh(self, mesh):
+        """ Writes the mesh topology """
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+
+        np.savez(
+            os.path.join(self.directory, MESH_FILE),
+            points=mesh.points,
+            connectivity=mesh.connectivity,
+            point_counts=mesh.point_counts)
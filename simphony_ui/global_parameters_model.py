@@ -14,11 +14,24 @@ class GlobalParametersModel(HasStrictTraits):
     #: The type of the force used during the simulation.
     force_type = Enum('Stokes', 'Coul', 'Dala')
 
+    #: How the Openfoam and Liggghts calculations are scheduled. In
+    #: 'sequential' mode they run one after the other in the same
+    #: process. In 'pipelined' mode Openfoam runs in a child process,
+    #: computing the next step while Liggghts runs the current one.
+    #: The child process is forked, which is only safe in a process
+    #: without other threads: the GUI runs in 'sequential' mode.
+    coupling_mode = Enum(
+        'sequential', 'pipelined',
+        desc='how the Openfoam and Liggghts steps are scheduled. The '
+             "'pipelined' mode is only available in the batch and sweep "
+             "commands, the user interface runs in 'sequential' mode")
+
     traits_view = View(
         VGroup(
             Item(name='num_iterations', label='Number of iterations'),
             Item(name='update_frequency', label='Update frequency'),
             Item(name='force_type'),
+            Item(name='coupling_mode', label='Coupling mode'),
             show_border=True
         )
     )
@@ -0,0 +1,325 @@
+""" Export of the frames of a calculation to PNG images, rendered offscreen
+in parallel worker processes.
+
+Each worker process builds its VTK pipeline and offscreen render window
+once, and then renders the frames it is given by reading them from the
+frame files. The frames must therefore be stored on disk, as done by
+FrameStore.
+
+The worker processes are fresh interpreters started by WorkerPool, and
+not forks of the calling process, which may be the user interface.
+
+Offscreen rendering without a display requires a VTK built with OSMesa
+or EGL support. With other builds, the render windows are created
+hidden on the current display.
+"""
+import logging
+import multiprocessing
+import os
+
+import numpy as np
+
+from simphony_ui.frames import frame_file_name, read_frame, read_mesh
+from simphony_ui.vtk_frames import MeshTopology, particles_data_set
+from simphony_ui.worker_pool import WorkerPool
+
+log = logging.getLogger(__name__)
+
+#: The default width and height of the images, in pixels
+DEFAULT_IMAGE_SIZE = (800, 600)
+
+#: The default number of frames rendered by a worker in one task. The
+#: progress is reported after each task.
+DEFAULT_CHUNK_SIZE = 10
+
+#: The parameters of the camera, as returned by camera_parameters
+CAMERA_PARAMETERS = ('position', 'focal_point', 'view_up', 'view_angle')
+
+# The renderer of a worker process. A new pool of processes is created
+# for each export, so it is built on the first task of a worker and used
+# for all its other tasks.
+_worker_renderer = None
+
+#: The bytes per pixel of the RGB images returned by OffscreenRenderer.rgb
+RGB_CHANNELS = 3
+
+
+def image_file_name(index):
+    """ The name of the image file of a frame """
+    return 'frame-{}.png'.format(index)
+
+
+def camera_parameters(camera):
+    """ The parameters of a camera, which can be sent to the worker
+    processes
+
+    Parameters
+    ----------
+    camera : tvtk.Camera
+        The camera
+
+    Returns
+    -------
+    parameters : dict
+        The values of CAMERA_PARAMETERS, by name
+    """
+    return {name: getattr(camera, name) for name in CAMERA_PARAMETERS}
+
+
+class OffscreenRenderer(object):
+    """ Renders frames sharing a mesh topology to PNG images, in an
+    offscreen render window. The mesh surface is colored by the cell
+    pressure, and the particles are shown as spheres of their radius and
+    as arrows of their velocity.
+
+    The pipeline is built once. Rendering a frame only replaces the input
+    data of the pipeline.
+    """
+
+    def __init__(self, mesh, size=DEFAULT_IMAGE_SIZE, camera=None):
+        """
+        Parameters
+        ----------
+        mesh : MeshArrays
+            The mesh topology of the frames
+        size : tuple
+            The width and height of the images, in pixels
+        camera : dict
+            The camera parameters, as returned by camera_parameters. If
+            None, the camera is fitted to the bounds of the mesh.
+        """
+        from tvtk.api import tvtk
+
+        #: The VTK topology of the mesh
+        self.topology = MeshTopology(mesh)
+
+        self._renderer = tvtk.Renderer(background=(0.5, 0.5, 0.5))
+        self._window = tvtk.RenderWindow(
+            off_screen_rendering=True, size=size)
+        self._window.add_renderer(self._renderer)
+
+        self._surface = tvtk.DataSetSurfaceFilter()
+        self._mesh_mapper = tvtk.PolyDataMapper(
+            input_connection=self._surface.output_port,
+            scalar_mode='use_cell_field_data')
+        self._mesh_mapper.select_color_array('PRESSURE')
+        self._renderer.add_actor(tvtk.Actor(mapper=self._mesh_mapper))
+
+        # The sphere and arrow glyphs of the flow and wall particles
+        self._glyphs = {}
+        for name in ('flow', 'wall'):
+            spheres = tvtk.Glyph3D(
+                source_connection=tvtk.SphereSource(radius=1.0).output_port,
+                scale_mode='scale_by_scalar', scale_factor=1.0)
+            spheres.set_input_array_to_process(0, 0, 0, 0, 'RADIUS')
+            arrows = tvtk.Glyph3D(
+                source_connection=tvtk.ArrowSource().output_port,
+                scale_mode='scale_by_vector', color_mode='color_by_vector',
+                vector_mode='use_vector', scale_factor=1.0)
+            arrows.set_input_array_to_process(1, 0, 0, 0, 'VELOCITY')
+            for glyph in (spheres, arrows):
+                mapper = tvtk.PolyDataMapper(
+                    input_connection=glyph.output_port)
+                self._renderer.add_actor(tvtk.Actor(mapper=mapper))
+            self._glyphs[name] = (spheres, arrows)
+
+        if camera is None:
+            self._renderer.reset_camera(self.topology.data_set.bounds)
+        else:
+            for name, value in camera.items():
+                setattr(self._renderer.active_camera, name, value)
+
+        self._image = tvtk.WindowToImageFilter(input=self._window)
+        self._writer = tvtk.PNGWriter(
+            input_connection=self._image.output_port)
+
+    def render(self, snapshot, path):
+        """ Renders a frame to a PNG image
+
+        Parameters
+        ----------
+        snapshot : FrameSnapshot
+            The snapshot of the frame. Its mesh must be the mesh of the
+            renderer.
+        path : str
+            The path of the image
+        """
+        self._render(snapshot)
+        self._writer.file_name = path
+        self._writer.write()
+
+    def rgb(self, snapshot):
+        """ Renders a frame to an RGB image in memory
+
+        Parameters
+        ----------
+        snapshot : FrameSnapshot
+            The snapshot of the frame. Its mesh must be the mesh of the
+            renderer.
+
+        Returns
+        -------
+        image : (height, width, 3) uint8 array
+            The image, its first row being the top of the frame
+        """
+        self._render(snapshot)
+        self._image.update()
+        output = self._image.output
+        width, height = output.dimensions[:2]
+        pixels = output.point_data.scalars.to_array().reshape(
+            height, width, -1)
+        # VTK images start with the bottom row
+        return np.ascontiguousarray(
+            pixels[::-1, :, :RGB_CHANNELS], dtype=np.uint8)
+
+    def _render(self, snapshot):
+        """ Renders a frame in the render window """
+        self._surface.set_input_data(
+            self.topology.frame_data_set(snapshot.cell_data))
+        pressures = snapshot.cell_data.get('pressure')
+        self._mesh_mapper.scalar_visibility = pressures is not None
+        if pressures is not None and len(pressures) > 0:
+            self._mesh_mapper.scalar_range = (
+                pressures.min(), pressures.max())
+
+        for name, glyphs in self._glyphs.items():
+            data_set = particles_data_set(snapshot.particles[name])
+            for glyph in glyphs:
+                glyph.set_input_data(data_set)
+
+        self._renderer.reset_camera_clipping_range()
+
+        self._window.render()
+        self._image.modified()
+
+
+def worker_renderer(frames_directory, size, camera):
+    """ The renderer of a worker process, built on its first call
+
+    Parameters
+    ----------
+    frames_directory : str
+        The directory of the frames
+    size : tuple
+        The width and height of the images, in pixels
+    camera : dict
+        The camera parameters, see OffscreenRenderer
+
+    Returns
+    -------
+    renderer : OffscreenRenderer
+        The renderer of the process
+    """
+    global _worker_renderer
+    if _worker_renderer is None:
+        _worker_renderer = OffscreenRenderer(
+            read_mesh(frames_directory), size, camera)
+    return _worker_renderer
+
+
+def render_frames(frames_directory, indices, output_directory, size,
+                  camera):
+    """ Renders frames to PNG images. This function is run by the worker
+    processes, which build their renderer on their first call.
+
+    Parameters
+    ----------
+    frames_directory : str
+        The directory of the frames
+    indices : list of int
+        The indices of the frames to render
+    output_directory : str
+        The directory of the images
+    size : tuple
+        The width and height of the images, in pixels
+    camera : dict
+        The camera parameters, see OffscreenRenderer
+
+    Returns
+    -------
+    paths : list of str
+        The paths of the images, in the order of indices
+    """
+    renderer = worker_renderer(frames_directory, size, camera)
+
+    paths = []
+    for index in indices:
+        path = os.path.join(output_directory, image_file_name(index))
+        snapshot = read_frame(
+            os.path.join(frames_directory, frame_file_name(index)),
+            renderer.topology.mesh)
+        renderer.render(snapshot, path)
+        paths.append(path)
+    return paths
+
+
+def export_images(frames_directory, num_frames, output_directory,
+                  size=DEFAULT_IMAGE_SIZE, camera=None, max_workers=None,
+                  chunk_size=DEFAULT_CHUNK_SIZE, progress_callback=None,
+                  renderer=render_frames):
+    """ Renders the frames of a calculation to PNG images, in a pool of
+    worker processes
+
+    Parameters
+    ----------
+    frames_directory : str
+        The directory of the frames, as written by FrameWriter
+    num_frames : int
+        The number of frames to render, from the first one
+    output_directory : str
+        The directory of the images. The image of frame i is
+        frame-i.png.
+    size : tuple
+        The width and height of the images, in pixels
+    camera : dict
+        The camera parameters, as returned by camera_parameters. If None,
+        the camera is fitted to the bounds of the mesh.
+    max_workers : int
+        The maximum number of worker processes. It is capped at the
+        number of cores, which is also the default.
+    chunk_size : int
+        The number of frames rendered by a worker in one task
+    progress_callback : function
+        Called with the number of rendered frames and num_frames after
+        each task. It is called in the thread of export_images.
+    renderer : callable
+        The function rendering a chunk of frames, with the signature of
+        render_frames. It must be importable by the worker processes.
+
+    Returns
+    -------
+    paths : list of str
+        The paths of the images, in frame order
+    """
+    from concurrent import futures
+
+    chunks = [range(start, min(start + chunk_size, num_frames))
+              for start in xrange(0, num_frames, chunk_size)]
+
+    num_cores = multiprocessing.cpu_count()
+    num_workers = min(max_workers or num_cores, num_cores, len(chunks))
+    if not os.path.isdir(output_directory):
+        os.makedirs(output_directory)
+
+    log.info('Exporting %d frames on %d processes', num_frames, num_workers)
+    paths = [None] * num_frames
+    num_rendered = 0
+    with WorkerPool(max(num_workers, 1)) as executor:
+        pending = {
+            executor.submit(renderer, frames_directory, chunk,
+                            output_directory, size, camera): chunk
+            for chunk in chunks}
+        try:
+            for future in futures.as_completed(pending):
+                chunk = pending[future]
+                for index, path in zip(chunk, future.result()):
+                    paths[index] = path
+                num_rendered += len(chunk)
+                if progress_callback is not None:
+                    progress_callback(num_rendered, num_frames)
+        except Exception:
+            for future in pending:
+                future.cancel()
+            raise
+
+    return paths
@@ -0,0 +1,345 @@
+import hashlib
+import logging
+import mmap
+import os
+import re
+import tempfile
+from collections import namedtuple
+
+import numpy as np
+from simphony.core.cuba import CUBA
+from simphony.cuds.particles import Particle, Particles
+
+log = logging.getLogger(__name__)
+
+#: The atom type of the flow particles
+FLOW_TYPE = 1
+
+#: The atom type of the wall particles
+WALL_TYPE = 2
+
+#: The version of the sidecar file layout. Sidecars of another version
+#: are ignored.
+SIDECAR_VERSION = 1
+
+#: Array description of the particles of a LIGGGHTS data file.
+#:
+#: box_origin : (3,) float64 array of the lower corner of the box.
+#: box_vectors : (3, 3) float64 array of the box edge vectors.
+#: ids : (N,) int array of the atom ids.
+#: types : (N,) int array of the atom types.
+#: diameters : (N,) float64 array of the particle diameters.
+#: densities : (N,) float64 array of the particle densities.
+#: coordinates : (N, 3) float64 array of the particle coordinates.
+#: velocities : (N, 3) float64 array of the particle velocities.
+#: angular_velocities : (N, 3) float64 array of the angular velocities.
+DataFileArrays = namedtuple(
+    'DataFileArrays',
+    ['box_origin', 'box_vectors', 'ids', 'types', 'diameters',
+     'densities', 'coordinates', 'velocities', 'angular_velocities'])
+
+_SECTION = re.compile(
+    br'^[ \t]*([A-Z][A-Za-z ]*?)[ \t\r]*(#[^\n]*)?$', re.M)
+_ATOMS = re.compile(br'^[ \t]*(\d+)[ \t]+atoms\b', re.M)
+_BOUNDS = re.compile(
+    br'^[ \t]*(\S+)[ \t]+(\S+)[ \t]+([xyz])lo[ \t]+[xyz]hi\b', re.M)
+_TILTS = re.compile(
+    br'^[ \t]*(\S+)[ \t]+(\S+)[ \t]+(\S+)[ \t]+xy[ \t]+xz[ \t]+yz\b', re.M)
+
+
+def parse_data_file(path):
+    """ Parses the header, the Atoms section and the Velocities section of
+    a LIGGGHTS data file of granular atom style. The file is memory-mapped
+    and each section is converted to an array in a single call.
+
+    Parameters
+    ----------
+    path : str
+        The path of the data file
+
+    Returns
+    -------
+    data : DataFileArrays
+        The arrays describing the particles
+
+    Raises
+    ------
+    ValueError
+        If the file is not a valid data file
+    """
+    with open(path, 'rb') as data_file:
+        try:
+            content = mmap.mmap(
+                data_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise ValueError('{} is empty'.format(path))
+
+    try:
+        sections = _find_sections(content)
+        if b'Atoms' not in sections:
+            raise ValueError('{} has no Atoms section'.format(path))
+
+        header = content[:sections[b'Atoms'][0]]
+        match = _ATOMS.search(header)
+        if match is None:
+            raise ValueError('{} has no atom count'.format(path))
+        num_atoms = int(match.group(1))
+        box_origin, box_vectors = _parse_box(header)
+
+        atoms = _parse_section(content, sections[b'Atoms'], num_atoms,
+                               (7, 10), 'Atoms')
+        if b'Velocities' in sections:
+            velocities = _parse_section(
+                content, sections[b'Velocities'], num_atoms, (7,),
+                'Velocities')
+        else:
+            velocities = np.zeros((num_atoms, 7))
+            velocities[:, 0] = atoms[:, 0]
+    finally:
+        content.close()
+
+    # The velocities are listed by atom id, in any order
+    ids = atoms[:, 0].astype(int)
+    velocity_ids = velocities[:, 0].astype(int)
+    order = np.argsort(velocity_ids)
+    rows = order[np.searchsorted(velocity_ids, ids, sorter=order)
+                 .clip(0, num_atoms - 1)]
+    if (velocity_ids[rows] != ids).any():
+        raise ValueError(
+            'The velocities of {} do not match its atoms'.format(path))
+    velocities = velocities[rows]
+
+    return DataFileArrays(
+        box_origin=box_origin,
+        box_vectors=box_vectors,
+        ids=ids,
+        types=atoms[:, 1].astype(int),
+        diameters=atoms[:, 2].copy(),
+        densities=atoms[:, 3].copy(),
+        coordinates=atoms[:, 4:7].copy(),
+        velocities=velocities[:, 1:4].copy(),
+        angular_velocities=velocities[:, 4:7].copy())
+
+
+def _find_sections(content):
+    """ Finds the (start, end) byte range of the body of each section """
+    headers = [(match.group(1), match.start(), match.end())
+               for match in _SECTION.finditer(content)]
+    sections = {}
+    for index, (name, _, body_start) in enumerate(headers):
+        body_end = (headers[index + 1][1] if index + 1 < len(headers)
+                    else len(content))
+        sections[name] = (body_start, body_end)
+    return sections
+
+
+def _parse_box(header):
+    """ Parses the box bounds and tilt factors of the header """
+    lower = np.zeros(3)
+    upper = np.zeros(3)
+    for match in _BOUNDS.finditer(header):
+        axis = b'xyz'.index(match.group(3))
+        lower[axis] = float(match.group(1))
+        upper[axis] = float(match.group(2))
+
+    box_vectors = np.diag(upper - lower)
+    match = _TILTS.search(header)
+    if match is not None:
+        xy, xz, yz = (float(value) for value in match.groups())
+        box_vectors[1, 0] = xy
+        box_vectors[2, 0] = xz
+        box_vectors[2, 1] = yz
+    return lower, box_vectors
+
+
+def _parse_section(content, body_range, num_atoms, widths, name):
+    """ Converts the body of a section to a (num_atoms, width) array """
+    body = content[body_range[0]:body_range[1]]
+    if b'#' in body:
+        body = b'\n'.join(line.split(b'#', 1)[0]
+                          for line in body.splitlines())
+
+    values = np.fromstring(body, dtype=np.float64, sep=' ')
+    for width in widths:
+        if len(values) == num_atoms * width:
+            return values.reshape(num_atoms, width)
+
+    raise ValueError(
+        'The {} section does not hold {} rows of {} values'.format(
+            name, num_atoms, ' or '.join(str(width) for width in widths)))
+
+
+def sidecar_path(path, cache_directory):
+    """ The path of the binary sidecar of a data file in a cache directory.
+    It is named after the absolute path of the data file.
+    """
+    name = hashlib.sha1(
+        os.path.abspath(path).encode('utf-8')).hexdigest()
+    return os.path.join(cache_directory, name + '.npz')
+
+
+def file_digest(path):
+    """ The SHA-1 hexadecimal digest of the contents of a file """
+    digest = hashlib.sha1()
+    with open(path, 'rb') as data_file:
+        for chunk in iter(lambda: data_file.read(1024 ** 2), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_data_file(path, cache_directory=None):
+    """ Loads the arrays of a data file, from its binary sidecar in the
+    cache directory when it is up to date, parsing the file and writing
+    the sidecar otherwise.
+
+    The sidecar is up to date when it records the modification time and
+    the size of the file, or failing that the SHA-1 digest of its
+    contents.
+
+    Parameters
+    ----------
+    path : str
+        The path of the data file
+    cache_directory : str
+        The directory of the sidecars. It is created if needed. If None,
+        the file is always parsed and no sidecar is written.
+
+    Returns
+    -------
+    data : DataFileArrays
+        The arrays describing the particles
+    """
+    if cache_directory is None:
+        return parse_data_file(path)
+
+    sidecar = sidecar_path(path, cache_directory)
+    stat = os.stat(path)
+    data, digest = _load_sidecar(path, sidecar, stat)
+    if data is not None:
+        return data
+
+    data = parse_data_file(path)
+    _save_sidecar(path, sidecar, stat, digest or file_digest(path), data)
+    return data
+
+
+def _load_sidecar(path, sidecar_file, stat):
+    """ Loads the sidecar of a data file if it is up to date
+
+    Returns
+    -------
+    data : DataFileArrays or None
+        The arrays of the sidecar, or None if it is missing or outdated
+    digest : str or None
+        The digest of the data file, if it was computed
+    """
+    try:
+        with np.load(sidecar_file) as sidecar:
+            if int(sidecar['version']) != SIDECAR_VERSION:
+                return None, None
+            digest = None
+            if (float(sidecar['mtime']) != stat.st_mtime or
+                    int(sidecar['size']) != stat.st_size):
+                digest = file_digest(path)
+                if str(sidecar['sha1']) != digest:
+                    return None, digest
+            data = DataFileArrays(
+                **{field: sidecar[field] for field in DataFileArrays._fields})
+    except (IOError, OSError, ValueError, KeyError):
+        return None, None
+
+    if digest is not None:
+        # Same contents with a new modification time
+        _save_sidecar(path, sidecar_file, stat, digest, data)
+    return data, digest
+
+
+def _save_sidecar(path, sidecar_file, stat, digest, data):
+    """ Writes the sidecar of a data file. Failures are logged, since the
+    sidecar is only an optimisation.
+    """
+    directory = os.path.dirname(sidecar_file)
+    try:
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        handle, temp_path = tempfile.mkstemp(dir=directory, suffix='.npz')
+        with os.fdopen(handle, 'wb') as sidecar:
+            np.savez(sidecar, version=SIDECAR_VERSION,
+                     mtime=stat.st_mtime, size=stat.st_size, sha1=digest,
+                     **data._asdict())
+        if os.name == 'nt' and os.path.exists(sidecar_file):
+            os.remove(sidecar_file)
+        os.rename(temp_path, sidecar_file)
+    except (IOError, OSError):
+        log.exception('Unable to write the sidecar of %s', path)
+
+
+def create_particles(data, atom_type, name):
+    """ Creates the particles dataset of one atom type, with the particle
+    data used by the LIGGGHTS wrapper
+
+    Parameters
+    ----------
+    data : DataFileArrays
+        The arrays describing the particles
+    atom_type : int
+        The atom type of the particles of the dataset
+    name : str
+        The name of the dataset
+
+    Returns
+    -------
+    particles : Particles
+        The particles dataset
+    """
+    from simphony.engine import liggghts
+
+    rows = np.nonzero(data.types == atom_type)[0]
+    columns = zip(
+        data.coordinates[rows].tolist(),
+        (data.diameters[rows] / 2.0).tolist(),
+        data.densities[rows].tolist(),
+        data.velocities[rows].tolist(),
+        data.angular_velocities[rows].tolist())
+
+    particles = Particles(name)
+    particles.add_particles([
+        Particle(coordinates=tuple(coordinates), data={
+            CUBA.RADIUS: radius,
+            CUBA.DENSITY: density,
+            CUBA.MATERIAL_TYPE: atom_type,
+            CUBA.VELOCITY: tuple(velocity),
+            CUBA.ANGULAR_VELOCITY: tuple(angular_velocity)})
+        for (coordinates, radius, density, velocity, angular_velocity)
+        in columns])
+
+    particles.data_extension = {
+        liggghts.CUBAExtension.BOX_ORIGIN: tuple(data.box_origin.tolist()),
+        liggghts.CUBAExtension.BOX_VECTORS: [
+            tuple(vector) for vector in data.box_vectors.tolist()],
+    }
+
+    return particles
+
+
+def read_data_file(path, cache_directory=None):
+    """ Reads the flow and wall particles of a data file, as
+    liggghts.read_data_file does
+
+    Parameters
+    ----------
+    path : str
+        The path of the data file
+    cache_directory : str
+        The directory of the sidecars. If None, no sidecar is used.
+
+    Returns
+    -------
+    flow_particles : Particles
+        The particles of type FLOW_TYPE
+    wall_particles : Particles
+        The particles of type WALL_TYPE
+    """
+    data = load_data_file(path, cache_directory)
+    return (create_particles(data, FLOW_TYPE, 'flow_particles'),
+            create_particles(data, WALL_TYPE, 'wall_particles'))
@@ -1,6 +1,9 @@
-from simphony.engine import liggghts
+import numpy as np
 from simphony.core.cuba import CUBA
 
+from simphony_ui.liggghts_model.data_file_reader import (
+    FLOW_TYPE, WALL_TYPE, create_particles, load_data_file)
+
 
 def create_liggghts_wrapper(liggghts_settings):
     """ Creates the liggghts wrapper setup from the settings as provided
@@ -16,6 +19,8 @@ def create_liggghts_wrapper(liggghts_settings):
     liggghts_wrapper : LiggghtsWrapper
         an instance of a LiggghtsWrapper, properly configured.
     """
+    from simphony.engine import liggghts
+
     liggghts_wrapper = liggghts.LiggghtsWrapper(use_internal_interface=True)
 
     # Set Computational method parameters
@@ -71,7 +76,7 @@ def create_liggghts_wrapper(liggghts_settings):
     return liggghts_wrapper
 
 
-def create_liggghts_datasets(liggghts_settings):
+def create_liggghts_datasets(liggghts_settings, cache_directory=None):
     """ Creates the liggghts particles datasets from the settings as provided
     by the model object
 
@@ -79,6 +84,9 @@ def create_liggghts_datasets(liggghts_settings):
     ----------
     liggghts_settings : LiggghtsModel
         The traited model describing the liggghts parameters
+    cache_directory : str
+        The directory of the binary sidecars of the data files, see
+        load_data_file. If None, the input file is always parsed.
 
     Returns
     -------
@@ -87,25 +95,14 @@ def create_liggghts_datasets(liggghts_settings):
     wall_particles :
         A dataset containing wall particles
     """
-    input_file = liggghts_settings.input_file
-
-    flow_particles, wall_particles = liggghts.read_data_file(input_file)
-
-    flow_particles.name = 'flow_particles'
-    wall_particles.name = 'wall_particles'
-
-    # Shift box_origin to (0,0,0) and update particles accordingly
-    box_origin = \
-        flow_particles.data_extension[liggghts.CUBAExtension.BOX_ORIGIN]
+    data = load_data_file(liggghts_settings.input_file, cache_directory)
 
-    for particle in flow_particles.iter_particles():
-        particle.coordinates = (
-            particle.coordinates[0] - box_origin[0],
-            particle.coordinates[1] - box_origin[1],
-            particle.coordinates[2] - box_origin[2])
-        flow_particles.update_particles([particle])
+    # Shift box_origin to (0,0,0) and the coordinates accordingly
+    data = data._replace(
+        coordinates=data.coordinates - data.box_origin,
+        box_origin=np.zeros(3))
 
-    flow_particles.data_extension[liggghts.CUBAExtension.BOX_ORIGIN] = \
-        (0.0, 0.0, 0.0)
+    flow_particles = create_particles(data, FLOW_TYPE, 'flow_particles')
+    wall_particles = create_particles(data, WALL_TYPE, 'wall_particles')
 
     return flow_particles, wall_particles
@@ -0,0 +1,396 @@
+import numpy as np
+
+from simphony_ui.openfoam_model.mesh_index import CellIndex, CellLocator
+
+#: The faces of the cells, by number of points, as the rows of the four
+#: points of each face in the VTK ordering of the cell points. The faces
+#: are quadrilaterals, triangles repeating their last point. Their points
+#: go around the face, so that the face diagonals are (0, 2) and (1, 3).
+CELL_FACES = {
+    # Tetrahedron
+    4: ((0, 1, 2, 2), (0, 3, 1, 1), (1, 3, 2, 2), (0, 2, 3, 3)),
+    # Pyramid
+    5: ((0, 3, 2, 1), (0, 1, 4, 4), (1, 2, 4, 4), (2, 3, 4, 4),
+        (3, 0, 4, 4)),
+    # Wedge
+    6: ((0, 1, 2, 2), (3, 5, 4, 4), (0, 3, 4, 1), (1, 4, 5, 2),
+        (2, 5, 3, 0)),
+    # Hexahedron
+    8: ((0, 3, 2, 1), (4, 5, 6, 7), (0, 1, 5, 4), (1, 2, 6, 5),
+        (2, 3, 7, 6), (3, 0, 4, 7)),
+}
+
+#: The maximum number of faces of the cells of CELL_FACES
+MAX_CELL_FACES = max(len(faces) for faces in CELL_FACES.values())
+
+#: The tolerance of the face planes, relative to the size of the cells
+FACE_TOLERANCE = 1e-9
+
+#: The largest distance of the points of a cell outside of its face
+#: planes, relative to the size of the cell, above which the face planes
+#: are not used. It is exceeded by cells whose points are not in the VTK
+#: ordering, or whose faces are strongly warped.
+MAX_FACE_WARP = 0.1
+
+
+def cell_face_planes(mesh_arrays):
+    """ Computes the planes bounding the cells of a mesh, from the points
+    of their faces. A point is inside the planes of a cell if, for each
+    face, ``dot(face_normals[cell, face], point) <=
+    face_offsets[cell, face]``.
+
+    The normal of a face is the cross product of its diagonals, so that
+    warped quadrilateral faces get an average plane. The planes of a cell
+    are loosened to contain all its points. Cells of unknown types, or
+    whose points do not fit their planes, get null planes which contain
+    every point.
+
+    Parameters
+    ----------
+    mesh_arrays : MeshArrays
+        The arrays describing the mesh
+
+    Returns
+    -------
+    face_normals : (ncells, nfaces, 3) float array
+        The outward unit normal of each face of each cell
+    face_offsets : (ncells, nfaces) float array
+        The offset of the plane of each face of each cell
+    """
+    num_cells = len(mesh_arrays.point_counts)
+    face_normals = np.zeros((num_cells, MAX_CELL_FACES, 3))
+    face_offsets = np.zeros((num_cells, MAX_CELL_FACES))
+
+    for num_points, faces in CELL_FACES.items():
+        cells = np.nonzero(mesh_arrays.point_counts == num_points)[0]
+        if len(cells) == 0:
+            continue
+        num_faces = len(faces)
+        cell_points = mesh_arrays.points[
+            mesh_arrays.connectivity[cells, :num_points]]
+        face_points = cell_points[:, np.array(faces)]
+
+        normals = np.cross(face_points[:, :, 2] - face_points[:, :, 0],
+                           face_points[:, :, 3] - face_points[:, :, 1])
+        lengths = np.sqrt((normals ** 2).sum(axis=2))
+        degenerate = (lengths == 0.0).any(axis=1)
+        normals /= np.where(lengths > 0.0, lengths, 1.0)[:, :, np.newaxis]
+
+        # Orient the normals away from the centre of the cell
+        centroids = face_points.mean(axis=2)
+        centres = cell_points.mean(axis=1)
+        inward = (normals * (centres[:, np.newaxis] - centroids)).sum(
+            axis=2) > 0.0
+        normals[inward] *= -1.0
+        offsets = (normals * centroids).sum(axis=2)
+
+        # Loosen the planes to contain the points of the cell
+        sizes = np.sqrt(((cell_points.max(axis=1) -
+                          cell_points.min(axis=1)) ** 2).sum(axis=1))
+        excess = (np.einsum('cpk,cfk->cpf', cell_points, normals) -
+                  offsets[:, np.newaxis, :]).max(axis=(1, 2))
+        excess = np.maximum(excess, 0.0) + FACE_TOLERANCE * sizes
+        offsets += excess[:, np.newaxis]
+
+        valid = ~degenerate & (excess <= MAX_FACE_WARP * sizes)
+        face_normals[cells[valid], :num_faces] = normals[valid]
+        face_offsets[cells[valid], :num_faces] = offsets[valid]
+
+    return face_normals, face_offsets
+
+
+class BinnedCellLocator(CellLocator):
+    """ Cell locator for meshes of any blocking, based on a uniform grid
+    of bins hashing the bounding boxes of the cells.
+
+    Each bin lists the cells whose bounding box overlaps it, in a
+    compressed sparse row layout: the cells of bin ``b`` are
+    ``bin_cells[bin_offsets[b]:bin_offsets[b + 1]]``. A point is located
+    by testing the few cells of its bin: the cells containing the point
+    are the ones whose bounding box contains it and which are on the inner
+    side of their face planes, see cell_face_planes. The bounding boxes of
+    the skewed or graded cells overlap, but their face planes do not.
+
+    When several cells contain the point, on a shared face or in the
+    loosened planes of warped cells, the cell with the closest centre is
+    retained. A point in no cell, in the gaps left by warped faces, is
+    located in the cell with the closest centre among the ones whose
+    bounding box contains it.
+    """
+
+    #: The maximum number of bins, relative to the number of cells
+    max_bins_per_cell = 4
+
+    def __init__(self, cell_uids, lower_corners, upper_corners,
+                 origin, bin_size, num_bins, bin_offsets, bin_cells,
+                 face_normals, face_offsets):
+        super(BinnedCellLocator, self).__init__(
+            cell_uids, lower_corners, upper_corners)
+
+        #: (3,) float array of the lower corner of the binned domain
+        self.origin = origin
+
+        #: (3,) float array of the size of a bin
+        self.bin_size = bin_size
+
+        #: (3,) int array of the number of bins in each direction
+        self.num_bins = num_bins
+
+        #: (nbins + 1,) int array of the offsets of each bin in bin_cells
+        self.bin_offsets = bin_offsets
+
+        #: int array of the cell rows of all the bins
+        self.bin_cells = bin_cells
+
+        #: (ncells, nfaces, 3) float array of the outward normals of the
+        #: faces of each cell, see cell_face_planes
+        self.face_normals = face_normals
+
+        #: (ncells, nfaces) float array of the offsets of the face planes
+        self.face_offsets = face_offsets
+
+        self._centres = (lower_corners + upper_corners) / 2.0
+
+    @classmethod
+    def from_arrays(cls, mesh_arrays):
+        """ Builds the locator from the arrays describing a mesh
+
+        Parameters
+        ----------
+        mesh_arrays : MeshArrays
+            The arrays describing the mesh
+
+        Returns
+        -------
+        locator : BinnedCellLocator
+            The locator of the cells of the mesh
+        """
+        cell_points = mesh_arrays.points[mesh_arrays.connectivity]
+        lower_corners = cell_points.min(axis=1)
+        upper_corners = cell_points.max(axis=1)
+        num_cells = len(lower_corners)
+
+        origin = lower_corners.min(axis=0)
+        extent = upper_corners.max(axis=0) - origin
+
+        # Bins of the size of a typical cell, enlarged if there would
+        # be too many of them
+        bin_size = np.median(upper_corners - lower_corners, axis=0)
+        bin_size = np.where(bin_size > 0.0, bin_size, extent)
+        bin_size = np.where(bin_size > 0.0, bin_size, 1.0)
+        num_bins = np.maximum(np.ceil(extent / bin_size), 1)
+        excess = num_bins.prod() / float(
+            cls.max_bins_per_cell * max(num_cells, 1))
+        if excess > 1.0:
+            bin_size *= excess ** (1.0 / 3.0)
+            num_bins = np.maximum(np.ceil(extent / bin_size), 1)
+        num_bins = num_bins.astype(int)
+
+        # Enumerate every (cell, bin) overlap at once
+        first = cls._clip_bins(
+            np.floor((lower_corners - origin) / bin_size), num_bins)
+        last = cls._clip_bins(
+            np.floor((upper_corners - origin) / bin_size), num_bins)
+        spans = last - first + 1
+        counts = spans.prod(axis=1)
+
+        cells = np.repeat(np.arange(num_cells), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(
+            np.cumsum(counts) - counts, counts)
+        span = spans[cells]
+        bins_ijk = first[cells] + np.column_stack((
+            offsets // (span[:, 1] * span[:, 2]),
+            (offsets // span[:, 2]) % span[:, 1],
+            offsets % span[:, 2]))
+        bins = np.ravel_multi_index(bins_ijk.T, num_bins)
+
+        order = np.argsort(bins, kind='mergesort')
+        bin_cells = cells[order]
+        bin_offsets = np.concatenate((
+            [0], np.cumsum(np.bincount(bins, minlength=num_bins.prod()))))
+
+        face_normals, face_offsets = cell_face_planes(mesh_arrays)
+
+        return cls(mesh_arrays.cell_uids, lower_corners, upper_corners,
+                   origin, bin_size, num_bins, bin_offsets, bin_cells,
+                   face_normals, face_offsets)
+
+    @staticmethod
+    def _clip_bins(indices, num_bins):
+        return np.clip(indices, 0, num_bins - 1).astype(int)
+
+    def contains(self, rows, coordinates):
+        """ Checks whether points are in given cells, in their bounding
+        box and on the inner side of their face planes
+
+        Parameters
+        ----------
+        rows : (npoints,) int array
+            The rows in cell_uids of the cells
+        coordinates : (npoints, 3) float array
+            The coordinates of the points
+
+        Returns
+        -------
+        inside : (npoints,) bool array
+            Whether each point is in its cell
+        """
+        return super(BinnedCellLocator, self).contains(
+            rows, coordinates) & (
+            np.einsum('pk,pfk->pf', coordinates, self.face_normals[rows]) <=
+            self.face_offsets[rows]).all(axis=1)
+
+    def locate(self, coordinates):
+        """ Finds the row of the cell containing each point. Points
+        outside of the meshed domain are first wrapped around it, as
+        with periodic boundaries.
+
+        Parameters
+        ----------
+        coordinates : (npoints, 3) float array
+            The coordinates of the points
+
+        Returns
+        -------
+        rows : (npoints,) int array
+            The rows in cell_uids of the cells containing the points
+
+        Raises
+        ------
+        ValueError
+            If a point is not contained in any cell
+        """
+        points = np.asarray(coordinates, dtype=np.float64).reshape(-1, 3)
+        domain_upper = self.upper_corners.max(axis=0)
+        outside = (points < self.origin) | (points > domain_upper)
+        if outside.any():
+            wrapped = self.origin + np.mod(
+                points - self.origin, domain_upper - self.origin)
+            points = np.where(outside, wrapped, points)
+
+        bins = np.ravel_multi_index(
+            self._clip_bins(
+                np.floor((points - self.origin) / self.bin_size),
+                self.num_bins).T,
+            self.num_bins)
+        starts = self.bin_offsets[bins]
+        sizes = self.bin_offsets[bins + 1] - starts
+
+        # The closest cell containing each point, and the closest cell
+        # whose bounding box contains it
+        rows = np.full(len(points), -1, dtype=int)
+        distances = np.full(len(points), np.inf)
+        box_rows = np.full(len(points), -1, dtype=int)
+        box_distances = np.full(len(points), np.inf)
+        for slot in range(sizes.max() if len(sizes) else 0):
+            candidates = np.nonzero(sizes > slot)[0]
+            cells = self.bin_cells[starts[candidates] + slot]
+            candidate_points = points[candidates]
+            in_box = super(BinnedCellLocator, self).contains(
+                cells, candidate_points)
+            in_cell = in_box & (
+                np.einsum('pk,pfk->pf', candidate_points,
+                          self.face_normals[cells]) <=
+                self.face_offsets[cells]).all(axis=1)
+            candidate_distances = (
+                (candidate_points - self._centres[cells]) ** 2).sum(axis=1)
+
+            better = in_box & (
+                candidate_distances < box_distances[candidates])
+            box_rows[candidates[better]] = cells[better]
+            box_distances[candidates[better]] = candidate_distances[better]
+
+            better = in_cell & (candidate_distances < distances[candidates])
+            rows[candidates[better]] = cells[better]
+            distances[candidates[better]] = candidate_distances[better]
+
+        rows = np.where(rows == -1, box_rows, rows)
+
+        if (rows == -1).any():
+            raise ValueError(
+                '{} points are not contained in any cell'.format(
+                    (rows == -1).sum()))
+
+        return rows
+
+
+class IncrementalCellLocator(object):
+    """ Locates a set of moving particles, remembering the cell of each
+    particle between calls so that only the particles that left their
+    cell are searched again.
+
+    Particles are identified by their row in the coordinates array, which
+    must not change between calls. A call with a different number of
+    particles starts over with a full search.
+    """
+
+    def __init__(self, locator):
+        #: The locator used to search the cells of the particles
+        self.locator = locator
+
+        #: The number of particles searched during the last call
+        self.num_relocated = 0
+
+        self._rows = None
+
+    def reset(self):
+        """ Forgets the cells of the particles """
+        self._rows = None
+
+    def locate(self, coordinates):
+        """ Finds the row of the cell containing each particle
+
+        Parameters
+        ----------
+        coordinates : (nparticles, 3) float array
+            The coordinates of the particles
+
+        Returns
+        -------
+        rows : (nparticles,) int array
+            The rows in cell_uids of the cells containing the particles
+        """
+        points = np.asarray(coordinates, dtype=np.float64).reshape(-1, 3)
+
+        if self._rows is None or len(self._rows) != len(points):
+            self._rows = self.locator.locate(points)
+            self.num_relocated = len(points)
+            return self._rows.copy()
+
+        moved = ~self.locator.contains(self._rows, points)
+        self.num_relocated = int(moved.sum())
+        if self.num_relocated:
+            self._rows[moved] = self.locator.locate(points[moved])
+
+        return self._rows.copy()
+
+
+def create_cell_locator(mesh_arrays, channel_size, num_grid):
+    """ Creates the fastest cell locator suitable for a mesh: the dense
+    Cartesian CellIndex if the mesh is a regular grid of channel_size
+    divided in num_grid elements, a BinnedCellLocator otherwise.
+
+    Parameters
+    ----------
+    mesh_arrays : MeshArrays
+        The arrays describing the mesh
+    channel_size : sequence of 3 floats
+        The size of the channel in each direction
+    num_grid : sequence of 3 ints
+        The number of elements in each direction
+
+    Returns
+    -------
+    locator : CellLocator
+        The locator of the cells of the mesh
+    """
+    try:
+        cell_index = CellIndex.from_arrays(
+            mesh_arrays, channel_size, num_grid)
+    except ValueError:
+        pass
+    else:
+        if cell_index.is_regular():
+            return cell_index
+
+    return BinnedCellLocator.from_arrays(mesh_arrays)
@@ -0,0 +1,341 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+import uuid
+
+import numpy as np
+from simphony.core.cuds_item import CUDSItem
+
+from simphony_ui.openfoam_model.cell_locator import (
+    BinnedCellLocator, create_cell_locator)
+from simphony_ui.openfoam_model.mesh_index import (
+    CellIndex, MeshArrays, extract_mesh_arrays)
+
+log = logging.getLogger(__name__)
+
+#: The default maximum size of a cache directory, in bytes
+DEFAULT_MAX_SIZE = 1024 ** 3
+
+#: The locator classes which can be cached, with the names of their
+#: array attributes
+LOCATOR_ARRAYS = {
+    'CellIndex': (
+        CellIndex,
+        ('table', 'grid_size', 'lower_corners', 'upper_corners')),
+    'BinnedCellLocator': (
+        BinnedCellLocator,
+        ('lower_corners', 'upper_corners', 'origin', 'bin_size',
+         'num_bins', 'bin_offsets', 'bin_cells', 'face_normals',
+         'face_offsets')),
+}
+
+#: The age, in seconds, after which a temporary directory of a cache is
+#: considered left by a process which stopped while writing an entry
+TEMPORARY_ENTRY_LIFETIME = 3600
+
+#: The number of cells whose points are checked against the mesh when
+#: loading a cache entry. The cell count and the order of all the cell
+#: uids are always checked.
+NUM_CHECKED_CELLS = 8
+
+
+def mesh_cache_key(openfoam_settings):
+    """ Computes the key identifying a mesh in the caches: a hash of the
+    mesh type, the channel size, the number of grid elements and, for the
+    block meshes, the mesh input file contents. The input file is not
+    read for the quad meshes, which do not use it.
+
+    Parameters
+    ----------
+    openfoam_settings : OpenfoamModel
+        The traited model describing the openfoam parameters
+
+    Returns
+    -------
+    key : str
+        The hexadecimal digest identifying the mesh
+    """
+    digest = hashlib.sha1()
+    if openfoam_settings.mesh_type == 'block':
+        with open(openfoam_settings.input_file, 'rb') as input_file:
+            for chunk in iter(lambda: input_file.read(1024 ** 2), b''):
+                digest.update(chunk)
+    digest.update(repr((
+        openfoam_settings.mesh_type,
+        openfoam_settings.channel_size_x,
+        openfoam_settings.channel_size_y,
+        openfoam_settings.channel_size_z,
+        openfoam_settings.num_grid_x,
+        openfoam_settings.num_grid_y,
+        openfoam_settings.num_grid_z)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def default_cache_directory(openfoam_settings, name, root=None):
+    """ The directory of a cache, under the output path of the settings
+    unless another root directory is given
+
+    Parameters
+    ----------
+    openfoam_settings : OpenfoamModel
+        The traited model describing the openfoam parameters
+    name : str
+        The name of the cache
+    root : str
+        The directory holding the caches. If None, the caches are in
+        <output_path>/cache.
+
+    Returns
+    -------
+    directory : str
+        The path of the cache directory
+    """
+    if root is None:
+        root = os.path.join(openfoam_settings.output_path, 'cache')
+    return os.path.join(root, name)
+
+
+def directory_size(path):
+    """ The total size of the files under a directory, in bytes """
+    size = 0
+    for root, _, files in os.walk(path):
+        for filename in files:
+            size += os.path.getsize(os.path.join(root, filename))
+    return size
+
+
+def evict(directory, max_size, keep=None):
+    """ Removes the least recently used entries of a cache directory
+    until its total size is below max_size. The temporary directories,
+    whose names start with a dot, are entries being written, possibly by
+    another process sharing the cache: they are not counted, and only
+    removed once older than TEMPORARY_ENTRY_LIFETIME.
+
+    Parameters
+    ----------
+    directory : str
+        The cache directory, holding one sub-directory per entry
+    max_size : int
+        The maximum total size of the entries, in bytes
+    keep : str
+        The name of an entry which must not be removed
+    """
+    entries = []
+    now = time.time()
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if not os.path.isdir(path):
+            continue
+        if name.startswith('.'):
+            try:
+                if now - os.path.getmtime(path) > TEMPORARY_ENTRY_LIFETIME:
+                    shutil.rmtree(path, ignore_errors=True)
+            except OSError:
+                # Renamed into an entry in the meantime
+                pass
+        else:
+            entries.append(
+                (os.path.getmtime(path), directory_size(path), name))
+
+    total_size = sum(size for _, size, _ in entries)
+    for _, size, name in sorted(entries):
+        if total_size <= max_size:
+            break
+        if name == keep:
+            continue
+        shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+        total_size -= size
+
+
+class CellLocatorCache(object):
+    """ On-disk cache of the mesh arrays and the cell locator of meshes.
+
+    Each entry is a directory named after the mesh key, holding the arrays
+    in .npy files which are memory-mapped on load. Least recently used
+    entries are evicted when the total size exceeds max_size.
+    """
+
+    def __init__(self, directory, max_size=DEFAULT_MAX_SIZE):
+        #: The cache directory
+        self.directory = directory
+
+        #: The maximum total size of the cache, in bytes
+        self.max_size = max_size
+
+    def load(self, key, mesh):
+        """ Loads the entry of a mesh
+
+        Parameters
+        ----------
+        key : str
+            The key of the mesh
+        mesh : ABCMesh
+            The mesh, against which the entry is checked
+
+        Returns
+        -------
+        entry : (MeshArrays, CellLocator) or None
+            The mesh arrays and the cell locator, or None if the cache
+            holds no valid entry for the mesh
+        """
+        path = os.path.join(self.directory, key)
+        try:
+            with open(os.path.join(path, 'index.json')) as index_file:
+                index = json.load(index_file)
+            arrays = {
+                name: np.load(
+                    os.path.join(path, name + '.npy'), mmap_mode='r')
+                for name in index['arrays']}
+            locator_class, names = LOCATOR_ARRAYS[index['locator']]
+        except (IOError, OSError, ValueError, KeyError):
+            return None
+        if not set(names).issubset(arrays):
+            # An entry written by an older version of the locator
+            return None
+
+        cell_uids = np.empty(len(arrays['cell_uids']), dtype=object)
+        cell_uids[:] = [
+            uuid.UUID(bytes=uid.tobytes()) for uid in arrays['cell_uids']]
+        mesh_arrays = MeshArrays(
+            arrays['points'], arrays['connectivity'],
+            arrays['point_counts'], cell_uids)
+
+        if not self._matches(mesh, mesh_arrays, arrays['cell_uids']):
+            log.warning('Discarding the cell locator cache entry %s which '
+                        'does not match the mesh', key)
+            return None
+
+        locator = locator_class(
+            cell_uids=cell_uids,
+            **{name: arrays[name] for name in names})
+
+        os.utime(path, None)
+        return mesh_arrays, locator
+
+    def save(self, key, mesh_arrays, locator):
+        """ Saves the entry of a mesh, then evicts the least recently used
+        entries if the cache is too large. Failures are logged, since the
+        cache is only an optimisation.
+
+        Parameters
+        ----------
+        key : str
+            The key of the mesh
+        mesh_arrays : MeshArrays
+            The arrays describing the mesh
+        locator : CellLocator
+            The cell locator of the mesh
+        """
+        locator_name = type(locator).__name__
+        names = LOCATOR_ARRAYS[locator_name][1]
+        arrays = {name: getattr(locator, name) for name in names}
+        arrays.update({
+            'points': mesh_arrays.points,
+            'connectivity': mesh_arrays.connectivity,
+            'point_counts': mesh_arrays.point_counts,
+            'cell_uids': np.frombuffer(
+                b''.join(uid.bytes for uid in mesh_arrays.cell_uids),
+                dtype=np.uint8).reshape(-1, 16),
+        })
+
+        try:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+            temp_path = tempfile.mkdtemp(dir=self.directory, prefix='.')
+            for name, array in arrays.items():
+                np.save(os.path.join(temp_path, name + '.npy'), array)
+            with open(os.path.join(temp_path, 'index.json'), 'w') as index:
+                json.dump(
+                    {'locator': locator_name, 'arrays': sorted(arrays)},
+                    index)
+
+            path = os.path.join(self.directory, key)
+            shutil.rmtree(path, ignore_errors=True)
+            os.rename(temp_path, path)
+
+            evict(self.directory, self.max_size, keep=key)
+        except (IOError, OSError):
+            log.exception('Unable to save the cell locator cache entry')
+
+    @staticmethod
+    def _matches(mesh, mesh_arrays, uid_bytes):
+        """ Checks the cell count and the order of the cell uids of the
+        cached arrays against the mesh, and the points of a sample of the
+        cells """
+        num_cells = len(mesh_arrays.cell_uids)
+        if mesh.count_of(CUDSItem.CELL) != num_cells:
+            return False
+
+        # The rows of the cached arrays follow the iteration order of the
+        # cells, which changes if the engine renumbers them
+        digest = hashlib.sha1()
+        for cell in mesh.iter_cells():
+            digest.update(cell.uid.bytes)
+        if digest.digest() != hashlib.sha1(
+                np.ascontiguousarray(uid_bytes).tobytes()).digest():
+            return False
+
+        rows = np.unique(np.linspace(
+            0, num_cells - 1, min(NUM_CHECKED_CELLS, num_cells)).astype(int))
+        try:
+            for row in rows:
+                cell = mesh.get_cell(mesh_arrays.cell_uids[row])
+                count = mesh_arrays.point_counts[row]
+                cached = mesh_arrays.points[
+                    mesh_arrays.connectivity[row, :count]]
+                actual = [mesh.get_point(uid).coordinates
+                          for uid in cell.points]
+                if not np.allclose(cached, actual):
+                    return False
+        except (KeyError, ValueError):
+            return False
+        return True
+
+
+def cached_cell_locator(mesh, openfoam_settings, channel_size, num_grid,
+                        cache=None, key=None):
+    """ Gets the mesh arrays and the cell locator of a mesh from the cache,
+    building and caching them if needed
+
+    Parameters
+    ----------
+    mesh : ABCMesh
+        The mesh
+    openfoam_settings : OpenfoamModel
+        The traited model describing the openfoam parameters
+    channel_size : sequence of 3 floats
+        The size of the channel in each direction
+    num_grid : sequence of 3 ints
+        The number of elements in each direction
+    cache : CellLocatorCache
+        The cache to use. If None, a cache in the default directory
+        under the output path is used.
+    key : str
+        The key of the mesh, as computed by mesh_cache_key. If None, it is
+        computed from the settings.
+
+    Returns
+    -------
+    mesh_arrays : MeshArrays
+        The arrays describing the mesh
+    locator : CellLocator
+        The cell locator of the mesh
+    """
+    if cache is None:
+        cache = CellLocatorCache(
+            default_cache_directory(openfoam_settings, 'cell_locator'))
+
+    if key is None:
+        key = mesh_cache_key(openfoam_settings)
+    entry = cache.load(key, mesh)
+    if entry is not None:
+        return entry
+
+    mesh_arrays = extract_mesh_arrays(mesh)
+    locator = create_cell_locator(mesh_arrays, channel_size, num_grid)
+    cache.save(key, mesh_arrays, locator)
+    return mesh_arrays, locator
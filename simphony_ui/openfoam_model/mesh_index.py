@@ -0,0 +1,358 @@
+import abc
+from collections import namedtuple
+
+import numpy as np
+
+
+#: Contiguous array description of a mesh.
+#:
+#: points : (npoints, 3) float64 array of point coordinates.
+#: connectivity : (ncells, max_points_per_cell) int array of rows in
+#:     points. Cells with fewer points are padded with their last point.
+#: point_counts : (ncells,) int array of the number of points of each cell.
+#: cell_uids : (ncells,) object array of the uids of the cells.
+MeshArrays = namedtuple(
+    'MeshArrays', ['points', 'connectivity', 'point_counts', 'cell_uids'])
+
+
+def extract_mesh_arrays(mesh):
+    """ Pulls the point coordinates and the cell connectivity of a mesh
+    into contiguous arrays, iterating once over the points and once over
+    the cells
+
+    Parameters
+    ----------
+    mesh : ABCMesh
+        The mesh to extract
+
+    Returns
+    -------
+    mesh_arrays : MeshArrays
+        The arrays describing the mesh
+    """
+    point_rows = {}
+    coordinates = []
+    for row, point in enumerate(mesh.iter_points()):
+        point_rows[point.uid] = row
+        coordinates.append(point.coordinates)
+
+    cell_uids = []
+    flat_connectivity = []
+    point_counts = []
+    for cell in mesh.iter_cells():
+        cell_uids.append(cell.uid)
+        point_counts.append(len(cell.points))
+        flat_connectivity.extend(point_rows[uid] for uid in cell.points)
+
+    points = np.array(coordinates, dtype=np.float64).reshape(-1, 3)
+    flat_connectivity = np.array(flat_connectivity, dtype=int)
+    point_counts = np.array(point_counts, dtype=int)
+
+    # Build the padded (ncells, width) connectivity with a single gather
+    width = point_counts.max() if len(point_counts) else 0
+    starts = np.cumsum(point_counts) - point_counts
+    columns = np.minimum(np.arange(width), point_counts[:, np.newaxis] - 1)
+    connectivity = flat_connectivity[starts[:, np.newaxis] + columns]
+
+    uids = np.empty(len(cell_uids), dtype=object)
+    uids[:] = cell_uids
+
+    return MeshArrays(points, connectivity, point_counts, uids)
+
+
+def extract_cell_data(mesh, cell_rows, cuba_key, out=None):
+    """ Copies the value of a cell data of every cell of a mesh into an
+    array, iterating once over the cells
+
+    Parameters
+    ----------
+    mesh : ABCMesh
+        The mesh to read
+    cell_rows : dict
+        The row of each cell in the returned array, by cell uid
+    cuba_key : CUBA
+        The key of the cell data to copy
+    out : ndarray
+        An array of the right shape in which the values are copied.
+        If None, a new array is allocated.
+
+    Returns
+    -------
+    values : (ncells,) or (ncells, ndim) float64 array
+        The value of the cell data of each cell
+    """
+    rows = []
+    values = []
+    for cell in mesh.iter_cells():
+        rows.append(cell_rows[cell.uid])
+        values.append(cell.data[cuba_key])
+
+    values = np.array(values, dtype=np.float64)
+    if out is None or out.shape != values.shape:
+        out = np.empty_like(values)
+    out[rows] = values
+
+    return out
+
+
+def update_cell_data(mesh, cell_rows, values):
+    """ Sets cell data of every cell of a mesh from arrays, iterating once
+    over the cells and updating them with a single update_cells call. It
+    is the counterpart of extract_cell_data.
+
+    Parameters
+    ----------
+    mesh : ABCMesh
+        The mesh to update
+    cell_rows : dict
+        The row of each cell in the arrays, by cell uid
+    values : dict
+        The (ncells,) or (ncells, ndim) array of each cell data to set,
+        by CUBA key
+    """
+    lists = {cuba_key: array.tolist() for cuba_key, array in values.items()}
+
+    cells = []
+    for cell in mesh.iter_cells():
+        row = cell_rows[cell.uid]
+        for cuba_key, value in lists.items():
+            value = value[row]
+            cell.data[cuba_key] = (
+                tuple(value) if isinstance(value, list) else value)
+        cells.append(cell)
+
+    mesh.update_cells(cells)
+
+
+class CellLocator(object):
+    """ Base class of the objects finding the mesh cells containing a set
+    of points. Cells are identified by their row in ``cell_uids``.
+    """
+    __metaclass__ = abc.ABCMeta
+
+    def __init__(self, cell_uids, lower_corners, upper_corners):
+        #: (ncells,) object array of the uids of the cells
+        self.cell_uids = cell_uids
+
+        #: (ncells, 3) float array of the lower-left corner of each cell
+        self.lower_corners = lower_corners
+
+        #: (ncells, 3) float array of the upper-right corner of each cell
+        self.upper_corners = upper_corners
+
+        self._cell_rows = None
+
+    @property
+    def cell_rows(self):
+        """ The row of each cell in cell_uids, by cell uid """
+        if self._cell_rows is None:
+            self._cell_rows = {
+                uid: row for row, uid in enumerate(self.cell_uids)}
+        return self._cell_rows
+
+    def contains(self, rows, coordinates):
+        """ Checks whether points are in given cells
+
+        Parameters
+        ----------
+        rows : (npoints,) int array
+            The rows in cell_uids of the cells
+        coordinates : (npoints, 3) float array
+            The coordinates of the points
+
+        Returns
+        -------
+        inside : (npoints,) bool array
+            Whether each point is in its cell
+        """
+        return (
+            (coordinates >= self.lower_corners[rows]) &
+            (coordinates <= self.upper_corners[rows])).all(axis=1)
+
+    @abc.abstractmethod
+    def locate(self, coordinates):
+        """ Finds the row of the cell containing each point
+
+        Parameters
+        ----------
+        coordinates : (npoints, 3) float array
+            The coordinates of the points
+
+        Returns
+        -------
+        rows : (npoints,) int array
+            The rows in cell_uids of the cells containing the points
+        """
+
+
+class CellIndex(CellLocator):
+    """ Dense lookup table of the cells of a regular Cartesian mesh.
+
+    ``table[i, j, k]`` holds the row in ``cell_uids`` of the cell whose
+    lower-left corner lies at ``(i, j, k) * grid_size``, or -1 if no cell
+    was found there.
+    """
+
+    def __init__(self, table, cell_uids, grid_size, lower_corners,
+                 upper_corners):
+        super(CellIndex, self).__init__(
+            cell_uids, lower_corners, upper_corners)
+
+        #: (num_grid_x, num_grid_y, num_grid_z) int array of cell rows
+        self.table = table
+
+        #: (3,) float array of the size of a grid element
+        self.grid_size = grid_size
+
+    @property
+    def num_grid(self):
+        return np.array(self.table.shape)
+
+    def is_regular(self, tolerance=1e-6):
+        """ Tells if every cell exactly covers its own grid element, so
+        that the table gives the right cell for any point of the grid
+
+        Parameters
+        ----------
+        tolerance : float
+            The tolerance on the cell corners, relative to the grid size
+
+        Returns
+        -------
+        regular : bool
+            True if the mesh is a regular Cartesian grid
+        """
+        indices = np.round(self.lower_corners / self.grid_size)
+        atol = tolerance * self.grid_size
+        fits = (
+            (np.abs(self.lower_corners - indices * self.grid_size) <=
+             atol).all() and
+            (np.abs(self.upper_corners - (indices + 1) * self.grid_size) <=
+             atol).all())
+        unique = (self.table != -1).sum() == len(self.cell_uids)
+        return bool(fits and unique)
+
+    @classmethod
+    def from_mesh(cls, mesh, channel_size, num_grid):
+        """ Builds the cell index of a mesh
+
+        Parameters
+        ----------
+        mesh : ABCMesh
+            The mesh to index
+        channel_size : sequence of 3 floats
+            The size of the channel in each direction
+        num_grid : sequence of 3 ints
+            The number of elements in each direction
+
+        Returns
+        -------
+        cell_index : CellIndex
+            The index of the cells of the mesh
+        """
+        return cls.from_arrays(
+            extract_mesh_arrays(mesh), channel_size, num_grid)
+
+    @classmethod
+    def from_arrays(cls, mesh_arrays, channel_size, num_grid):
+        """ Builds the cell index from the arrays describing a mesh
+
+        Parameters
+        ----------
+        mesh_arrays : MeshArrays
+            The arrays describing the mesh
+        channel_size : sequence of 3 floats
+            The size of the channel in each direction
+        num_grid : sequence of 3 ints
+            The number of elements in each direction
+
+        Returns
+        -------
+        cell_index : CellIndex
+            The index of the cells of the mesh
+
+        Raises
+        ------
+        ValueError
+            If the cells of the mesh do not fit on the grid
+        """
+        num_grid = np.asarray(num_grid, dtype=int)
+        grid_size = np.asarray(channel_size, dtype=np.float64) / num_grid
+
+        cell_points = mesh_arrays.points[mesh_arrays.connectivity]
+        lower_corners = cell_points.min(axis=1)
+        upper_corners = cell_points.max(axis=1)
+        indices = np.round(lower_corners / grid_size).astype(int)
+
+        if ((indices < 0) | (indices >= num_grid)).any():
+            raise ValueError(
+                'The mesh cells do not fit on a {} grid'.format(
+                    'x'.join(str(n) for n in num_grid)))
+
+        # As with the former dictionary, when several cells fall on the
+        # same grid element the last one wins.
+        table = np.full(num_grid, -1, dtype=int)
+        table[indices[:, 0], indices[:, 1], indices[:, 2]] = \
+            np.arange(len(indices))
+
+        return cls(table, mesh_arrays.cell_uids, grid_size, lower_corners,
+                   upper_corners)
+
+    def grid_indices(self, coordinates):
+        """ Computes the (i, j, k) grid element containing each point.
+        Points lying one element outside the grid, as happens with
+        periodic boundaries, are wrapped around.
+
+        Parameters
+        ----------
+        coordinates : (npoints, 3) float array
+            The coordinates of the points
+
+        Returns
+        -------
+        indices : (npoints, 3) int array
+            The grid indices of the points
+
+        Raises
+        ------
+        ValueError
+            If a point lies outside the grid
+        """
+        num_grid = self.num_grid
+        indices = np.floor(
+            np.asarray(coordinates, dtype=np.float64) / self.grid_size
+        ).astype(int)
+        indices = np.where(indices == num_grid, 0, indices)
+        indices = np.where(indices == -1, num_grid - 1, indices)
+
+        if ((indices < 0) | (indices >= num_grid)).any():
+            raise ValueError('Some points lie outside of the grid')
+
+        return indices
+
+    def locate(self, coordinates):
+        """ Finds the row of the cell containing each point
+
+        Parameters
+        ----------
+        coordinates : (npoints, 3) float array
+            The coordinates of the points
+
+        Returns
+        -------
+        rows : (npoints,) int array
+            The rows in cell_uids of the cells containing the points
+
+        Raises
+        ------
+        ValueError
+            If a point lies outside the grid or on a grid element
+            without cell
+        """
+        indices = self.grid_indices(coordinates)
+        rows = self.table[indices[:, 0], indices[:, 1], indices[:, 2]]
+
+        if (rows == -1).any():
+            raise ValueError('Some points lie on grid elements without cell')
+
+        return rows
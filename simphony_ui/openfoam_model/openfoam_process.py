@@ -0,0 +1,198 @@
+""" Running the Openfoam wrapper in a child process, concurrently with the
+Liggghts calculation of the parent process.
+
+The child process runs the Openfoam steps one after the other and
+publishes the cell fields of each step in one of two shared memory
+buffers. While the parent computes the drag forces and runs Liggghts
+for a step from one buffer, the child already runs the next Openfoam
+step into the other buffer.
+
+The child process is forked from the parent, so that it inherits the
+configured wrapper and mesh instead of pickling them. On Python 2.7,
+multiprocessing can only fork, and the child only gets a copy of the
+calling thread: the locks held by the other threads of the parent stay
+locked in the child. Starting the child from a multithreaded process,
+such as the GUI with its Qt and VTK threads, can therefore deadlock it.
+The process is meant for the batch and sweep commands, and the GUI runs
+the calculations in the 'sequential' coupling mode.
+"""
+import ctypes
+import multiprocessing
+import traceback
+from Queue import Empty
+
+import numpy as np
+from simphony.core.cuba import CUBA
+from simphony.cuds.mesh import Mesh
+
+from simphony_ui.openfoam_model.mesh_index import extract_cell_data
+
+#: The number of shared buffers of the cell fields
+NUM_BUFFERS = 2
+
+#: How often the parent checks that the child process is alive while
+#: waiting for a step, in seconds
+POLL_INTERVAL = 1.0
+
+
+def needs_cell_fields(step, num_iterations, update_frequency):
+    """ Whether all the cell fields of a step are needed by the parent
+    process, because the step is reported to the progress callback or is
+    the last step of the calculation. For the other steps, only the
+    velocities are needed by the coupling.
+    """
+    return (step % update_frequency == 0 or
+            step == num_iterations - 1)
+
+
+def copy_mesh(mesh, name):
+    """ Copies the points, faces and cells of a mesh into an in-memory
+    mesh, keeping their uids.
+
+    Parameters
+    ----------
+    mesh : ABCMesh
+        The mesh to copy
+    name : str
+        The name of the copy
+
+    Returns
+    -------
+    mesh_copy : Mesh
+        The copy of the mesh
+    """
+    mesh_copy = Mesh(name)
+    mesh_copy.add_points(list(mesh.iter_points()))
+    mesh_copy.add_faces(list(mesh.iter_faces()))
+    mesh_copy.add_cells(list(mesh.iter_cells()))
+    return mesh_copy
+
+
+def _shared_array(shape):
+    """ A float64 array in shared memory, inherited by forked children """
+    raw = multiprocessing.RawArray(ctypes.c_double, int(np.prod(shape)))
+    return np.frombuffer(raw, dtype=np.float64).reshape(shape)
+
+
+class OpenfoamProcess(object):
+    """ Runs the steps of an Openfoam wrapper in a child process, at most
+    one step ahead of the parent.
+
+    The parent calls fetch for every step, in order. fetch waits for the
+    step to be computed, copies its cell fields and hands the buffer back
+    to the child.
+    """
+
+    def __init__(self, openfoam_wrapper, mesh, cell_rows, num_iterations,
+                 update_frequency):
+        """
+        Parameters
+        ----------
+        openfoam_wrapper : Wrapper
+            The configured Openfoam wrapper, holding the mesh
+        mesh : ABCMesh
+            The mesh dataset of the wrapper
+        cell_rows : dict
+            The row of each cell in the field arrays, by cell uid
+        num_iterations : int
+            The number of steps to run
+        update_frequency : int
+            How often the pressures are needed by the parent, see
+            needs_cell_fields
+        """
+        num_cells = len(cell_rows)
+
+        self.num_iterations = num_iterations
+        self.update_frequency = update_frequency
+
+        self._velocities = [
+            _shared_array((num_cells, 3)) for _ in range(NUM_BUFFERS)]
+        self._pressures = [
+            _shared_array((num_cells,)) for _ in range(NUM_BUFFERS)]
+
+        # A buffer is either free for the child to write the next step
+        # into, or ready for the parent to read.
+        self._free = [multiprocessing.Semaphore(1)
+                      for _ in range(NUM_BUFFERS)]
+        self._ready = [multiprocessing.Semaphore(0)
+                       for _ in range(NUM_BUFFERS)]
+        self._errors = multiprocessing.Queue()
+
+        self._process = multiprocessing.Process(
+            target=self._run, args=(openfoam_wrapper, mesh, cell_rows))
+        self._process.daemon = True
+
+    def start(self):
+        """ Starts the child process. It is forked, so it must not be
+        started from a process running other threads, see the module
+        documentation.
+        """
+        self._process.start()
+
+    def fetch(self, step, velocities, pressures=None):
+        """ Waits for an Openfoam step and copies its cell fields
+
+        Parameters
+        ----------
+        step : int
+            The step, which must follow the previously fetched one
+        velocities : (ncells, 3) float array
+            The array in which the cell velocities are copied
+        pressures : (ncells,) float array
+            The array in which the cell pressures are copied. The
+            pressures are only available for the steps for which
+            needs_cell_fields is True.
+
+        Raises
+        ------
+        RuntimeError
+            If the child process failed
+        """
+        buffer_index = step % NUM_BUFFERS
+        while not self._ready[buffer_index].acquire(True, POLL_INTERVAL):
+            if not self._process.is_alive():
+                raise RuntimeError(
+                    'The Openfoam process stopped before step {}:\n'
+                    '{}'.format(step, self._error()))
+
+        velocities[...] = self._velocities[buffer_index]
+        if pressures is not None:
+            pressures[...] = self._pressures[buffer_index]
+        self._free[buffer_index].release()
+
+    def close(self):
+        """ Stops the child process if it is still running """
+        if self._process.is_alive():
+            self._process.terminate()
+        self._process.join()
+
+    def _error(self):
+        """ The traceback sent by the failed child process, if any """
+        try:
+            return self._errors.get(True, POLL_INTERVAL)
+        except Empty:
+            return 'exit code {}'.format(self._process.exitcode)
+
+    def _run(self, openfoam_wrapper, mesh, cell_rows):
+        """ The loop of the child process. A failure is reported to the
+        parent through the error queue, and ends the process.
+        """
+        try:
+            for step in xrange(self.num_iterations):
+                buffer_index = step % NUM_BUFFERS
+                self._free[buffer_index].acquire()
+
+                openfoam_wrapper.run()
+
+                extract_cell_data(
+                    mesh, cell_rows, CUBA.VELOCITY,
+                    out=self._velocities[buffer_index])
+                if needs_cell_fields(step, self.num_iterations,
+                                     self.update_frequency):
+                    extract_cell_data(
+                        mesh, cell_rows, CUBA.PRESSURE,
+                        out=self._pressures[buffer_index])
+
+                self._ready[buffer_index].release()
+        except Exception:
+            self._errors.put(traceback.format_exc())
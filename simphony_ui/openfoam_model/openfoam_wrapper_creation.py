@@ -1,7 +1,25 @@
+import logging
+import os
+import shutil
+import tempfile
+
 import numpy as np
-from simphony.engine import openfoam_file_io, openfoam_internal
 from simphony.core.cuba import CUBA
 
+from simphony_ui.openfoam_model.mesh_cache import (
+    default_cache_directory, evict, mesh_cache_key)
+
+log = logging.getLogger(__name__)
+
+#: The name of the mesh dataset and of its case directory
+MESH_NAME = 'mesh'
+
+#: The path of the mesh files in a case directory, relative to the case
+POLY_MESH = os.path.join('constant', 'polyMesh')
+
+#: The maximum total size of the mesh cache, in bytes
+MESH_CACHE_MAX_SIZE = 4 * 1024 ** 3
+
 
 def create_openfoam_wrapper(openfoam_settings):
     """ Creates the Openfoam wrapper setup from the settings as provided
@@ -17,6 +35,7 @@ def create_openfoam_wrapper(openfoam_settings):
     openfoam_wrapper : Wrapper
         an instance of the appropriate Wrapper object, properly configured.
     """
+    from simphony.engine import openfoam_file_io, openfoam_internal
 
     openfoam_wrapper = None
     openfoam_cuba_ext = None
@@ -113,9 +132,17 @@ def get_boundary_condition_description(bc):
         '{} is not a possible boundary condition type'.format(bc.type))
 
 
-def create_openfoam_mesh(openfoam_wrapper, openfoam_settings):
+def create_openfoam_mesh(openfoam_wrapper, openfoam_settings,
+                         cache_directory=None, key=None):
     """ Creates the Openfoam dataset from the settings as provided
-    by the model object
+    by the model object.
+
+    The mesh files of the generated meshes, constant/polyMesh, are kept
+    in a cache keyed on the mesh definition. When the mesh definition did
+    not change, they are restored into a new case and read instead of
+    being generated again. In both cases the mesh is added to the
+    wrapper, which writes the fields and dictionaries of the case from
+    its settings.
 
     Parameters
     ----------
@@ -123,6 +150,12 @@ def create_openfoam_mesh(openfoam_wrapper, openfoam_settings):
         The Openfoam wrapper in which you want to put the dataset
     openfoam_settings : OpenfoamModel
         The traited model describing the openfoam parameters
+    cache_directory : str
+        The directory of the mesh cache. If None, the default directory
+        under the output path is used.
+    key : str
+        The key of the mesh in the caches, as computed by mesh_cache_key.
+        If None, it is computed from the settings.
 
     Returns
     -------
@@ -134,21 +167,54 @@ def create_openfoam_mesh(openfoam_wrapper, openfoam_settings):
     ValueError
         If the mesh type specified in openfoam_settings is not supported
     """
+    from simphony.engine import openfoam_file_io
+
+    if openfoam_settings.mesh_type not in ('block', 'quad'):
+        raise ValueError(
+            '{} is not a supported mesh type'.format(
+                openfoam_settings.mesh_type))
+
     if openfoam_settings.mesh_type == 'block':
         path = (openfoam_settings.output_path
                 if openfoam_settings.mode == 'internal'
                 else '.')
+    else:
+        path = openfoam_settings.output_path
+
+    if cache_directory is None:
+        cache_directory = default_cache_directory(openfoam_settings, 'mesh')
+    if key is None:
+        key = mesh_cache_key(openfoam_settings)
+    cached_mesh = os.path.join(cache_directory, key, POLY_MESH)
+    case = os.path.join(path, MESH_NAME)
 
+    if os.path.isdir(cached_mesh):
+        log.info('Reusing the cached mesh %s', key)
+        # Only the mesh files are restored, the other files of the case
+        # are written by the wrapper from its settings, as for a new mesh
+        shutil.rmtree(case, ignore_errors=True)
+        try:
+            shutil.copytree(cached_mesh, os.path.join(case, POLY_MESH))
+            os.utime(os.path.join(cache_directory, key), None)
+        except (IOError, OSError, shutil.Error):
+            # The cache may be shared with other calculations, which can
+            # evict the entry while it is copied
+            log.exception('Unable to restore the cached mesh %s', key)
+            shutil.rmtree(case, ignore_errors=True)
+        else:
+            openfoam_wrapper.add_dataset(
+                openfoam_file_io.read_foammesh(MESH_NAME, path))
+            return openfoam_wrapper.get_dataset(MESH_NAME)
+
+    if openfoam_settings.mesh_type == 'block':
         with open(openfoam_settings.input_file, 'r') as input_file:
             input_mesh = input_file.read()
 
         openfoam_file_io.create_block_mesh(
-            path, 'mesh', openfoam_wrapper,
+            path, MESH_NAME, openfoam_wrapper,
             input_mesh
         )
-
-        return openfoam_wrapper.get_dataset('mesh')
-    elif openfoam_settings.mesh_type == 'quad':
+    else:
         size_x = openfoam_settings.channel_size_x
         size_y = openfoam_settings.channel_size_y
         size_z = openfoam_settings.channel_size_z
@@ -164,8 +230,8 @@ def create_openfoam_mesh(openfoam_wrapper, openfoam_settings):
         ]
 
         openfoam_file_io.create_quad_mesh(
-            openfoam_settings.output_path,
-            'mesh',
+            path,
+            MESH_NAME,
             openfoam_wrapper,
             corner_points,
             openfoam_settings.num_grid_x,
@@ -173,7 +239,33 @@ def create_openfoam_mesh(openfoam_wrapper, openfoam_settings):
             openfoam_settings.num_grid_z
         )
 
-        return openfoam_wrapper.get_dataset('mesh')
+    _cache_mesh(case, cache_directory, key)
 
-    raise ValueError(
-        '{} is not a supported mesh type'.format(openfoam_settings.mesh_type))
+    return openfoam_wrapper.get_dataset(MESH_NAME)
+
+
+def _cache_mesh(case, cache_directory, key):
+    """ Copies the mesh files of a freshly generated case into the mesh
+    cache. Failures are logged, since the cache is only an optimisation.
+    An entry cached in the meantime by another calculation sharing the
+    cache is kept, as it may be read at the same time.
+    """
+    poly_mesh = os.path.join(case, POLY_MESH)
+    if not os.path.isdir(poly_mesh):
+        log.warning('The case %s has no mesh files to cache', case)
+        return
+
+    try:
+        if not os.path.isdir(cache_directory):
+            os.makedirs(cache_directory)
+        temp_path = tempfile.mkdtemp(dir=cache_directory, prefix='.')
+        shutil.copytree(poly_mesh, os.path.join(temp_path, POLY_MESH))
+        entry = os.path.join(cache_directory, key)
+        if os.path.isdir(os.path.join(entry, POLY_MESH)):
+            shutil.rmtree(temp_path, ignore_errors=True)
+        else:
+            shutil.rmtree(entry, ignore_errors=True)
+            os.rename(temp_path, entry)
+        evict(cache_directory, MESH_CACHE_MAX_SIZE, keep=key)
+    except (IOError, OSError, shutil.Error):
+        log.exception('Unable to cache the mesh %s', key)
@@ -0,0 +1,145 @@
+""" Level of detail of the rendering of the particles. While the camera is
+moved, large particle datasets are drawn with low resolution spheres or
+points, and only a subset of their velocity arrows. They are drawn at
+full quality when the camera is still.
+"""
+from __future__ import division
+
+import math
+
+from traits.api import HasStrictTraits, Bool
+from traitsui.api import View, Item, VGroup
+
+from simphony_ui.local_traits import PositiveInt
+
+#: The levels of detail: spheres at full resolution and all the arrows,
+#: spheres at low resolution or points, with a subset of the arrows
+LOD_FULL = 'full'
+LOD_LOW = 'low'
+LOD_POINTS = 'points'
+
+#: The resolution of the spheres at full quality
+FULL_SPHERE_RESOLUTION = 8
+
+#: The size of the points drawn instead of spheres, in pixels
+POINT_SIZE = 3
+
+
+class ParticleLODModel(HasStrictTraits):
+    """ The model of the level of detail of the particles rendering """
+
+    #: Whether the level of detail is lowered while the camera moves.
+    enabled = Bool(True)
+
+    #: The number of particles above which the spheres are drawn at low
+    #: resolution while the camera moves.
+    low_detail_threshold = PositiveInt(10**5)
+
+    #: The number of particles above which the particles are drawn as
+    #: points while the camera moves.
+    points_threshold = PositiveInt(10**6)
+
+    #: The resolution of the low resolution spheres.
+    low_sphere_resolution = PositiveInt(4)
+
+    #: The maximum number of velocity arrows drawn while the camera moves.
+    max_arrows = PositiveInt(10**4)
+
+    #: Whether the arrows drawn are a random subset of the particles,
+    #: instead of every n-th particle.
+    random_arrows = Bool(True)
+
+    traits_view = View(
+        VGroup(
+            Item(name='enabled', label='Lower detail when moving'),
+            Item(name='low_detail_threshold',
+                 label='Low resolution above (particles)'),
+            Item(name='points_threshold', label='Points above (particles)'),
+            Item(name='low_sphere_resolution',
+                 label='Low sphere resolution'),
+            Item(name='max_arrows', label='Arrows when moving'),
+            Item(name='random_arrows', label='Random arrows'),
+            enabled_when='enabled',
+            show_border=True
+        )
+    )
+
+    def level(self, num_particles, interacting):
+        """ The level of detail of a particles dataset
+
+        Parameters
+        ----------
+        num_particles : int
+            The number of particles of the dataset
+        interacting : bool
+            Whether the camera is being moved
+
+        Returns
+        -------
+        level : str
+            One of LOD_FULL, LOD_LOW and LOD_POINTS
+        """
+        if (not self.enabled or not interacting or
+                num_particles <= self.low_detail_threshold):
+            return LOD_FULL
+        if num_particles > self.points_threshold:
+            return LOD_POINTS
+        return LOD_LOW
+
+    def arrow_ratio(self, num_particles, level):
+        """ The ratio of particles to drawn arrows of a particles dataset
+
+        Parameters
+        ----------
+        num_particles : int
+            The number of particles of the dataset
+        level : str
+            The level of detail of the dataset
+
+        Returns
+        -------
+        ratio : int
+            One arrow is drawn every ratio particles
+        """
+        if level == LOD_FULL:
+            return 1
+        return max(1, int(math.ceil(num_particles / self.max_arrows)))
+
+
+def apply_particle_lod(sphere_module, arrow_module, level, arrow_ratio,
+                       settings):
+    """ Configures the glyph modules of a particles source for a level of
+    detail
+
+    Parameters
+    ----------
+    sphere_module : mayavi.modules.glyph.Glyph
+        The module drawing the particles as spheres
+    arrow_module : mayavi.modules.glyph.Glyph
+        The module drawing the velocities as arrows
+    level : str
+        One of LOD_FULL, LOD_LOW and LOD_POINTS
+    arrow_ratio : int
+        One arrow is drawn every arrow_ratio particles
+    settings : ParticleLODModel
+        The level of detail settings
+    """
+    glyph_source = sphere_module.glyph.glyph_source
+    if level == LOD_POINTS:
+        vertex = glyph_source.glyph_dict['glyph_source2d']
+        vertex.glyph_type = 'vertex'
+        sphere_module.actor.property.point_size = POINT_SIZE
+        new_source = vertex
+    else:
+        new_source = glyph_source.glyph_dict['sphere_source']
+        resolution = (FULL_SPHERE_RESOLUTION if level == LOD_FULL
+                      else settings.low_sphere_resolution)
+        new_source.theta_resolution = resolution
+        new_source.phi_resolution = resolution
+    if glyph_source.glyph_source is not new_source:
+        glyph_source.glyph_source = new_source
+
+    glyph = arrow_module.glyph
+    glyph.mask_points.on_ratio = arrow_ratio
+    glyph.mask_points.random_mode = settings.random_arrows
+    glyph.mask_input_points = arrow_ratio > 1
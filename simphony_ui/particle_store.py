@@ -0,0 +1,132 @@
+import numpy as np
+from simphony.core.cuba import CUBA
+
+#: The CUBA keys of the particle data held by the store, by field name.
+DATA_FIELDS = {
+    'velocities': CUBA.VELOCITY,
+    'radii': CUBA.RADIUS,
+    'forces': CUBA.EXTERNAL_APPLIED_FORCE,
+}
+
+
+class ParticleStore(object):
+    """ Columnar (structure-of-arrays) copy of a particles dataset.
+
+    The coordinates, velocities, radii and forces of the particles are
+    held in contiguous float64 arrays, the row of a particle being its
+    position in ``uids``.
+    """
+
+    def __init__(self):
+        #: The uids of the particles, in row order
+        self.uids = []
+
+        #: (N, 3) array of the particle coordinates
+        self.coordinates = np.empty((0, 3))
+
+        #: (N, 3) array of the particle velocities
+        self.velocities = np.empty((0, 3))
+
+        #: (N,) array of the particle radii
+        self.radii = np.empty(0)
+
+        #: (N, 3) array of the forces applied on the particles
+        self.forces = np.empty((0, 3))
+
+    def __len__(self):
+        return len(self.uids)
+
+    @classmethod
+    def from_particles(cls, particles):
+        """ Creates a store filled from a particles dataset
+
+        Parameters
+        ----------
+        particles : ABCParticles
+            The particles dataset to read
+
+        Returns
+        -------
+        store : ParticleStore
+            The filled store
+        """
+        store = cls()
+        store.read(particles)
+        return store
+
+    def read(self, particles):
+        """ Fills the store from a particles dataset, in a single pass
+        over the particles. The arrays are reused when the number of
+        particles did not change.
+
+        Parameters
+        ----------
+        particles : ABCParticles
+            The particles dataset to read
+        """
+        uids = []
+        columns = {name: [] for name in DATA_FIELDS}
+        columns['coordinates'] = []
+        null_vector = (0.0, 0.0, 0.0)
+
+        for particle in particles.iter_particles():
+            uids.append(particle.uid)
+            columns['coordinates'].append(particle.coordinates)
+            columns['velocities'].append(
+                particle.data.get(CUBA.VELOCITY, null_vector))
+            columns['radii'].append(particle.data.get(CUBA.RADIUS, 0.0))
+            columns['forces'].append(
+                particle.data.get(CUBA.EXTERNAL_APPLIED_FORCE, null_vector))
+
+        self.uids = uids
+        for name, values in columns.items():
+            values = np.array(values, dtype=np.float64)
+            current = getattr(self, name)
+            if name != 'radii':
+                values = values.reshape(-1, 3)
+            if current.shape == values.shape:
+                current[...] = values
+            else:
+                setattr(self, name, values)
+
+    def write(self, particles, fields=('forces',)):
+        """ Writes the content of the store back to a particles dataset,
+        in a single pass over the particles followed by a single
+        update_particles call.
+
+        Parameters
+        ----------
+        particles : ABCParticles
+            The particles dataset to update. It must contain the
+            particles of the store.
+        fields : sequence of str
+            The fields to write. Possible fields are 'coordinates',
+            'velocities', 'radii' and 'forces'.
+
+        Raises
+        ------
+        ValueError
+            If one of the fields is unknown
+        """
+        for name in fields:
+            if name != 'coordinates' and name not in DATA_FIELDS:
+                raise ValueError('{} is not a particle field'.format(name))
+
+        if len(self.uids) == 0:
+            return
+
+        values = {name: getattr(self, name).tolist() for name in fields}
+
+        updated = []
+        for row, particle in enumerate(particles.iter_particles(self.uids)):
+            for name in fields:
+                if name == 'coordinates':
+                    particle.coordinates = tuple(values[name][row])
+                elif name == 'radii':
+                    particle.data[CUBA.RADIUS] = values[name][row]
+                else:
+                    particle.data[DATA_FIELDS[name]] = tuple(
+                        values[name][row])
+            updated.append(particle)
+
+        particles.update_particles(updated)
@@ -0,0 +1,164 @@
+""" Real time playback of the frames: the frame to show is given by the
+elapsed time and the target frame rate, so that the frames which could
+not be shown in time are dropped instead of slowing the playback down.
+"""
+from __future__ import division
+
+import collections
+import contextlib
+import time
+
+#: The default target frame rate of the playback, in frames per second
+DEFAULT_PLAYBACK_FPS = 10
+
+#: The number of upcoming frames prefetched during the playback
+PLAYBACK_PREFETCH = 4
+
+#: The number of times the due frame is checked per frame interval
+TICKS_PER_FRAME = 2
+
+#: The number of frames over which the frame rate and stage timings are
+#: averaged
+DEFAULT_STATS_WINDOW = 30
+
+#: The stages of showing a frame: loading its snapshot, swapping the data
+#: of the scene and rendering the scene
+PLAYBACK_STAGES = ('load', 'swap', 'render')
+
+
+class PlaybackClock(object):
+    """ Gives the frame due at the current time of a looping playback """
+
+    def __init__(self, fps, first_frame=0, clock=time.time):
+        """
+        Parameters
+        ----------
+        fps : float
+            The target frame rate, in frames per second
+        first_frame : int
+            The frame shown when the playback starts
+        clock : callable
+            Returns the current time, in seconds
+        """
+        #: The target frame rate, in frames per second
+        self.fps = fps
+
+        self._clock = clock
+        self._first_frame = first_frame
+        self._start = clock()
+
+    def due_frame(self, num_frames):
+        """ The frame to show at the current time
+
+        Parameters
+        ----------
+        num_frames : int
+            The number of frames. The playback loops over them.
+
+        Returns
+        -------
+        index : int
+            The index of the frame
+        """
+        elapsed = self._clock() - self._start
+        return (self._first_frame + int(elapsed * self.fps)) % num_frames
+
+    def upcoming_frames(self, num_frames, count, step=1):
+        """ The frames expected to be shown after the due frame
+
+        Parameters
+        ----------
+        num_frames : int
+            The number of frames. The playback loops over them.
+        count : int
+            The number of frames
+        step : int
+            The number of frames between two shown frames, more than one
+            when frames are dropped
+
+        Returns
+        -------
+        indices : list of int
+            The indices of the frames, in the order they are due
+        """
+        due = self.due_frame(num_frames)
+        return [(due + step * offset) % num_frames
+                for offset in xrange(1, count + 1)]
+
+
+class PlaybackStats(object):
+    """ The achieved frame rate of the playback, the number of dropped
+    frames and the time spent in each stage of PLAYBACK_STAGES, averaged
+    over the last frames.
+    """
+
+    def __init__(self, window=DEFAULT_STATS_WINDOW, clock=time.time):
+        """
+        Parameters
+        ----------
+        window : int
+            The number of frames over which the rate and timings are
+            averaged
+        clock : callable
+            Returns the current time, in seconds
+        """
+        self._window = window
+        self._clock = clock
+        self.reset()
+
+    def reset(self):
+        """ Forgets the frames shown so far """
+        #: The number of frames skipped to keep up with the target rate
+        self.dropped_frames = 0
+
+        self._shown = collections.deque(maxlen=self._window)
+        self._timings = {
+            stage: collections.deque(maxlen=self._window)
+            for stage in PLAYBACK_STAGES}
+
+    def frame_shown(self, dropped=0):
+        """ Records that a frame was shown
+
+        Parameters
+        ----------
+        dropped : int
+            The number of frames skipped before this frame
+        """
+        self._shown.append(self._clock())
+        self.dropped_frames += dropped
+
+    @contextlib.contextmanager
+    def timing(self, stage):
+        """ A context measuring the time spent in a stage of PLAYBACK_STAGES
+        """
+        start = self._clock()
+        try:
+            yield
+        finally:
+            self._timings[stage].append(self._clock() - start)
+
+    @property
+    def achieved_fps(self):
+        """ The number of frames shown per second """
+        if len(self._shown) < 2:
+            return 0.0
+        duration = self._shown[-1] - self._shown[0]
+        if duration <= 0.0:
+            return 0.0
+        return (len(self._shown) - 1) / duration
+
+    def stage_time(self, stage):
+        """ The average time spent in a stage of PLAYBACK_STAGES, in
+        seconds """
+        timings = self._timings[stage]
+        if len(timings) == 0:
+            return 0.0
+        return sum(timings) / len(timings)
+
+    def summary(self):
+        """ A one line report of the rate and timings """
+        return '{:.1f} fps, {}, {} dropped'.format(
+            self.achieved_fps,
+            ', '.join('{} {:.1f} ms'.format(stage, 1000*self.stage_time(stage))
+                      for stage in PLAYBACK_STAGES),
+            self.dropped_frames)
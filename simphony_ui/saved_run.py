@@ -0,0 +1,146 @@
+""" Saving of the frames and settings of a calculation to a run directory,
+and lazy reopening of the saved runs.
+
+A run directory holds:
+
+- ``run.json``, the index of the run: its format version, number of
+  frames and the locations of its frames and settings
+- ``settings.json``, the settings of the calculation, as read by
+  load_settings
+- ``run_frames``, the frames of the calculation, as written by
+  FrameWriter. It is not the frames directory of the calculations, which
+  is cleared by the next run, so that runs can be saved to the output
+  path of their calculation.
+"""
+import json
+import os
+import shutil
+from collections import namedtuple
+
+from simphony_ui.frame_store import DEFAULT_CACHE_SIZE, FrameStore
+from simphony_ui.frames import MESH_FILE, frame_file_name
+from simphony_ui.settings_file import (
+    load_settings, read_mapping_file, write_settings_file)
+
+#: The name of the index file of a run directory
+RUN_INDEX_FILE = 'run.json'
+
+#: The name of the settings file of a run directory
+RUN_SETTINGS_FILE = 'settings.json'
+
+#: The name of the frames directory of a run directory
+RUN_FRAMES_DIRECTORY = 'run_frames'
+
+#: The version of the run directory layout
+RUN_FORMAT_VERSION = 1
+
+#: A reopened run. Its frames are loaded when accessed.
+SavedRun = namedtuple(
+    'SavedRun',
+    ['frames', 'global_settings', 'openfoam_settings', 'liggghts_settings'])
+
+
+def save_run(directory, frames, global_settings, openfoam_settings,
+             liggghts_settings, progress_callback=None):
+    """ Saves the frames and settings of a calculation to a run directory
+
+    The index file is written last, so that a run directory whose saving
+    was interrupted can not be opened.
+
+    Parameters
+    ----------
+    directory : str
+        The run directory. It is created if needed.
+    frames : FrameStore
+        The frames of the calculation. They are copied to the run
+        directory, unless they are already stored there, as for a
+        reopened run saved in place.
+    global_settings : GlobalParametersModel
+        The global parameters of the calculation
+    openfoam_settings : OpenfoamModel
+        The Openfoam parameters
+    liggghts_settings : LiggghtsModel
+        The Liggghts parameters
+    progress_callback : function
+        Called with the number of files copied and the total number of
+        files after each file copy
+
+    Raises
+    ------
+    ValueError
+        If there are no frames to save
+    """
+    num_frames = len(frames)
+    if num_frames == 0:
+        raise ValueError('There are no frames to save')
+
+    frames_directory = os.path.join(directory, RUN_FRAMES_DIRECTORY)
+    if not os.path.isdir(frames_directory):
+        os.makedirs(frames_directory)
+
+    index_path = os.path.join(directory, RUN_INDEX_FILE)
+    if os.path.exists(index_path):
+        os.remove(index_path)
+
+    file_names = [MESH_FILE] + [
+        frame_file_name(index) for index in xrange(num_frames)]
+    copy_files = not os.path.samefile(frames.directory, frames_directory)
+    for count, name in enumerate(file_names, 1):
+        if copy_files:
+            shutil.copyfile(os.path.join(frames.directory, name),
+                            os.path.join(frames_directory, name))
+        if progress_callback is not None:
+            progress_callback(count, len(file_names))
+
+    write_settings_file(
+        os.path.join(directory, RUN_SETTINGS_FILE),
+        global_settings, openfoam_settings, liggghts_settings)
+
+    with open(index_path, 'w') as index_file:
+        json.dump({
+            'format_version': RUN_FORMAT_VERSION,
+            'num_frames': num_frames,
+            'frames_directory': RUN_FRAMES_DIRECTORY,
+            'settings_file': RUN_SETTINGS_FILE,
+        }, index_file, indent=4, sort_keys=True)
+
+
+def open_run(directory, cache_size=DEFAULT_CACHE_SIZE):
+    """ Opens a run directory written by save_run. No frame is read: the
+    frames are loaded from disk when accessed.
+
+    Parameters
+    ----------
+    directory : str
+        The run directory
+    cache_size : int
+        The maximum number of frames kept in memory
+
+    Returns
+    -------
+    run : SavedRun
+        The frames and settings of the run
+
+    Raises
+    ------
+    ValueError
+        If the directory is not a run directory of a supported version
+    """
+    index_path = os.path.join(directory, RUN_INDEX_FILE)
+    if not os.path.exists(index_path):
+        raise ValueError('{} is not a saved run'.format(directory))
+
+    index = read_mapping_file(index_path)
+    if index.get('format_version') != RUN_FORMAT_VERSION:
+        raise ValueError(
+            'Unsupported saved run format version {}'.format(
+                index.get('format_version')))
+
+    global_settings, openfoam_settings, liggghts_settings = load_settings(
+        os.path.join(directory, index['settings_file']))
+    frames = FrameStore(
+        os.path.join(directory, index['frames_directory']),
+        index['num_frames'], cache_size)
+
+    return SavedRun(
+        frames, global_settings, openfoam_settings, liggghts_settings)
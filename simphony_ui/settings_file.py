@@ -0,0 +1,224 @@
+import json
+import os
+
+import numpy as np
+from traits.api import Directory, File, HasTraits
+
+from simphony_ui.global_parameters_model import GlobalParametersModel
+from simphony_ui.liggghts_model.liggghts_model import LiggghtsModel
+from simphony_ui.openfoam_model.openfoam_model import OpenfoamModel
+
+#: The settings models, by section name of the settings file
+SETTINGS_SECTIONS = {
+    'global': GlobalParametersModel,
+    'openfoam': OpenfoamModel,
+    'liggghts': LiggghtsModel,
+}
+
+#: The traits of the settings models which are derived from the other
+#: traits, and are not written to settings files
+DERIVED_TRAITS = ('valid',)
+
+
+def read_mapping_file(path):
+    """ Reads a JSON or YAML file holding a mapping. Files with a .yaml or
+    .yml extension are read as YAML, other files as JSON.
+
+    Parameters
+    ----------
+    path : str
+        The path of the file
+
+    Returns
+    -------
+    content : dict
+        The content of the file. An empty YAML file gives an empty dict.
+
+    Raises
+    ------
+    ValueError
+        If the content of the file is not a mapping
+    RuntimeError
+        If the file is a YAML file and PyYAML is not installed
+    """
+    with open(path, 'r') as mapping_file:
+        if os.path.splitext(path)[1].lower() in ('.yaml', '.yml'):
+            try:
+                import yaml
+            except ImportError:
+                raise RuntimeError(
+                    'PyYAML is required to read {}'.format(path))
+            content = yaml.safe_load(mapping_file)
+        else:
+            content = json.load(mapping_file)
+
+    if content is None:
+        content = {}
+    if not isinstance(content, dict):
+        raise ValueError('{} does not hold a mapping'.format(path))
+
+    return content
+
+
+def check_sections(settings):
+    """ Checks that the sections of a settings mapping are known
+
+    Parameters
+    ----------
+    settings : dict
+        The settings, by section name
+
+    Raises
+    ------
+    ValueError
+        If one of the sections is unknown
+    """
+    for section in settings:
+        if section not in SETTINGS_SECTIONS:
+            raise ValueError(
+                '{} is not a settings section. Possible sections are '
+                '{}'.format(section, ', '.join(sorted(SETTINGS_SECTIONS))))
+
+
+def read_settings_file(path):
+    """ Reads the content of a JSON or YAML settings file
+
+    Parameters
+    ----------
+    path : str
+        The path of the settings file
+
+    Returns
+    -------
+    content : dict
+        The settings, by section name
+
+    Raises
+    ------
+    ValueError
+        If the content of the file is not a mapping of sections, or if
+        one of the sections is unknown
+    RuntimeError
+        If the file is a YAML file and PyYAML is not installed
+    """
+    content = read_mapping_file(path)
+    check_sections(content)
+    return content
+
+
+def apply_settings(model, values, base_directory=None):
+    """ Sets the traits of a settings model from a mapping. Nested
+    mappings set the traits of the models held by the model.
+
+    Parameters
+    ----------
+    model : HasTraits
+        The settings model to update
+    values : dict
+        The values of the traits, by trait name
+    base_directory : str
+        The directory against which relative File and Directory values
+        are resolved. If None, they are kept as they are.
+
+    Raises
+    ------
+    TraitError
+        If a trait does not exist or a value is not valid
+    """
+    for name, value in values.items():
+        current = getattr(model, name, None)
+        if isinstance(current, HasTraits) and isinstance(value, dict):
+            apply_settings(current, value, base_directory)
+            continue
+
+        trait = model.trait(name)
+        if (base_directory is not None and trait is not None and
+                isinstance(trait.trait_type, (File, Directory)) and
+                value and not os.path.isabs(value)):
+            value = os.path.join(base_directory, value)
+
+        setattr(model, name, value)
+
+
+def load_settings(path):
+    """ Creates the settings models of a calculation from a settings file.
+    Relative paths in the file are resolved against the directory of the
+    file.
+
+    Parameters
+    ----------
+    path : str
+        The path of the settings file
+
+    Returns
+    -------
+    global_settings : GlobalParametersModel
+        The global parameters of the calculation
+    openfoam_settings : OpenfoamModel
+        The Openfoam parameters
+    liggghts_settings : LiggghtsModel
+        The Liggghts parameters
+    """
+    content = read_settings_file(path)
+    base_directory = os.path.dirname(os.path.abspath(path))
+
+    models = {}
+    for section, model_class in SETTINGS_SECTIONS.items():
+        models[section] = model_class()
+        apply_settings(
+            models[section], content.get(section, {}), base_directory)
+
+    return models['global'], models['openfoam'], models['liggghts']
+
+
+def settings_mapping(model):
+    """ The values of the traits of a settings model, as a mapping which
+    can be written to a JSON settings file. The models held by the model
+    give nested mappings.
+
+    Parameters
+    ----------
+    model : HasTraits
+        The settings model
+
+    Returns
+    -------
+    values : dict
+        The values of the traits, by trait name
+    """
+    values = {}
+    for name in model.editable_traits():
+        if name in DERIVED_TRAITS:
+            continue
+        value = getattr(model, name)
+        if isinstance(value, HasTraits):
+            value = settings_mapping(value)
+        elif isinstance(value, np.ndarray):
+            value = value.tolist()
+        values[name] = value
+    return values
+
+
+def write_settings_file(path, global_settings, openfoam_settings,
+                        liggghts_settings):
+    """ Writes the settings models of a calculation to a JSON settings
+    file, which can be read back with load_settings
+
+    Parameters
+    ----------
+    path : str
+        The path of the settings file
+    global_settings : GlobalParametersModel
+        The global parameters of the calculation
+    openfoam_settings : OpenfoamModel
+        The Openfoam parameters
+    liggghts_settings : LiggghtsModel
+        The Liggghts parameters
+    """
+    content = {
+        'global': settings_mapping(global_settings),
+        'openfoam': settings_mapping(openfoam_settings),
+        'liggghts': settings_mapping(liggghts_settings),
+    }
+    with open(path, 'w') as settings_file:
+        json.dump(content, settings_file, indent=4, sort_keys=True)
@@ -0,0 +1,276 @@
+""" Parameter sweeps: running the calculation for every combination of a
+grid of settings values, in parallel worker processes.
+"""
+import copy
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import time
+import traceback
+from concurrent import futures
+
+import numpy as np
+
+from simphony_ui.couple_openfoam_liggghts import run_calc
+from simphony_ui.particle_store import ParticleStore
+from simphony_ui.settings_file import (
+    SETTINGS_SECTIONS, apply_settings)
+
+log = logging.getLogger(__name__)
+
+#: The name of the summary file of a run, and of the sweep
+SUMMARY_FILE = 'summary.json'
+
+#: The name of the cache directory shared by the runs of a sweep, under
+#: its output path
+CACHE_DIRECTORY = 'cache'
+
+
+def run_directory_name(index):
+    """ The name of the output directory of a run """
+    return 'run-{:04d}'.format(index)
+
+
+def expand_grid(grid):
+    """ Expands a grid of settings values into the settings overrides of
+    each run.
+
+    Parameters
+    ----------
+    grid : dict
+        The values taken by each setting, by dotted setting path. The
+        path starts with the section name and may go through nested
+        models, e.g. ``openfoam.viscosity`` or
+        ``openfoam.boundary_conditions.inlet_BC.pressure_boundary_condition
+        .fixed_value``.
+
+    Returns
+    -------
+    overrides : list of dict
+        The overrides of each run, as nested mappings of the same layout
+        as a settings file, in the order of the Cartesian product of the
+        grid values
+
+    Raises
+    ------
+    ValueError
+        If a path does not start with a settings section or a setting
+        has no value
+    """
+    paths = sorted(grid)
+    for path in paths:
+        section = path.split('.', 1)[0]
+        if section not in SETTINGS_SECTIONS or '.' not in path:
+            raise ValueError(
+                '{} is not the path of a setting. Paths start with one of '
+                '{}'.format(path, ', '.join(sorted(SETTINGS_SECTIONS))))
+        if len(grid[path]) == 0:
+            raise ValueError('{} has no value'.format(path))
+
+    overrides = []
+    for values in itertools.product(*[grid[path] for path in paths]):
+        run_overrides = {}
+        for path, value in zip(paths, values):
+            names = path.split('.')
+            mapping = run_overrides
+            for name in names[:-1]:
+                mapping = mapping.setdefault(name, {})
+            mapping[names[-1]] = value
+        overrides.append(run_overrides)
+
+    return overrides
+
+
+def merge_settings(base, overrides):
+    """ Merges nested settings mappings, the overrides taking precedence
+
+    Parameters
+    ----------
+    base : dict
+        The base settings
+    overrides : dict
+        The overriding settings
+
+    Returns
+    -------
+    settings : dict
+        A new mapping of the merged settings
+    """
+    settings = copy.deepcopy(base)
+    for name, value in overrides.items():
+        if isinstance(value, dict) and isinstance(settings.get(name), dict):
+            settings[name] = merge_settings(settings[name], value)
+        else:
+            settings[name] = copy.deepcopy(value)
+    return settings
+
+
+def run_one(settings, base_directory, run_directory, cache_directory=None):
+    """ Runs the calculation of one configuration. This is the function
+    executed by the worker processes.
+
+    The run uses run_directory as output path and as working directory,
+    so that its case files cannot collide with those of the other runs.
+    The summary of the run is written to run_directory/summary.json.
+
+    Parameters
+    ----------
+    settings : dict
+        The settings of the run, by section name
+    base_directory : str
+        The directory against which relative paths of the settings are
+        resolved
+    run_directory : str
+        The output directory of the run
+    cache_directory : str
+        The directory of the mesh, cell locator and data file caches,
+        shared by the runs. If None, the caches are under run_directory.
+
+    Returns
+    -------
+    summary : dict
+        The summary of the run
+    """
+    summary = {
+        'run_directory': run_directory,
+        'settings': settings,
+    }
+    start = time.time()
+    previous_directory = os.getcwd()
+    try:
+        models = {}
+        for section, model_class in SETTINGS_SECTIONS.items():
+            models[section] = model_class()
+            apply_settings(
+                models[section], settings.get(section, {}), base_directory)
+        models['openfoam'].output_path = run_directory
+
+        if not os.path.isdir(run_directory):
+            os.makedirs(run_directory)
+        os.chdir(run_directory)
+
+        iterations = []
+
+        def progress_callback(snapshot, current_iteration,
+                              total_iterations):
+            iterations.append(current_iteration)
+
+        datasets = run_calc(
+            models['global'], models['openfoam'], models['liggghts'],
+            progress_callback, cache_directory)
+
+        summary['status'] = 'completed'
+        summary['num_iterations'] = models['global'].num_iterations
+        summary['num_frames'] = len(iterations)
+        if datasets is not None:
+            summary.update(_summarize_particles(datasets[1]))
+    except Exception:
+        summary['status'] = 'failed'
+        summary['error'] = traceback.format_exc()
+    finally:
+        os.chdir(previous_directory)
+        summary['elapsed'] = time.time() - start
+
+    try:
+        with open(os.path.join(run_directory, SUMMARY_FILE), 'w') as output:
+            json.dump(summary, output, indent=4)
+    except (IOError, OSError):
+        log.exception('Unable to write the summary of %s', run_directory)
+
+    return summary
+
+
+def _summarize_particles(flow_particles):
+    """ Summary statistics of the flow particles at the end of a run """
+    store = ParticleStore.from_particles(flow_particles)
+    if len(store) == 0:
+        return {'num_flow_particles': 0}
+
+    speeds = np.sqrt((store.velocities ** 2).sum(axis=1))
+    return {
+        'num_flow_particles': len(store),
+        'mean_flow_velocity': store.velocities.mean(axis=0).tolist(),
+        'max_flow_speed': float(speeds.max()),
+        'mean_flow_position': store.coordinates.mean(axis=0).tolist(),
+    }
+
+
+def run_sweep(base_settings, grid, output_path, base_directory=None,
+              max_workers=None, runner=run_one):
+    """ Runs the calculation for every combination of the grid values, in
+    a pool of worker processes
+
+    Parameters
+    ----------
+    base_settings : dict
+        The settings shared by the runs, by section name
+    grid : dict
+        The values taken by each varying setting, by dotted setting path.
+        See expand_grid.
+    output_path : str
+        The directory in which the run-NNNN output directories and the
+        summary of the sweep are written. The runs share the caches of
+        its cache directory, so that the runs with the same mesh only
+        generate it once.
+    base_directory : str
+        The directory against which relative paths of the settings are
+        resolved. If None, the current directory is used.
+    max_workers : int
+        The maximum number of concurrent runs. It is capped at the number
+        of cores, which is also the default.
+    runner : callable
+        The function running one configuration, with the signature of
+        run_one. It must be picklable.
+
+    Returns
+    -------
+    summaries : list of dict
+        The summary of each run, in grid order
+    """
+    if base_directory is None:
+        base_directory = os.getcwd()
+    base_directory = os.path.abspath(base_directory)
+    output_path = os.path.abspath(output_path)
+
+    runs = [
+        (merge_settings(base_settings, overrides),
+         os.path.join(output_path, run_directory_name(index)))
+        for index, overrides in enumerate(expand_grid(grid))]
+
+    cache_directory = os.path.join(output_path, CACHE_DIRECTORY)
+
+    num_cores = multiprocessing.cpu_count()
+    num_workers = min(max_workers or num_cores, num_cores, len(runs))
+    if not os.path.isdir(output_path):
+        os.makedirs(output_path)
+
+    log.info('Running %d configurations on %d processes',
+             len(runs), num_workers)
+    summaries = [None] * len(runs)
+    executor = futures.ProcessPoolExecutor(max_workers=max(num_workers, 1))
+    with executor:
+        pending = {
+            executor.submit(runner, settings, base_directory, directory,
+                            cache_directory):
+            index
+            for index, (settings, directory) in enumerate(runs)}
+        for future in futures.as_completed(pending):
+            index = pending[future]
+            try:
+                summaries[index] = future.result()
+            except Exception:
+                # The worker process itself failed
+                summaries[index] = {
+                    'run_directory': runs[index][1],
+                    'settings': runs[index][0],
+                    'status': 'failed',
+                    'error': traceback.format_exc(),
+                }
+            log.info('%s %s', runs[index][1], summaries[index]['status'])
+
+    with open(os.path.join(output_path, SUMMARY_FILE), 'w') as output:
+        json.dump(summaries, output, indent=4)
+
+    return summaries
@@ -0,0 +1,88 @@
+""" Measurement of the import time of the simphony_ui modules, shared by
+the import time tests and benchmark.
+"""
+import json
+import re
+import subprocess
+import sys
+
+#: The maximum import time of the entry modules, in seconds, measured in
+#: a fresh interpreter
+IMPORT_BUDGETS = {
+    'simphony_ui.couple_openfoam_liggghts': 2.0,
+    'simphony_ui.ui': 2.0,
+    'simphony_ui.cli.batch': 2.0,
+    'simphony_ui.cli.openfoam_liggghts_ui': 2.0,
+}
+
+#: The modules which must only be imported when first used
+HEAVY_MODULES = (
+    'mayavi',
+    'tvtk',
+    'vtk',
+    'simphony_mayavi',
+    'pyface.api',
+    'pyface.gui',
+    'pyface.qt',
+    'pyface.wx',
+    'simphony.engine',
+    'concurrent.futures',
+)
+
+_MEASURE = """
+import json, sys, time
+start = time.time()
+import {module}
+elapsed = time.time() - start
+heavy = [name for name in {heavy!r} if sys.modules.get(name) is not None]
+sys.stdout.write(json.dumps({{'elapsed': elapsed, 'heavy': heavy}}))
+"""
+
+_IMPORTTIME = re.compile(
+    r'^import time:\s*(\d+)\s*\|\s*(\d+)\s*\|( *)(\S+)\s*$', re.M)
+
+
+def measure_import(module):
+    """ Imports a module in a fresh interpreter and measures it. On
+    Python 3.7 and later, the time of each imported module is reported by
+    ``python -X importtime``.
+
+    Parameters
+    ----------
+    module : str
+        The name of the module to import
+
+    Returns
+    -------
+    elapsed : float
+        The import time of the module, in seconds
+    heavy : list of str
+        The modules of HEAVY_MODULES imported with the module
+    modules : list of (str, float, float)
+        The name, self time and cumulative time in seconds of every
+        imported module, or an empty list if the interpreter does not
+        support ``-X importtime``
+    """
+    command = [sys.executable]
+    importtime = sys.version_info >= (3, 7)
+    if importtime:
+        command += ['-X', 'importtime']
+    command += ['-c', _MEASURE.format(module=module, heavy=HEAVY_MODULES)]
+
+    process = subprocess.Popen(
+        command, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        universal_newlines=True)
+    stdout, stderr = process.communicate()
+    if process.returncode != 0:
+        raise RuntimeError(
+            'Unable to import {}:\n{}'.format(module, stderr))
+
+    result = json.loads(stdout)
+    modules = []
+    if importtime:
+        modules = [
+            (name, int(self_time) * 1e-6, int(cumulative) * 1e-6)
+            for self_time, cumulative, _, name
+            in _IMPORTTIME.findall(stderr)]
+
+    return result['elapsed'], result['heavy'], modules
@@ -0,0 +1,209 @@
+"""
+Tests the cell locators
+"""
+
+import unittest
+
+import numpy as np
+from simphony.core.cuba import CUBA
+
+from simphony_ui.openfoam_model.cell_locator import (
+    BinnedCellLocator, IncrementalCellLocator, cell_face_planes,
+    create_cell_locator)
+from simphony_ui.openfoam_model.mesh_index import (
+    CellIndex, extract_mesh_arrays)
+from simphony_ui.tests.test_utils import (
+    create_cartesian_mesh, create_rectilinear_mesh)
+
+
+def expected_velocities(points, x_nodes, y_nodes, z_nodes):
+    """ The (i, j, k) velocity of the cells of a rectilinear mesh
+    containing the points """
+    return [
+        [float(np.searchsorted(nodes, value, side='right') - 1)
+         for value, nodes in zip(point, (x_nodes, y_nodes, z_nodes))]
+        for point in points]
+
+
+class TestCreateCellLocator(unittest.TestCase):
+
+    def test_regular_mesh(self):
+        mesh_arrays = extract_mesh_arrays(
+            create_cartesian_mesh((1.0, 2.0, 3.0), (2, 3, 4)))
+        locator = create_cell_locator(
+            mesh_arrays, (1.0, 2.0, 3.0), (2, 3, 4))
+        self.assertIsInstance(locator, CellIndex)
+
+    def test_graded_mesh(self):
+        mesh_arrays = extract_mesh_arrays(create_rectilinear_mesh(
+            [0.0, 0.1, 0.3, 1.0], [0.0, 1.0, 2.0], [0.0, 1.0]))
+        locator = create_cell_locator(
+            mesh_arrays, (1.0, 2.0, 1.0), (3, 2, 1))
+        self.assertIsInstance(locator, BinnedCellLocator)
+
+    def test_grid_mismatch(self):
+        mesh_arrays = extract_mesh_arrays(
+            create_cartesian_mesh((1.0, 2.0, 3.0), (2, 3, 4)))
+        locator = create_cell_locator(
+            mesh_arrays, (1.0, 2.0, 3.0), (4, 3, 4))
+        self.assertIsInstance(locator, BinnedCellLocator)
+
+
+class TestBinnedCellLocator(unittest.TestCase):
+
+    def setUp(self):
+        self.nodes = (
+            [0.0, 0.05, 0.1, 0.2, 0.4, 0.7, 1.0],
+            [0.0, 0.5, 0.6, 2.0],
+            [0.0, 0.2, 0.3])
+        self.mesh = create_rectilinear_mesh(*self.nodes)
+        self.locator = BinnedCellLocator.from_arrays(
+            extract_mesh_arrays(self.mesh))
+
+    def velocities(self, rows):
+        return [
+            list(self.mesh.get_cell(uid).data[CUBA.VELOCITY])
+            for uid in self.locator.cell_uids[rows]]
+
+    def test_locate(self):
+        points = np.random.RandomState(0).uniform(
+            size=(200, 3)) * [1.0, 2.0, 0.3]
+        rows = self.locator.locate(points)
+        self.assertEqual(
+            self.velocities(rows),
+            expected_velocities(points, *self.nodes))
+
+    def test_locate_periodic(self):
+        rows = self.locator.locate([[1.01, -0.1, 0.35]])
+        self.assertEqual(
+            self.velocities(rows),
+            expected_velocities([[0.01, 1.9, 0.05]], *self.nodes))
+
+    def test_locate_in_hole(self):
+        mesh = create_rectilinear_mesh(*self.nodes)
+        cells = list(mesh.iter_cells())
+        mesh_arrays = extract_mesh_arrays(mesh)
+        hole = [row for row, uid in enumerate(mesh_arrays.cell_uids)
+                if mesh.get_cell(uid).data[CUBA.VELOCITY] == (3, 1, 0)]
+        keep = np.ones(len(cells), dtype=bool)
+        keep[hole] = False
+        locator = BinnedCellLocator.from_arrays(mesh_arrays._replace(
+            connectivity=mesh_arrays.connectivity[keep],
+            point_counts=mesh_arrays.point_counts[keep],
+            cell_uids=mesh_arrays.cell_uids[keep]))
+
+        with self.assertRaises(ValueError):
+            locator.locate([[0.3, 0.55, 0.1]])
+
+
+class TestSkewedMesh(unittest.TestCase):
+    # The cells of a sheared mesh, whose bounding boxes overlap
+
+    def setUp(self):
+        self.nodes = ([0.0, 1.0, 2.0, 3.0], [0.0, 1.0], [0.0, 0.5, 1.0])
+        self.shear = 1.5
+        self.mesh = create_rectilinear_mesh(*self.nodes)
+        mesh_arrays = extract_mesh_arrays(self.mesh)
+        points = mesh_arrays.points.copy()
+        points[:, 0] += self.shear * points[:, 2]
+        self.mesh_arrays = mesh_arrays._replace(points=points)
+        self.locator = BinnedCellLocator.from_arrays(self.mesh_arrays)
+
+    def velocities(self, rows):
+        return [
+            list(self.mesh.get_cell(uid).data[CUBA.VELOCITY])
+            for uid in self.locator.cell_uids[rows]]
+
+    def test_face_planes(self):
+        face_normals, face_offsets = cell_face_planes(self.mesh_arrays)
+        self.assertEqual(face_normals.shape, (6, 6, 3))
+        np.testing.assert_allclose(
+            np.sqrt((face_normals ** 2).sum(axis=2)), 1.0)
+        # The cell points are on the inner side of the planes
+        cell_points = self.mesh_arrays.points[self.mesh_arrays.connectivity]
+        self.assertTrue((
+            np.einsum('cpk,cfk->cpf', cell_points, face_normals) <=
+            face_offsets[:, np.newaxis, :]).all())
+
+    def test_locate(self):
+        # In the bounding box of the cell (0, 0, 0), whose centre is the
+        # closest, but in the cell (1, 0, 0)
+        rows = self.locator.locate([[1.2, 0.5, 0.1]])
+        self.assertEqual(self.velocities(rows), [[1.0, 0.0, 0.0]])
+
+        unsheared = np.random.RandomState(0).uniform(
+            size=(200, 3)) * [3.0, 1.0, 1.0]
+        points = unsheared.copy()
+        points[:, 0] += self.shear * points[:, 2]
+        self.assertEqual(
+            self.velocities(self.locator.locate(points)),
+            expected_velocities(unsheared, *self.nodes))
+
+    def test_incremental(self):
+        locator = IncrementalCellLocator(self.locator)
+        locator.locate([[0.5, 0.5, 0.1]])
+
+        # Still in the bounding box of its cell, but in the next cell
+        rows = locator.locate([[1.2, 0.5, 0.1]])
+        self.assertEqual(locator.num_relocated, 1)
+        self.assertEqual(self.velocities(rows), [[1.0, 0.0, 0.0]])
+
+    def test_unknown_point_order(self):
+        # The face planes of cells whose points are not in the VTK order
+        # are not used
+        mesh_arrays = self.mesh_arrays._replace(
+            connectivity=self.mesh_arrays.connectivity[
+                :, [0, 2, 1, 3, 4, 6, 5, 7]])
+        face_normals, face_offsets = cell_face_planes(mesh_arrays)
+        self.assertFalse(face_normals.any())
+        self.assertFalse(face_offsets.any())
+
+
+class TestIncrementalCellLocator(unittest.TestCase):
+
+    def setUp(self):
+        self.nodes = (
+            [0.0, 0.05, 0.1, 0.2, 0.4, 0.7, 1.0],
+            [0.0, 0.5, 0.6, 2.0],
+            [0.0, 0.2, 0.3])
+        self.mesh_locator = BinnedCellLocator.from_arrays(
+            extract_mesh_arrays(create_rectilinear_mesh(*self.nodes)))
+        self.locator = IncrementalCellLocator(self.mesh_locator)
+        self.points = np.random.RandomState(0).uniform(
+            size=(100, 3)) * [1.0, 2.0, 0.3]
+
+    def test_first_call_locates_all(self):
+        rows = self.locator.locate(self.points)
+        self.assertEqual(self.locator.num_relocated, 100)
+        np.testing.assert_array_equal(
+            rows, self.mesh_locator.locate(self.points))
+
+    def test_only_moved_particles_are_located(self):
+        self.locator.locate(self.points)
+        # Move some particles to the centre of the first cell
+        moved = self.points.copy()
+        moved[:10] = [0.025, 0.25, 0.1]
+        rows = self.locator.locate(moved)
+        first_cell = self.mesh_locator.locate([[0.025, 0.25, 0.1]])[0]
+        already_there = (
+            self.mesh_locator.locate(self.points[:10]) == first_cell).sum()
+        self.assertEqual(self.locator.num_relocated, 10 - already_there)
+        np.testing.assert_array_equal(
+            rows, self.mesh_locator.locate(moved))
+
+    def test_still_particles(self):
+        self.locator.locate(self.points)
+        self.locator.locate(self.points)
+        self.assertEqual(self.locator.num_relocated, 0)
+
+    def test_particle_count_change(self):
+        self.locator.locate(self.points)
+        rows = self.locator.locate(self.points[:50])
+        self.assertEqual(self.locator.num_relocated, 50)
+        self.assertEqual(len(rows), 50)
+
+    def test_reset(self):
+        self.locator.locate(self.points)
+        self.locator.reset()
+        self.locator.locate(self.points)
+        self.assertEqual(self.locator.num_relocated, 100)
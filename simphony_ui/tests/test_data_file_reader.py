@@ -0,0 +1,215 @@
+"""
+Tests the LIGGGHTS data file reader
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+import numpy as np
+from simphony.core.cuba import CUBA
+from simphony.core.cuds_item import CUDSItem
+from simphony.engine import liggghts
+
+from simphony_ui.liggghts_model import data_file_reader
+from simphony_ui.liggghts_model.data_file_reader import (
+    FLOW_TYPE, WALL_TYPE, create_particles, load_data_file,
+    parse_data_file, read_data_file, sidecar_path)
+from simphony_ui.tests.test_utils import cleanup_garbage
+
+FIXTURE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'fixtures',
+    'liggghts_input.dat')
+
+DATA_FILE = """LIGGGHTS data file
+
+3 atoms
+2 atom types
+
+1.0 2.0 xlo xhi
+-1.0 1.0 ylo yhi
+0.0 0.5 zlo zhi
+
+Atoms # granular
+
+2 2 0.2 3.0 1.5 0.0 0.25 0 0 0
+0 1 0.1 2.0 1.1 0.1 0.1 0 0 0
+1 1 0.1 2.0 1.2 0.2 0.2 0 0 0
+
+Velocities
+
+1 1.0 2.0 3.0 0.0 0.0 1.0
+0 -1.0 0.0 0.0 0.0 0.0 0.0
+2 0.0 0.0 0.0 0.0 0.0 0.0
+"""
+
+
+class TestParseDataFile(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        with cleanup_garbage(self.temp_dir):
+            self.path = os.path.join(self.temp_dir, 'particles.dat')
+            with open(self.path, 'w') as data_file:
+                data_file.write(DATA_FILE)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_fixture(self):
+        data = parse_data_file(FIXTURE)
+        self.assertEqual(len(data.ids), 2925)
+        self.assertEqual((data.types == FLOW_TYPE).sum(), 200)
+        self.assertEqual((data.types == WALL_TYPE).sum(), 2725)
+        np.testing.assert_allclose(data.box_origin, (0.0, 0.0, 0.0))
+        np.testing.assert_allclose(
+            data.box_vectors, np.diag((0.1, 0.01, 0.002)))
+
+    def test_sections(self):
+        data = parse_data_file(self.path)
+        np.testing.assert_array_equal(data.ids, (2, 0, 1))
+        np.testing.assert_array_equal(data.types, (2, 1, 1))
+        np.testing.assert_allclose(data.diameters, (0.2, 0.1, 0.1))
+        np.testing.assert_allclose(data.densities, (3.0, 2.0, 2.0))
+        np.testing.assert_allclose(data.coordinates[1], (1.1, 0.1, 0.1))
+        np.testing.assert_allclose(data.box_origin, (1.0, -1.0, 0.0))
+
+    def test_velocities_by_id(self):
+        data = parse_data_file(self.path)
+        np.testing.assert_allclose(
+            data.velocities,
+            [(0.0, 0.0, 0.0), (-1.0, 0.0, 0.0), (1.0, 2.0, 3.0)])
+        np.testing.assert_allclose(
+            data.angular_velocities[2], (0.0, 0.0, 1.0))
+
+    def test_invalid_atoms(self):
+        with open(self.path, 'w') as data_file:
+            data_file.write(DATA_FILE.replace('3 atoms', '4 atoms'))
+        with self.assertRaises(ValueError):
+            parse_data_file(self.path)
+
+    def test_no_atoms_section(self):
+        with open(self.path, 'w') as data_file:
+            data_file.write('LIGGGHTS data file\n\n3 atoms\n')
+        with self.assertRaises(ValueError):
+            parse_data_file(self.path)
+
+
+class TestLoadDataFile(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        with cleanup_garbage(self.temp_dir):
+            self.path = os.path.join(self.temp_dir, 'particles.dat')
+            shutil.copy(FIXTURE, self.path)
+            self.cache_dir = os.path.join(self.temp_dir, 'cache')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_sidecar_written(self):
+        load_data_file(self.path, self.cache_dir)
+        self.assertTrue(os.path.exists(
+            sidecar_path(self.path, self.cache_dir)))
+        self.assertEqual(
+            sorted(os.listdir(self.temp_dir)), ['cache', 'particles.dat'])
+
+    def test_sidecar_reused(self):
+        expected = load_data_file(self.path, self.cache_dir)
+        with mock.patch.object(
+                data_file_reader, 'parse_data_file') as parse:
+            data = load_data_file(self.path, self.cache_dir)
+        self.assertFalse(parse.called)
+        for field in data._fields:
+            np.testing.assert_array_equal(
+                getattr(data, field), getattr(expected, field))
+
+    def test_sidecar_reused_after_touch(self):
+        load_data_file(self.path, self.cache_dir)
+        stat = os.stat(self.path)
+        os.utime(self.path, (stat.st_atime, stat.st_mtime + 10))
+        with mock.patch.object(
+                data_file_reader, 'parse_data_file') as parse:
+            load_data_file(self.path, self.cache_dir)
+        self.assertFalse(parse.called)
+
+    def test_sidecar_outdated(self):
+        load_data_file(self.path, self.cache_dir)
+        with open(self.path) as data_file:
+            content = data_file.read()
+        with open(self.path, 'w') as data_file:
+            data_file.write(content.replace(
+                '0 1 0.001 1.0 0.0441836923463', '0 1 0.001 1.0 0.05', 1))
+        stat = os.stat(self.path)
+        os.utime(self.path, (stat.st_atime, stat.st_mtime + 10))
+
+        data = load_data_file(self.path, self.cache_dir)
+        self.assertEqual(data.coordinates[0, 0], 0.05)
+
+    def test_without_sidecar(self):
+        load_data_file(self.path)
+        self.assertEqual(os.listdir(self.temp_dir), ['particles.dat'])
+
+
+class TestReadDataFile(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        with cleanup_garbage(self.temp_dir):
+            self.path = os.path.join(self.temp_dir, 'particles.dat')
+            with open(self.path, 'w') as data_file:
+                data_file.write(DATA_FILE)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_datasets(self):
+        flow_particles, wall_particles = read_data_file(self.path)
+        self.assertEqual(flow_particles.name, 'flow_particles')
+        self.assertEqual(wall_particles.name, 'wall_particles')
+        self.assertEqual(flow_particles.count_of(CUDSItem.PARTICLE), 2)
+        self.assertEqual(wall_particles.count_of(CUDSItem.PARTICLE), 1)
+
+    def test_same_as_liggghts_reader(self):
+        datasets = read_data_file(FIXTURE)
+        expected_datasets = liggghts.read_data_file(FIXTURE)
+
+        for particles, expected in zip(datasets, expected_datasets):
+            self.assertEqual(particles.count_of(CUDSItem.PARTICLE),
+                             expected.count_of(CUDSItem.PARTICLE))
+            for key, value in expected.data_extension.items():
+                np.testing.assert_allclose(
+                    particles.data_extension[key], value)
+
+            # The particles are matched by their coordinates, their uids
+            # being generated by each reader
+            by_coordinates = {
+                particle.coordinates: particle
+                for particle in particles.iter_particles()}
+            for expected_particle in expected.iter_particles():
+                particle = by_coordinates[expected_particle.coordinates]
+                for cuba in (CUBA.RADIUS, CUBA.DENSITY, CUBA.VELOCITY):
+                    np.testing.assert_allclose(
+                        particle.data[cuba], expected_particle.data[cuba])
+                self.assertEqual(
+                    particle.data[CUBA.MATERIAL_TYPE],
+                    expected_particle.data[CUBA.MATERIAL_TYPE])
+
+    def test_particle_data(self):
+        particles = create_particles(
+            parse_data_file(self.path), WALL_TYPE, 'wall')
+        particle = next(particles.iter_particles())
+        self.assertEqual(particle.coordinates, (1.5, 0.0, 0.25))
+        self.assertAlmostEqual(particle.data[CUBA.RADIUS], 0.1)
+        self.assertEqual(particle.data[CUBA.DENSITY], 3.0)
+        self.assertEqual(particle.data[CUBA.MATERIAL_TYPE], WALL_TYPE)
+        self.assertEqual(particle.data[CUBA.VELOCITY], (0.0, 0.0, 0.0))
+        self.assertEqual(
+            particles.data_extension[liggghts.CUBAExtension.BOX_ORIGIN],
+            (1.0, -1.0, 0.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
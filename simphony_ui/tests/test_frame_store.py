@@ -0,0 +1,160 @@
+"""
+Tests the storage of the frames on disk
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from simphony.cuds.particles import Particle, Particles
+
+from simphony_ui.frame_store import FrameStore
+from simphony_ui.frames import MESH_FILE, frame_file_name, snapshot_datasets
+from simphony_ui.openfoam_model.mesh_index import extract_mesh_arrays
+from simphony_ui.tests.test_utils import (
+    cleanup_garbage, create_cartesian_mesh)
+
+
+class TestFrameStore(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        with cleanup_garbage(self.temp_dir):
+            self.directory = os.path.join(self.temp_dir, 'frames')
+
+            mesh = create_cartesian_mesh((1.0, 1.0, 1.0), (2, 3, 1))
+            mesh_arrays = extract_mesh_arrays(mesh)
+            self.snapshots = []
+            for index in range(4):
+                flow_particles = Particles('flow_particles')
+                flow_particles.add_particles([
+                    Particle((0.1 * i, 0.5, 0.5)) for i in range(index + 1)])
+                self.snapshots.append(snapshot_datasets(
+                    (mesh, flow_particles, Particles('wall_particles')),
+                    10 * index, mesh_arrays))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def create_store(self, cache_size=2):
+        store = FrameStore.create(self.directory, cache_size)
+        for snapshot in self.snapshots:
+            store.append(snapshot)
+        self.addCleanup(store.close)
+        return store
+
+    def assert_same_frame(self, snapshot, expected):
+        self.assertEqual(snapshot.iteration, expected.iteration)
+        np.testing.assert_allclose(
+            snapshot.cell_data['velocity'], expected.cell_data['velocity'])
+        np.testing.assert_allclose(
+            snapshot.particles['flow'].coordinates,
+            expected.particles['flow'].coordinates)
+
+    def test_append(self):
+        store = self.create_store()
+
+        self.assertEqual(len(store), 4)
+        self.assertEqual(store.num_cached, 2)
+        self.assertTrue(os.path.exists(
+            os.path.join(self.directory, frame_file_name(3))))
+        # The last appended frames are in memory
+        self.assertIs(store[3], self.snapshots[3])
+        self.assertIs(store[-2], self.snapshots[2])
+
+    def test_load(self):
+        store = self.create_store()
+
+        snapshot = store[0]
+
+        self.assertIsNot(snapshot, self.snapshots[0])
+        self.assert_same_frame(snapshot, self.snapshots[0])
+        self.assertIs(snapshot.mesh, self.snapshots[0].mesh)
+        self.assertIs(store[0], snapshot)
+        self.assertEqual(store.num_cached, 2)
+
+    def test_least_recently_used(self):
+        store = self.create_store()
+        store[2]
+
+        # Frame 3 is dropped, 2 was accessed more recently
+        store[0]
+
+        self.assertIs(store[2], self.snapshots[2])
+        self.assertIsNot(store[3], self.snapshots[3])
+
+    def test_cache_size(self):
+        store = self.create_store(cache_size=4)
+        self.assertEqual(store.num_cached, 4)
+
+        store.cache_size = 1
+
+        self.assertEqual(store.num_cached, 1)
+        self.assertIs(store[3], self.snapshots[3])
+
+    def test_invalid_cache_size(self):
+        with self.assertRaises(ValueError):
+            FrameStore.create(self.directory, 0)
+
+        store = self.create_store()
+        with self.assertRaises(ValueError):
+            store.cache_size = 0
+        self.assertEqual(store.cache_size, 2)
+
+    def test_open(self):
+        self.create_store()
+
+        store = FrameStore.open(self.directory)
+        self.addCleanup(store.close)
+
+        self.assertEqual(len(store), 4)
+        self.assertEqual(store.num_cached, 0)
+        snapshot = store[1]
+        self.assert_same_frame(snapshot, self.snapshots[1])
+        np.testing.assert_allclose(
+            snapshot.mesh.points, self.snapshots[1].mesh.points)
+        self.assertIsNone(snapshot.mesh.cell_uids)
+        self.assertIs(store[2].mesh, snapshot.mesh)
+
+    def test_prefetch(self):
+        self.create_store()
+        store = FrameStore.open(self.directory)
+
+        store.prefetch([-1, 0, 1, 4])
+        store.close()
+
+        # close waits for the prefetching, and drops the frames
+        self.assertEqual(store.num_cached, 0)
+
+        store = FrameStore.open(self.directory)
+        self.addCleanup(store.close)
+        store.prefetch([0, 1])
+        store._executor.shutdown(wait=True)
+        self.assertEqual(store.num_cached, 2)
+        self.assert_same_frame(store[1], self.snapshots[1])
+
+    def test_create_removes_frames(self):
+        self.create_store()
+
+        store = FrameStore.create(self.directory)
+        self.addCleanup(store.close)
+
+        self.assertEqual(len(store), 0)
+        self.assertEqual(os.listdir(self.directory), [])
+        store.append(self.snapshots[0])
+        self.assertTrue(os.path.exists(
+            os.path.join(self.directory, MESH_FILE)))
+
+    def test_index_error(self):
+        store = self.create_store()
+
+        with self.assertRaises(IndexError):
+            store[4]
+        with self.assertRaises(IndexError):
+            store[-5]
+
+
+if __name__ == '__main__':
+    unittest.main()
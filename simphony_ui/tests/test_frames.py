@@ -0,0 +1,121 @@
+"""
+Tests the writing of the frames to disk
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from simphony.core.cuba import CUBA
+from simphony.cuds.particles import Particle, Particles
+
+from simphony_ui.frames import (
+    FrameWriter, MESH_FILE, frame_file_name, read_frame, read_mesh,
+    snapshot_datasets, take_snapshot)
+from simphony_ui.openfoam_model.mesh_index import extract_mesh_arrays
+from simphony_ui.particle_store import ParticleStore
+from simphony_ui.tests.test_utils import (
+    cleanup_garbage, create_cartesian_mesh)
+
+
+class TestFrameWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        with cleanup_garbage(self.temp_dir):
+            self.directory = os.path.join(self.temp_dir, 'frames')
+
+            self.mesh = create_cartesian_mesh((1.0, 1.0, 1.0), (2, 3, 1))
+            self.flow_particles = Particles('flow_particles')
+            self.flow_particles.add_particles([
+                Particle((0.1, 0.2, 0.3), data={
+                    CUBA.VELOCITY: (1.0, 0.0, 0.0), CUBA.RADIUS: 0.5}),
+            ])
+            self.wall_particles = Particles('wall_particles')
+            self.datasets = (
+                self.mesh, self.flow_particles, self.wall_particles)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_mesh(self):
+        FrameWriter(self.directory).write(
+            snapshot_datasets(self.datasets, 0))
+
+        with np.load(os.path.join(self.directory, MESH_FILE)) as mesh:
+            self.assertEqual(mesh['points'].shape, (24, 3))
+            self.assertEqual(mesh['connectivity'].shape, (6, 8))
+
+    def test_frames(self):
+        writer = FrameWriter(self.directory)
+        writer.write(snapshot_datasets(self.datasets, 0))
+        path = writer.write(snapshot_datasets(self.datasets, 4))
+
+        self.assertEqual(writer.num_frames, 2)
+        self.assertEqual(path, os.path.join(
+            self.directory, frame_file_name(1)))
+        with np.load(path) as frame:
+            self.assertEqual(int(frame['iteration']), 4)
+            self.assertEqual(frame['cell_velocity'].shape, (6, 3))
+            self.assertNotIn('cell_pressure', frame.files)
+            np.testing.assert_allclose(
+                frame['flow_coordinates'], [(0.1, 0.2, 0.3)])
+            np.testing.assert_allclose(frame['flow_radii'], [0.5])
+            self.assertEqual(frame['wall_coordinates'].shape, (0, 3))
+
+    def test_read_frame(self):
+        snapshot = snapshot_datasets(self.datasets, 4)
+        path = FrameWriter(self.directory).write(snapshot)
+
+        mesh = read_mesh(self.directory)
+        frame = read_frame(path, mesh)
+
+        np.testing.assert_allclose(mesh.points, snapshot.mesh.points)
+        self.assertEqual(mesh.connectivity.tolist(),
+                         snapshot.mesh.connectivity.tolist())
+        self.assertIs(frame.mesh, mesh)
+        self.assertEqual(frame.iteration, 4)
+        np.testing.assert_allclose(
+            frame.cell_data['velocity'], snapshot.cell_data['velocity'])
+        self.assertNotIn('pressure', frame.cell_data)
+        np.testing.assert_allclose(frame.particles['flow'].radii, [0.5])
+        self.assertEqual(frame.particles['wall'].coordinates.shape, (0, 3))
+
+
+class TestSnapshots(unittest.TestCase):
+
+    def setUp(self):
+        self.mesh = create_cartesian_mesh((1.0, 1.0, 1.0), (2, 3, 1))
+        self.mesh_arrays = extract_mesh_arrays(self.mesh)
+        self.store = ParticleStore.from_particles(Particles('flow'))
+
+    def test_take_snapshot(self):
+        velocities = np.ones((6, 3))
+        snapshot = take_snapshot(
+            3, self.mesh_arrays, {'velocity': velocities},
+            {'flow': self.store, 'wall': self.store})
+        velocities[...] = 2.0
+
+        self.assertEqual(snapshot.iteration, 3)
+        self.assertIs(snapshot.mesh, self.mesh_arrays)
+        self.assertEqual(snapshot.cell_data['velocity'].tolist(),
+                         [[1.0, 1.0, 1.0]] * 6)
+        self.assertEqual(snapshot.particles['wall'].radii.shape, (0,))
+
+    def test_snapshot_datasets(self):
+        snapshot = snapshot_datasets(
+            (self.mesh, Particles('flow'), Particles('wall')), 2,
+            self.mesh_arrays)
+
+        self.assertIs(snapshot.mesh, self.mesh_arrays)
+        for row, uid in enumerate(self.mesh_arrays.cell_uids):
+            self.assertEqual(
+                snapshot.cell_data['velocity'][row].tolist(),
+                list(self.mesh.get_cell(uid).data[CUBA.VELOCITY]))
+        self.assertNotIn('pressure', snapshot.cell_data)
+
+
+if __name__ == '__main__':
+    unittest.main()
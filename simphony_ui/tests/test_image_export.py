@@ -0,0 +1,164 @@
+"""
+Tests the export of the frames to images
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import numpy as np
+from simphony.cuds.particles import Particle, Particles
+
+from simphony_ui.frames import FrameWriter, snapshot_datasets
+from simphony_ui.image_export import (
+    OffscreenRenderer, export_images, image_file_name, render_frames)
+from simphony_ui.tests.test_utils import (
+    cleanup_garbage, create_cartesian_mesh)
+
+
+def fake_renderer(frames_directory, indices, output_directory, size,
+                  camera):
+    """ Writes an empty image for each frame """
+    paths = []
+    for index in indices:
+        path = os.path.join(output_directory, image_file_name(index))
+        open(path, 'w').close()
+        paths.append(path)
+    return paths
+
+
+#: A lock held by a thread of the test process while exporting. A forked
+#: worker would inherit it locked.
+_LOCK = threading.Lock()
+
+
+def locking_renderer(frames_directory, indices, output_directory, size,
+                     camera):
+    """ Writes an empty image for each frame, holding the lock """
+    with _LOCK:
+        return fake_renderer(
+            frames_directory, indices, output_directory, size, camera)
+
+
+def failing_renderer(frames_directory, indices, output_directory, size,
+                     camera):
+    raise RuntimeError('Rendering failed')
+
+
+class TestImageExport(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        with cleanup_garbage(self.temp_dir):
+            self.frames_dir = os.path.join(self.temp_dir, 'frames')
+            self.output_dir = os.path.join(self.temp_dir, 'images')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write_frames(self, num_frames):
+        mesh = create_cartesian_mesh((1.0, 1.0, 1.0), (2, 2, 1))
+        flow_particles = Particles('flow_particles')
+        flow_particles.add_particles([Particle((0.5, 0.5, 0.5))])
+        writer = FrameWriter(self.frames_dir)
+        snapshot = snapshot_datasets(
+            (mesh, flow_particles, Particles('wall_particles')), 0)
+        for _ in range(num_frames):
+            writer.write(snapshot)
+        return snapshot
+
+    def test_export_images(self):
+        progress = []
+
+        paths = export_images(
+            self.frames_dir, 7, self.output_dir, max_workers=2,
+            chunk_size=3, renderer=fake_renderer,
+            progress_callback=lambda *args: progress.append(args))
+
+        self.assertEqual(paths, [
+            os.path.join(self.output_dir, 'frame-{}.png'.format(index))
+            for index in range(7)])
+        for path in paths:
+            self.assertTrue(os.path.exists(path))
+        # One report per chunk of 3, 3 and 1 frames, in completion order
+        self.assertEqual(len(progress), 3)
+        self.assertEqual(progress[-1], (7, 7))
+
+    def test_export_with_held_lock(self):
+        held = threading.Event()
+        release = threading.Event()
+
+        def hold_lock():
+            with _LOCK:
+                held.set()
+                release.wait()
+
+        holder = threading.Thread(target=hold_lock)
+        holder.daemon = True
+        holder.start()
+        held.wait()
+        paths = []
+        exporter = threading.Thread(target=lambda: paths.extend(
+            export_images(self.frames_dir, 4, self.output_dir,
+                          max_workers=2, chunk_size=2,
+                          renderer=locking_renderer)))
+        exporter.daemon = True
+        try:
+            exporter.start()
+            exporter.join(60)
+            self.assertFalse(exporter.is_alive())
+        finally:
+            release.set()
+            holder.join()
+
+        self.assertEqual(len(paths), 4)
+
+    def test_no_frames(self):
+        self.assertEqual(
+            export_images(self.frames_dir, 0, self.output_dir,
+                          renderer=fake_renderer),
+            [])
+
+    def test_renderer_failure(self):
+        with self.assertRaises(RuntimeError):
+            export_images(self.frames_dir, 4, self.output_dir,
+                          chunk_size=2, renderer=failing_renderer)
+
+    def test_offscreen_renderer(self):
+        snapshot = self.write_frames(1)
+        os.makedirs(self.output_dir)
+        path = os.path.join(self.output_dir, 'frame.png')
+
+        renderer = OffscreenRenderer(snapshot.mesh, size=(64, 48))
+        renderer.render(snapshot, path)
+
+        self.assertGreater(os.path.getsize(path), 0)
+
+    def test_rgb(self):
+        snapshot = self.write_frames(1)
+
+        renderer = OffscreenRenderer(snapshot.mesh, size=(64, 48))
+        image = renderer.rgb(snapshot)
+
+        self.assertEqual(image.shape, (48, 64, 3))
+        self.assertEqual(image.dtype, np.uint8)
+        self.assertTrue(image.flags['C_CONTIGUOUS'])
+
+    def test_render_frames(self):
+        self.write_frames(2)
+        os.makedirs(self.output_dir)
+
+        paths = render_frames(
+            self.frames_dir, [1, 0], self.output_dir, (64, 48), None)
+
+        self.assertEqual(paths, [
+            os.path.join(self.output_dir, image_file_name(1)),
+            os.path.join(self.output_dir, image_file_name(0))])
+        for path in paths:
+            self.assertGreater(os.path.getsize(path), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,28 @@
+"""
+Tests that the package imports fast, without the GUI and engine modules
+"""
+
+import unittest
+
+from simphony_ui.tests.import_time import IMPORT_BUDGETS, measure_import
+
+
+class TestImportTime(unittest.TestCase):
+
+    def test_no_heavy_imports(self):
+        for module in sorted(IMPORT_BUDGETS):
+            _, heavy, _ = measure_import(module)
+            self.assertEqual(
+                heavy, [], '{} imports {}'.format(module, ', '.join(heavy)))
+
+    def test_import_budget(self):
+        for module, budget in sorted(IMPORT_BUDGETS.items()):
+            elapsed, _, _ = measure_import(module)
+            self.assertLess(
+                elapsed, budget,
+                '{} takes {:.2f} s to import, more than its budget of '
+                '{:.2f} s'.format(module, elapsed, budget))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,6 +3,8 @@ Tests Liggghts wrapper creation
 """
 
 import os
+import shutil
+import tempfile
 import unittest
 
 from simphony.core.cuba import CUBA
@@ -135,3 +137,43 @@ class TestLiggghtsDatasetsCreation(unittest.TestCase):
         flow_dataset, _ = create_liggghts_datasets(self.liggghts_model)
         self.assertEqual(flow_dataset.count_of(CUDSItem.PARTICLE), 200)
         self.assertEqual(flow_dataset.count_of(CUDSItem.BOND), 0)
+
+    def test_shifted_particles(self):
+        datasets = create_liggghts_datasets(self.liggghts_model)
+
+        # The same particles in a box starting at (0.01, 0.02, 0.003)
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        with open(self.liggghts_model.input_file) as input_file:
+            content = input_file.read()
+        for old, new in (('0.0 0.1 xlo', '0.01 0.1 xlo'),
+                         ('0.0 0.01 ylo', '0.02 0.01 ylo'),
+                         ('0.0 0.002 zlo', '0.003 0.002 zlo')):
+            self.assertIn(old, content)
+            content = content.replace(old, new)
+        self.liggghts_model.input_file = os.path.join(temp_dir, 'input.dat')
+        with open(self.liggghts_model.input_file, 'w') as input_file:
+            input_file.write(content)
+
+        shifted_datasets = create_liggghts_datasets(self.liggghts_model)
+
+        # The wall particles are shifted as the flow particles
+        for dataset, shifted_dataset in zip(datasets, shifted_datasets):
+            expected = sorted(
+                (x - 0.01, y - 0.02, z - 0.003)
+                for x, y, z in (particle.coordinates
+                                for particle in dataset.iter_particles()))
+            coordinates = sorted(
+                particle.coordinates
+                for particle in shifted_dataset.iter_particles())
+            self.assertEqual(len(coordinates), len(expected))
+            for point, expected_point in zip(coordinates, expected):
+                for value, expected_value in zip(point, expected_point):
+                    self.assertAlmostEqual(value, expected_value)
+
+    def test_box_origin(self):
+        datasets = create_liggghts_datasets(self.liggghts_model)
+        for dataset in datasets:
+            self.assertEqual(
+                dataset.data_extension[liggghts.CUBAExtension.BOX_ORIGIN],
+                (0.0, 0.0, 0.0))
@@ -0,0 +1,228 @@
+"""
+Tests the on-disk cell locator cache
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import mock
+import numpy as np
+
+from simphony_ui.openfoam_model import mesh_cache
+from simphony_ui.openfoam_model.cell_locator import BinnedCellLocator
+from simphony_ui.openfoam_model.mesh_cache import (
+    CellLocatorCache, cached_cell_locator, mesh_cache_key)
+from simphony_ui.openfoam_model.mesh_index import CellIndex
+from simphony_ui.openfoam_model.openfoam_model import OpenfoamModel
+from simphony_ui.tests.test_utils import (
+    cleanup_garbage, create_cartesian_mesh, create_rectilinear_mesh)
+
+
+class TestMeshCacheKey(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        with cleanup_garbage(self.temp_dir):
+            self.settings = OpenfoamModel()
+            self.settings.input_file = os.path.join(
+                self.temp_dir, 'input.txt')
+            with open(self.settings.input_file, 'w') as input_file:
+                input_file.write('blocks')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_same_settings(self):
+        self.assertEqual(mesh_cache_key(self.settings),
+                         mesh_cache_key(self.settings))
+
+    def test_mesh_parameters(self):
+        key = mesh_cache_key(self.settings)
+        self.settings.num_grid_x = 12
+        self.assertNotEqual(mesh_cache_key(self.settings), key)
+        key = mesh_cache_key(self.settings)
+        self.settings.mesh_type = 'quad'
+        self.assertNotEqual(mesh_cache_key(self.settings), key)
+
+    def test_input_file_contents(self):
+        key = mesh_cache_key(self.settings)
+        with open(self.settings.input_file, 'w') as input_file:
+            input_file.write('other blocks')
+        self.assertNotEqual(mesh_cache_key(self.settings), key)
+
+    def test_quad_mesh_input_file(self):
+        self.settings.mesh_type = 'quad'
+        key = mesh_cache_key(self.settings)
+        with open(self.settings.input_file, 'w') as input_file:
+            input_file.write('other blocks')
+        self.assertEqual(mesh_cache_key(self.settings), key)
+
+        self.settings.input_file = ''
+        self.assertEqual(mesh_cache_key(self.settings), key)
+
+    def test_physical_parameters(self):
+        key = mesh_cache_key(self.settings)
+        self.settings.viscosity = 0.5
+        self.assertEqual(mesh_cache_key(self.settings), key)
+
+
+class TestCellLocatorCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        with cleanup_garbage(self.temp_dir):
+            self.settings = OpenfoamModel()
+            self.settings.output_path = self.temp_dir
+            self.settings.input_file = os.path.join(
+                self.temp_dir, 'input.txt')
+            with open(self.settings.input_file, 'w') as input_file:
+                input_file.write('blocks')
+            self.channel_size = (1.0, 2.0, 3.0)
+            self.num_grid = (2, 3, 4)
+            self.mesh = create_cartesian_mesh(
+                self.channel_size, self.num_grid)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_reload(self):
+        mesh_arrays, locator = cached_cell_locator(
+            self.mesh, self.settings, self.channel_size, self.num_grid)
+        self.assertIsInstance(locator, CellIndex)
+        self.assertNotIsInstance(locator.table, np.memmap)
+
+        cached_arrays, cached_locator = cached_cell_locator(
+            self.mesh, self.settings, self.channel_size, self.num_grid)
+        self.assertIsInstance(cached_locator, CellIndex)
+        self.assertIsInstance(cached_locator.table, np.memmap)
+        np.testing.assert_array_equal(cached_locator.table, locator.table)
+        np.testing.assert_array_equal(
+            cached_arrays.connectivity, mesh_arrays.connectivity)
+        self.assertEqual(
+            list(cached_locator.cell_uids), list(locator.cell_uids))
+
+        points = [[0.1, 0.1, 0.1], [0.9, 1.9, 2.9]]
+        np.testing.assert_array_equal(
+            cached_locator.locate(points), locator.locate(points))
+
+    def test_binned_locator(self):
+        mesh = create_rectilinear_mesh(
+            [0.0, 0.1, 1.0], [0.0, 0.5, 2.0], [0.0, 3.0])
+        _, locator = cached_cell_locator(
+            mesh, self.settings, self.channel_size, self.num_grid)
+        _, cached_locator = cached_cell_locator(
+            mesh, self.settings, self.channel_size, self.num_grid)
+        self.assertIsInstance(cached_locator, BinnedCellLocator)
+        np.testing.assert_array_equal(
+            cached_locator.bin_cells, locator.bin_cells)
+        np.testing.assert_array_equal(
+            cached_locator.face_normals, locator.face_normals)
+
+    def test_older_entry(self):
+        mesh = create_rectilinear_mesh(
+            [0.0, 0.1, 1.0], [0.0, 0.5, 2.0], [0.0, 3.0])
+        cache = CellLocatorCache(os.path.join(self.temp_dir, 'cache'))
+        key = mesh_cache_key(self.settings)
+        cached_cell_locator(mesh, self.settings, self.channel_size,
+                            self.num_grid, cache=cache, key=key)
+
+        # An entry written before the face planes were added
+        index_path = os.path.join(cache.directory, key, 'index.json')
+        with open(index_path) as index_file:
+            index = json.load(index_file)
+        index['arrays'].remove('face_normals')
+        with open(index_path, 'w') as index_file:
+            json.dump(index, index_file)
+
+        self.assertIsNone(cache.load(key, mesh))
+
+    def test_mesh_mismatch(self):
+        cached_cell_locator(
+            self.mesh, self.settings, self.channel_size, self.num_grid)
+        other_mesh = create_cartesian_mesh(self.channel_size, self.num_grid)
+        _, locator = cached_cell_locator(
+            other_mesh, self.settings, self.channel_size, self.num_grid)
+        self.assertNotIsInstance(locator.table, np.memmap)
+        for uid in locator.cell_uids:
+            other_mesh.get_cell(uid)
+
+    def test_renumbered_cells(self):
+        cached_cell_locator(
+            self.mesh, self.settings, self.channel_size, self.num_grid)
+        cells = list(self.mesh.iter_cells())
+
+        # The same cells, iterated in another order
+        with mock.patch.object(
+                self.mesh, 'iter_cells',
+                side_effect=lambda *args: iter(cells[::-1])):
+            mesh_arrays, locator = cached_cell_locator(
+                self.mesh, self.settings, self.channel_size, self.num_grid)
+
+        self.assertNotIsInstance(locator.table, np.memmap)
+        self.assertEqual(list(mesh_arrays.cell_uids),
+                         [cell.uid for cell in cells[::-1]])
+
+    def test_cell_count_mismatch(self):
+        cached_cell_locator(
+            self.mesh, self.settings, self.channel_size, self.num_grid)
+        cache = CellLocatorCache(
+            os.path.join(self.temp_dir, 'cache', 'cell_locator'))
+        key = mesh_cache_key(self.settings)
+        num_cells = len(list(self.mesh.iter_cells()))
+        self.assertIsNotNone(cache.load(key, self.mesh))
+
+        with mock.patch.object(
+                self.mesh, 'count_of', return_value=num_cells + 1):
+            self.assertIsNone(cache.load(key, self.mesh))
+
+    def test_eviction(self):
+        cache = CellLocatorCache(os.path.join(self.temp_dir, 'cache'),
+                                 max_size=1)
+        cached_cell_locator(self.mesh, self.settings, self.channel_size,
+                            self.num_grid, cache=cache)
+        self.settings.num_grid_x = 12
+        cached_cell_locator(self.mesh, self.settings, self.channel_size,
+                            self.num_grid, cache=cache)
+        self.assertEqual(os.listdir(cache.directory),
+                         [mesh_cache_key(self.settings)])
+
+    def test_eviction_keeps_entries_being_written(self):
+        cache = CellLocatorCache(os.path.join(self.temp_dir, 'cache'),
+                                 max_size=1)
+        # An entry being written by another process
+        temp_path = os.path.join(cache.directory, '.entry')
+        os.makedirs(temp_path)
+        with open(os.path.join(temp_path, 'points.npy'), 'w') as array:
+            array.write('points')
+
+        cached_cell_locator(self.mesh, self.settings, self.channel_size,
+                            self.num_grid, cache=cache)
+
+        self.assertEqual(sorted(os.listdir(cache.directory)),
+                         ['.entry', mesh_cache_key(self.settings)])
+
+    def test_eviction_removes_stale_entries(self):
+        cache = CellLocatorCache(os.path.join(self.temp_dir, 'cache'))
+        # An entry left by a process which stopped while writing it
+        temp_path = os.path.join(cache.directory, '.entry')
+        os.makedirs(temp_path)
+        age = mesh_cache.TEMPORARY_ENTRY_LIFETIME + 1
+        os.utime(temp_path, (time.time() - age, time.time() - age))
+
+        cached_cell_locator(self.mesh, self.settings, self.channel_size,
+                            self.num_grid, cache=cache)
+
+        self.assertEqual(os.listdir(cache.directory),
+                         [mesh_cache_key(self.settings)])
+
+    def test_given_key(self):
+        cache = CellLocatorCache(os.path.join(self.temp_dir, 'cache'))
+        with mock.patch.object(mesh_cache, 'mesh_cache_key') as cache_key:
+            cached_cell_locator(self.mesh, self.settings, self.channel_size,
+                                self.num_grid, cache=cache, key='mesh-key')
+        self.assertFalse(cache_key.called)
+        self.assertEqual(os.listdir(cache.directory), ['mesh-key'])
@@ -0,0 +1,125 @@
+"""
+Tests the mesh cell index
+"""
+
+import unittest
+
+import numpy as np
+from simphony.core.cuba import CUBA
+
+from simphony_ui.openfoam_model.mesh_index import (
+    CellIndex, CellLocator, extract_cell_data, extract_mesh_arrays,
+    update_cell_data)
+from simphony_ui.tests.test_utils import create_cartesian_mesh
+
+
+class TestExtractMeshArrays(unittest.TestCase):
+
+    def setUp(self):
+        self.mesh = create_cartesian_mesh((1.0, 2.0, 3.0), (2, 3, 4))
+
+    def test_shapes(self):
+        mesh_arrays = extract_mesh_arrays(self.mesh)
+        self.assertEqual(mesh_arrays.points.shape, (60, 3))
+        self.assertEqual(mesh_arrays.connectivity.shape, (24, 8))
+        self.assertEqual(mesh_arrays.point_counts.tolist(), [8] * 24)
+        self.assertEqual(len(mesh_arrays.cell_uids), 24)
+
+    def test_connectivity(self):
+        mesh_arrays = extract_mesh_arrays(self.mesh)
+        for row, uid in enumerate(mesh_arrays.cell_uids):
+            cell = self.mesh.get_cell(uid)
+            expected = [self.mesh.get_point(point).coordinates
+                        for point in cell.points]
+            np.testing.assert_array_equal(
+                mesh_arrays.points[mesh_arrays.connectivity[row]], expected)
+
+
+class TestCellIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.channel_size = (1.0, 2.0, 3.0)
+        self.num_grid = (2, 3, 4)
+        self.mesh = create_cartesian_mesh(self.channel_size, self.num_grid)
+        self.cell_index = CellIndex.from_mesh(
+            self.mesh, self.channel_size, self.num_grid)
+
+    def test_table(self):
+        self.assertEqual(self.cell_index.table.shape, self.num_grid)
+        self.assertTrue((self.cell_index.table >= 0).all())
+        for (i, j, k), row in np.ndenumerate(self.cell_index.table):
+            cell = self.mesh.get_cell(self.cell_index.cell_uids[row])
+            self.assertEqual(cell.data[CUBA.VELOCITY], (i, j, k))
+
+    def test_locate(self):
+        coordinates = np.array([
+            [0.1, 0.1, 0.1],
+            [0.9, 1.9, 2.9],
+            [0.6, 1.0, 1.6],
+            # One element outside of the grid is wrapped around
+            [1.0, -0.1, 3.0]])
+        rows = self.cell_index.locate(coordinates)
+        velocities = [
+            self.mesh.get_cell(uid).data[CUBA.VELOCITY]
+            for uid in self.cell_index.cell_uids[rows]]
+        self.assertEqual(
+            velocities,
+            [(0, 0, 0), (1, 2, 3), (1, 1, 2), (0, 2, 0)])
+
+    def test_locate_outside(self):
+        with self.assertRaises(ValueError):
+            self.cell_index.locate([[5.0, 0.0, 0.0]])
+
+    def test_abstract_locator(self):
+        with self.assertRaises(TypeError):
+            CellLocator(np.array([], dtype=object), np.zeros((0, 3)),
+                        np.zeros((0, 3)))
+
+    def test_mesh_not_fitting_grid(self):
+        with self.assertRaises(ValueError):
+            CellIndex.from_mesh(self.mesh, self.channel_size, (1, 1, 1))
+
+
+class TestExtractCellData(unittest.TestCase):
+
+    def setUp(self):
+        self.mesh = create_cartesian_mesh((1.0, 2.0, 3.0), (2, 3, 4))
+        self.cell_index = CellIndex.from_mesh(
+            self.mesh, (1.0, 2.0, 3.0), (2, 3, 4))
+
+    def test_ordered_like_cell_index(self):
+        velocities = extract_cell_data(
+            self.mesh, self.cell_index.cell_rows, CUBA.VELOCITY)
+        self.assertEqual(velocities.shape, (24, 3))
+        for (i, j, k), row in np.ndenumerate(self.cell_index.table):
+            self.assertEqual(velocities[row].tolist(), [i, j, k])
+
+    def test_out(self):
+        out = np.zeros((24, 3))
+        velocities = extract_cell_data(
+            self.mesh, self.cell_index.cell_rows, CUBA.VELOCITY, out=out)
+        self.assertIs(velocities, out)
+        self.assertEqual(out[self.cell_index.table[1, 2, 3]].tolist(),
+                         [1, 2, 3])
+
+    def test_scalar_data(self):
+        cells = list(self.mesh.iter_cells())
+        for cell in cells:
+            cell.data[CUBA.PRESSURE] = cell.data[CUBA.VELOCITY][0]
+        self.mesh.update_cells(cells)
+        pressures = extract_cell_data(
+            self.mesh, self.cell_index.cell_rows, CUBA.PRESSURE)
+        self.assertEqual(pressures.shape, (24,))
+        self.assertEqual(pressures[self.cell_index.table[1, 0, 0]], 1.0)
+
+    def test_update_cell_data(self):
+        rows = self.cell_index.cell_rows
+        velocities = extract_cell_data(self.mesh, rows, CUBA.VELOCITY)
+        update_cell_data(self.mesh, rows, {
+            CUBA.VELOCITY: velocities * 2.0,
+            CUBA.PRESSURE: velocities[:, 0]})
+
+        cell = self.mesh.get_cell(self.cell_index.cell_uids[
+            self.cell_index.table[1, 2, 3]])
+        self.assertEqual(cell.data[CUBA.VELOCITY], (2.0, 4.0, 6.0))
+        self.assertEqual(cell.data[CUBA.PRESSURE], 1.0)
@@ -0,0 +1,106 @@
+"""
+Tests running Openfoam in a child process
+"""
+
+import unittest
+
+import numpy as np
+from simphony.core.cuba import CUBA
+
+from simphony_ui.openfoam_model.mesh_index import (
+    CellIndex, extract_cell_data)
+from simphony_ui.openfoam_model.openfoam_process import (
+    OpenfoamProcess, copy_mesh, needs_cell_fields)
+from simphony_ui.tests.test_utils import create_cartesian_mesh
+
+
+class FakeWrapper(object):
+    """ Sets the cell velocities to the number of runs, and the pressures
+    to minus the number of runs """
+
+    def __init__(self, mesh, fail_at=None):
+        self.mesh = mesh
+        self.fail_at = fail_at
+        self.runs = 0
+
+    def run(self):
+        self.runs += 1
+        if self.runs == self.fail_at:
+            raise ValueError('Diverged at run {}'.format(self.runs))
+        cells = list(self.mesh.iter_cells())
+        for cell in cells:
+            cell.data[CUBA.VELOCITY] = (float(self.runs), 0.0, 0.0)
+            cell.data[CUBA.PRESSURE] = -float(self.runs)
+        self.mesh.update_cells(cells)
+
+
+class TestOpenfoamProcess(unittest.TestCase):
+
+    def setUp(self):
+        self.mesh = create_cartesian_mesh((1.0, 2.0, 3.0), (2, 3, 4))
+        self.cell_rows = CellIndex.from_mesh(
+            self.mesh, (1.0, 2.0, 3.0), (2, 3, 4)).cell_rows
+        self.velocities = np.zeros((24, 3))
+        self.pressures = np.zeros(24)
+
+    def create_process(self, wrapper, num_iterations=5, update_frequency=2):
+        process = OpenfoamProcess(
+            wrapper, self.mesh, self.cell_rows, num_iterations,
+            update_frequency)
+        self.addCleanup(process.close)
+        process.start()
+        return process
+
+    def test_fetch(self):
+        initial_velocities = extract_cell_data(
+            self.mesh, self.cell_rows, CUBA.VELOCITY)
+        wrapper = FakeWrapper(self.mesh)
+        process = self.create_process(wrapper)
+
+        for step in range(5):
+            process.fetch(step, self.velocities, self.pressures)
+            self.assertEqual(
+                self.velocities[:, 0].tolist(), [step + 1.0] * 24)
+            if needs_cell_fields(step, 5, 2):
+                self.assertEqual(
+                    self.pressures.tolist(), [-step - 1.0] * 24)
+
+        # The wrapper only ran in the child process
+        self.assertEqual(wrapper.runs, 0)
+        np.testing.assert_array_equal(
+            extract_cell_data(self.mesh, self.cell_rows, CUBA.VELOCITY),
+            initial_velocities)
+
+    def test_failure(self):
+        process = self.create_process(FakeWrapper(self.mesh, fail_at=3))
+
+        process.fetch(0, self.velocities)
+        process.fetch(1, self.velocities)
+        with self.assertRaisesRegexp(RuntimeError, 'Diverged at run 3'):
+            process.fetch(2, self.velocities)
+
+    def test_close_early(self):
+        process = self.create_process(FakeWrapper(self.mesh), 100)
+
+        process.fetch(0, self.velocities)
+        process.close()
+        self.assertFalse(process._process.is_alive())
+
+    def test_needs_cell_fields(self):
+        self.assertEqual(
+            [step for step in range(10) if needs_cell_fields(step, 10, 4)],
+            [0, 4, 8, 9])
+
+    def test_copy_mesh(self):
+        mesh_copy = copy_mesh(self.mesh, 'frame')
+        self.assertEqual(mesh_copy.name, 'frame')
+        self.assertEqual(
+            sorted(cell.uid for cell in mesh_copy.iter_cells()),
+            sorted(cell.uid for cell in self.mesh.iter_cells()))
+        np.testing.assert_array_equal(
+            extract_cell_data(mesh_copy, self.cell_rows, CUBA.VELOCITY),
+            extract_cell_data(self.mesh, self.cell_rows, CUBA.VELOCITY))
+
+
+if __name__ == '__main__':
+    unittest.main()
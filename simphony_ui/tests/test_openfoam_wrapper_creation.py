@@ -7,12 +7,14 @@ import shutil
 import tempfile
 import unittest
 
+import mock
 from simphony.core.cuba import CUBA
+from simphony.core.cuds_item import CUDSItem
 from simphony.engine import openfoam_file_io, openfoam_internal
 from simphony_ui.openfoam_model.openfoam_boundary_conditions import (
     BoundaryConditionModel)
 from simphony_ui.openfoam_model.openfoam_wrapper_creation import (
-    create_openfoam_mesh, create_openfoam_wrapper,
+    MESH_NAME, POLY_MESH, create_openfoam_mesh, create_openfoam_wrapper,
     get_boundary_condition_description)
 from traits.api import Float, Enum
 
@@ -166,6 +168,38 @@ class TestOpenfoamMeshCreation(unittest.TestCase):
                 'openfoam_input.txt'
             )
 
+    def create_mesh(self, cache_directory=None):
+        """ Creates a wrapper and its mesh, returning them with whether
+        the mesh was generated. The generated cases are given a mesh file
+        if the engine did not write one.
+        """
+        generators = {
+            name: getattr(openfoam_file_io, name)
+            for name in ('create_block_mesh', 'create_quad_mesh')}
+        generated = []
+
+        def generate(name):
+            def generate_mesh(path, mesh_name, *args):
+                generators[name](path, mesh_name, *args)
+                generated.append(name)
+                poly_mesh = os.path.join(path, mesh_name, POLY_MESH)
+                if not os.path.isdir(poly_mesh):
+                    os.makedirs(poly_mesh)
+                    with open(os.path.join(poly_mesh, 'points'), 'w'):
+                        pass
+            return generate_mesh
+
+        openfoam_wrapper = create_openfoam_wrapper(self.openfoam_model)
+        with mock.patch.object(
+                openfoam_file_io, 'create_block_mesh',
+                side_effect=generate('create_block_mesh')), \
+                mock.patch.object(
+                    openfoam_file_io, 'create_quad_mesh',
+                    side_effect=generate('create_quad_mesh')):
+            mesh = create_openfoam_mesh(
+                openfoam_wrapper, self.openfoam_model, cache_directory)
+        return openfoam_wrapper, mesh, len(generated) > 0
+
     def test_block_mesh_creation(self):
         openfoam_wrapper = create_openfoam_wrapper(self.openfoam_model)
         create_openfoam_mesh(openfoam_wrapper, self.openfoam_model)
@@ -175,6 +209,109 @@ class TestOpenfoamMeshCreation(unittest.TestCase):
         openfoam_wrapper = create_openfoam_wrapper(self.openfoam_model)
         create_openfoam_mesh(openfoam_wrapper, self.openfoam_model)
 
+    def test_quad_mesh_without_input_file(self):
+        self.openfoam_model.mesh_type = 'quad'
+        self.openfoam_model.input_file = ''
+        _, _, generated = self.create_mesh()
+        self.assertTrue(generated)
+
+        _, _, generated = self.create_mesh()
+        self.assertFalse(generated)
+
+    def test_mesh_reuse(self):
+        _, mesh, generated = self.create_mesh()
+        self.assertTrue(generated)
+        num_cells = mesh.count_of(CUDSItem.CELL)
+        # A field written to the case by the previous run
+        case = os.path.join(self.temp_dir, MESH_NAME)
+        os.makedirs(os.path.join(case, '0'))
+        with open(os.path.join(case, '0', 'U'), 'w'):
+            pass
+
+        _, mesh, generated = self.create_mesh()
+
+        self.assertFalse(generated)
+        self.assertEqual(mesh.count_of(CUDSItem.CELL), num_cells)
+        self.assertTrue(os.path.isdir(os.path.join(case, POLY_MESH)))
+        self.assertFalse(os.path.exists(os.path.join(case, '0')))
+
+    def test_only_mesh_cached(self):
+        self.create_mesh()
+
+        cache_dir = os.path.join(self.temp_dir, 'cache', 'mesh')
+        entries = [name for name in os.listdir(cache_dir)
+                   if not name.startswith('.')]
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(
+            os.listdir(os.path.join(cache_dir, entries[0])), ['constant'])
+        self.assertEqual(
+            os.listdir(os.path.join(cache_dir, entries[0], 'constant')),
+            ['polyMesh'])
+
+    def test_cache_hit_as_miss(self):
+        missed_wrapper, missed_mesh, generated = self.create_mesh()
+        self.assertTrue(generated)
+
+        hit_wrapper, hit_mesh, generated = self.create_mesh()
+        self.assertFalse(generated)
+
+        self.assertIs(hit_wrapper.get_dataset(MESH_NAME), hit_mesh)
+        self.assertEqual(hit_mesh.name, missed_mesh.name)
+        self.assertEqual(hit_mesh.count_of(CUDSItem.CELL),
+                         missed_mesh.count_of(CUDSItem.CELL))
+        self.assertEqual(
+            sorted(point.coordinates for point in hit_mesh.iter_points()),
+            sorted(point.coordinates
+                   for point in missed_mesh.iter_points()))
+        for name in ('CM', 'CM_extensions', 'SP', 'BC'):
+            self.assertEqual(getattr(hit_wrapper, name),
+                             getattr(missed_wrapper, name))
+
+    def test_shared_cache(self):
+        cache_dir = os.path.join(self.temp_dir, 'shared')
+        self.openfoam_model.output_path = os.path.join(self.temp_dir, 'run0')
+        _, _, generated = self.create_mesh(cache_dir)
+        self.assertTrue(generated)
+
+        self.openfoam_model.output_path = os.path.join(self.temp_dir, 'run1')
+        _, mesh, generated = self.create_mesh(cache_dir)
+
+        self.assertFalse(generated)
+        self.assertTrue(os.path.isdir(os.path.join(
+            self.temp_dir, 'run1', MESH_NAME, POLY_MESH)))
+        self.assertFalse(os.path.exists(
+            os.path.join(self.temp_dir, 'run1', 'cache')))
+
+    def test_failed_restore_generates(self):
+        self.create_mesh()
+
+        with mock.patch(
+                'simphony_ui.openfoam_model.openfoam_wrapper_creation.'
+                'shutil.copytree', side_effect=OSError('evicted')):
+            _, mesh, generated = self.create_mesh()
+
+        self.assertTrue(generated)
+        self.assertIsNotNone(mesh)
+
+    def test_given_key(self):
+        openfoam_wrapper = create_openfoam_wrapper(self.openfoam_model)
+        with mock.patch(
+                'simphony_ui.openfoam_model.openfoam_wrapper_creation.'
+                'mesh_cache_key') as cache_key:
+            create_openfoam_mesh(
+                openfoam_wrapper, self.openfoam_model, key='mesh-key')
+        self.assertFalse(cache_key.called)
+
+    def test_mesh_regenerated_on_change(self):
+        self.openfoam_model.mesh_type = 'quad'
+        self.openfoam_model.num_grid_x = 10
+        self.create_mesh()
+
+        self.openfoam_model.num_grid_x = 20
+        _, mesh, generated = self.create_mesh()
+        self.assertTrue(generated)
+        self.assertEqual(mesh.count_of(CUDSItem.CELL), 20 * 40)
+
     def test_unknown_mesh_type(self):
         self.openfoam_model.mesh_type = 'coucou'
         openfoam_wrapper = create_openfoam_wrapper(self.openfoam_model)
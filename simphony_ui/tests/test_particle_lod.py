@@ -0,0 +1,87 @@
+"""
+Tests the level of detail of the particles rendering
+"""
+
+import unittest
+
+import mock
+
+from simphony_ui.particle_lod import (
+    FULL_SPHERE_RESOLUTION, LOD_FULL, LOD_LOW, LOD_POINTS, POINT_SIZE,
+    ParticleLODModel, apply_particle_lod)
+
+
+class TestParticleLODModel(unittest.TestCase):
+
+    def setUp(self):
+        self.settings = ParticleLODModel(
+            low_detail_threshold=10, points_threshold=100, max_arrows=4)
+
+    def test_level(self):
+        self.assertEqual(self.settings.level(50, False), LOD_FULL)
+        self.assertEqual(self.settings.level(10, True), LOD_FULL)
+        self.assertEqual(self.settings.level(11, True), LOD_LOW)
+        self.assertEqual(self.settings.level(100, True), LOD_LOW)
+        self.assertEqual(self.settings.level(101, True), LOD_POINTS)
+
+        self.settings.enabled = False
+        self.assertEqual(self.settings.level(101, True), LOD_FULL)
+
+    def test_arrow_ratio(self):
+        self.assertEqual(self.settings.arrow_ratio(50, LOD_FULL), 1)
+        self.assertEqual(self.settings.arrow_ratio(3, LOD_LOW), 1)
+        self.assertEqual(self.settings.arrow_ratio(8, LOD_LOW), 2)
+        self.assertEqual(self.settings.arrow_ratio(9, LOD_POINTS), 3)
+
+
+class TestApplyParticleLOD(unittest.TestCase):
+
+    def setUp(self):
+        self.settings = ParticleLODModel(low_sphere_resolution=3)
+        self.sphere_module = mock.Mock()
+        glyph_source = self.sphere_module.glyph.glyph_source
+        glyph_source.glyph_dict = {
+            'sphere_source': mock.Mock(), 'glyph_source2d': mock.Mock()}
+        glyph_source.glyph_source = glyph_source.glyph_dict['sphere_source']
+        self.arrow_module = mock.Mock()
+
+    def glyph_source(self):
+        return self.sphere_module.glyph.glyph_source
+
+    def test_low(self):
+        apply_particle_lod(
+            self.sphere_module, self.arrow_module, LOD_LOW, 5, self.settings)
+
+        sphere = self.glyph_source().glyph_dict['sphere_source']
+        self.assertIs(self.glyph_source().glyph_source, sphere)
+        self.assertEqual(sphere.theta_resolution, 3)
+        self.assertEqual(sphere.phi_resolution, 3)
+        glyph = self.arrow_module.glyph
+        self.assertEqual(glyph.mask_points.on_ratio, 5)
+        self.assertTrue(glyph.mask_points.random_mode)
+        self.assertTrue(glyph.mask_input_points)
+
+    def test_points_and_back(self):
+        apply_particle_lod(
+            self.sphere_module, self.arrow_module, LOD_POINTS, 5,
+            self.settings)
+
+        vertex = self.glyph_source().glyph_dict['glyph_source2d']
+        self.assertIs(self.glyph_source().glyph_source, vertex)
+        self.assertEqual(vertex.glyph_type, 'vertex')
+        self.assertEqual(
+            self.sphere_module.actor.property.point_size, POINT_SIZE)
+
+        apply_particle_lod(
+            self.sphere_module, self.arrow_module, LOD_FULL, 1,
+            self.settings)
+
+        sphere = self.glyph_source().glyph_dict['sphere_source']
+        self.assertIs(self.glyph_source().glyph_source, sphere)
+        self.assertEqual(sphere.theta_resolution, FULL_SPHERE_RESOLUTION)
+        self.assertEqual(self.arrow_module.glyph.mask_points.on_ratio, 1)
+        self.assertFalse(self.arrow_module.glyph.mask_input_points)
+
+
+if __name__ == '__main__':
+    unittest.main()
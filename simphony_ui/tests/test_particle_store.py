@@ -0,0 +1,90 @@
+"""
+Tests the columnar particle store
+"""
+
+import unittest
+
+import numpy as np
+from simphony.core.cuba import CUBA
+from simphony.cuds.particles import Particles, Particle
+
+from simphony_ui.particle_store import ParticleStore
+
+
+class TestParticleStore(unittest.TestCase):
+
+    def setUp(self):
+        self.particles = Particles('particles')
+        self.uids = self.particles.add_particles([
+            Particle(
+                coordinates=(float(i), 2.0 * i, 3.0 * i),
+                data={
+                    CUBA.VELOCITY: (0.1 * i, 0.0, -0.1 * i),
+                    CUBA.RADIUS: 0.01 * (i + 1)
+                })
+            for i in range(5)])
+
+    def test_from_particles(self):
+        store = ParticleStore.from_particles(self.particles)
+        self.assertEqual(len(store), 5)
+        for row, uid in enumerate(store.uids):
+            particle = self.particles.get_particle(uid)
+            self.assertEqual(
+                store.coordinates[row].tolist(),
+                list(particle.coordinates))
+            self.assertEqual(
+                store.velocities[row].tolist(),
+                list(particle.data[CUBA.VELOCITY]))
+            self.assertEqual(store.radii[row], particle.data[CUBA.RADIUS])
+        self.assertEqual(store.forces.tolist(), [[0.0, 0.0, 0.0]] * 5)
+
+    def test_arrays(self):
+        store = ParticleStore.from_particles(self.particles)
+        for array in (store.coordinates, store.velocities, store.forces):
+            self.assertEqual(array.shape, (5, 3))
+            self.assertEqual(array.dtype, np.float64)
+            self.assertTrue(array.flags['C_CONTIGUOUS'])
+        self.assertEqual(store.radii.shape, (5,))
+
+    def test_write_forces(self):
+        store = ParticleStore.from_particles(self.particles)
+        store.forces[:, 0] = np.arange(5)
+        store.write(self.particles)
+        for row, uid in enumerate(store.uids):
+            particle = self.particles.get_particle(uid)
+            self.assertEqual(
+                particle.data[CUBA.EXTERNAL_APPLIED_FORCE],
+                (float(row), 0.0, 0.0))
+
+    def test_write_coordinates(self):
+        store = ParticleStore.from_particles(self.particles)
+        store.coordinates -= 1.0
+        store.write(self.particles, ('coordinates',))
+        for row, uid in enumerate(store.uids):
+            self.assertEqual(
+                self.particles.get_particle(uid).coordinates,
+                tuple(store.coordinates[row]))
+
+    def test_write_unknown_field(self):
+        store = ParticleStore.from_particles(self.particles)
+        with self.assertRaises(ValueError):
+            store.write(self.particles, ('mass',))
+
+    def test_read_reuses_arrays(self):
+        store = ParticleStore.from_particles(self.particles)
+        coordinates = store.coordinates
+        particle = self.particles.get_particle(self.uids[2])
+        particle.coordinates = (-1.0, -1.0, -1.0)
+        self.particles.update_particles([particle])
+
+        store.read(self.particles)
+        self.assertIs(store.coordinates, coordinates)
+        self.assertEqual(
+            store.coordinates[store.uids.index(self.uids[2])].tolist(),
+            [-1.0, -1.0, -1.0])
+
+    def test_read_empty(self):
+        store = ParticleStore.from_particles(Particles('empty'))
+        self.assertEqual(len(store), 0)
+        self.assertEqual(store.coordinates.shape, (0, 3))
+        store.write(Particles('empty'))
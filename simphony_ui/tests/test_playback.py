@@ -0,0 +1,98 @@
+"""
+Tests the real time playback of the frames
+"""
+
+import unittest
+
+from simphony_ui.playback import PlaybackClock, PlaybackStats
+
+
+class FakeClock(object):
+    """ A clock advanced by the tests """
+
+    def __init__(self):
+        self.time = 100.0
+
+    def __call__(self):
+        return self.time
+
+
+class TestPlaybackClock(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def test_due_frame(self):
+        playback = PlaybackClock(10, first_frame=3, clock=self.clock)
+        self.assertEqual(playback.due_frame(20), 3)
+
+        self.clock.time += 0.25
+        self.assertEqual(playback.due_frame(20), 5)
+
+        # The playback loops over the frames
+        self.clock.time += 2.0
+        self.assertEqual(playback.due_frame(20), 5)
+        self.assertEqual(playback.due_frame(7), 4)
+
+    def test_upcoming_frames(self):
+        playback = PlaybackClock(10, first_frame=8, clock=self.clock)
+
+        self.assertEqual(playback.upcoming_frames(10, 3), [9, 0, 1])
+        self.assertEqual(playback.upcoming_frames(10, 3, step=2), [0, 2, 4])
+
+
+class TestPlaybackStats(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.stats = PlaybackStats(window=3, clock=self.clock)
+
+    def test_achieved_fps(self):
+        self.assertEqual(self.stats.achieved_fps, 0.0)
+
+        for dropped in (0, 0, 2, 1):
+            self.stats.frame_shown(dropped)
+            self.clock.time += 0.2
+
+        self.assertAlmostEqual(self.stats.achieved_fps, 5.0)
+        self.assertEqual(self.stats.dropped_frames, 3)
+
+    def test_timing(self):
+        for duration in (0.01, 0.02, 0.03, 0.04):
+            with self.stats.timing('load'):
+                self.clock.time += duration
+
+        with self.assertRaises(RuntimeError):
+            with self.stats.timing('render'):
+                self.clock.time += 0.5
+                raise RuntimeError()
+
+        # Averaged over the last 3 frames
+        self.assertAlmostEqual(self.stats.stage_time('load'), 0.03)
+        self.assertAlmostEqual(self.stats.stage_time('render'), 0.5)
+        self.assertEqual(self.stats.stage_time('swap'), 0.0)
+
+    def test_summary(self):
+        self.stats.frame_shown()
+        self.clock.time += 0.5
+        self.stats.frame_shown(dropped=4)
+        with self.stats.timing('swap'):
+            self.clock.time += 0.0125
+
+        self.assertEqual(
+            self.stats.summary(),
+            '2.0 fps, load 0.0 ms, swap 12.5 ms, render 0.0 ms, 4 dropped')
+
+    def test_reset(self):
+        self.stats.frame_shown(dropped=2)
+        with self.stats.timing('load'):
+            self.clock.time += 1.0
+
+        self.stats.reset()
+
+        self.assertEqual(self.stats.dropped_frames, 0)
+        self.assertEqual(self.stats.stage_time('load'), 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,17 +3,21 @@ Tests
 """
 
 import os
+import shutil
 import tempfile
 import unittest
-from mock import Mock
+
+import numpy as np
 from simphony.core.cuds_item import CUDSItem
 from simphony.core.cuba import CUBA
 from simphony_ui.global_parameters_model import GlobalParametersModel
 from simphony_ui.openfoam_model.openfoam_model import OpenfoamModel
 from simphony_ui.liggghts_model.liggghts_model import LiggghtsModel
 from simphony_ui.tests.test_utils import cleanup_garbage
-from simphony_ui.couple_openfoam_liggghts import compute_drag_force
+from simphony_ui.couple_openfoam_liggghts import (
+    compute_drag_force, compute_drag_forces)
 from simphony_ui.couple_openfoam_liggghts import run_calc
+from simphony_ui.particle_store import ParticleStore
 
 
 class TestCalculation(unittest.TestCase):
@@ -24,9 +28,7 @@ class TestCalculation(unittest.TestCase):
         cls.global_settings = GlobalParametersModel()
         cls.openfoam_settings = OpenfoamModel()
         cls.liggghts_settings = LiggghtsModel()
-        cls.event_lock = Mock()
-        cls.event_lock.wait = Mock()
-        cls.event_lock.clear = Mock()
+        cls.snapshots = []
 
         cls.openfoam_settings.input_file = os.path.join(
             os.path.join(
@@ -47,15 +49,14 @@ class TestCalculation(unittest.TestCase):
         with cleanup_garbage(temp_dir):
             cls.openfoam_settings.output_path = temp_dir
 
-            def callback(*args):
-                pass
+            def callback(snapshot, current_iteration, total_iterations):
+                cls.snapshots.append(snapshot)
 
             cls.datasets = run_calc(
                 cls.global_settings,
                 cls.openfoam_settings,
                 cls.liggghts_settings,
-                callback,
-                event_lock=cls.event_lock
+                callback
             )
             super(TestCalculation, cls).setUpClass()
 
@@ -66,9 +67,24 @@ class TestCalculation(unittest.TestCase):
             )
         ))
 
-    def test_event_lock(self):
-        self.assertTrue(self.event_lock.wait.called)
-        self.assertTrue(self.event_lock.clear.called)
+    def test_snapshots(self):
+        self.assertEqual(
+            [snapshot.iteration for snapshot in self.snapshots],
+            range(self.global_settings.num_iterations))
+
+        first, last = self.snapshots[0], self.snapshots[-1]
+        self.assertIs(first.mesh, last.mesh)
+        num_cells = len(last.mesh.cell_uids)
+        self.assertEqual(last.cell_data['velocity'].shape, (num_cells, 3))
+        self.assertEqual(last.cell_data['pressure'].shape, (num_cells,))
+        self.assertEqual(last.particles['flow'].coordinates.shape, (200, 3))
+        self.assertFalse(np.shares_memory(
+            first.cell_data['velocity'], last.cell_data['velocity']))
+
+        flow = ParticleStore.from_particles(self.datasets[1])
+        self.assertEqual(
+            sorted(last.particles['flow'].coordinates.tolist()),
+            sorted(flow.coordinates.tolist()))
 
     def test_nb_entities(self):
         self.assertEqual(self.datasets[1].count_of(CUDSItem.PARTICLE), 200)
@@ -88,6 +104,59 @@ class TestCalculation(unittest.TestCase):
         self.assertAlmostEqual(avg_velo, 0.00151286)
 
 
+class TestPipelinedCalculation(unittest.TestCase):
+
+    def run_calc(self, coupling_mode):
+        global_settings = GlobalParametersModel(
+            num_iterations=4, update_frequency=2,
+            coupling_mode=coupling_mode)
+        openfoam_settings = OpenfoamModel()
+        liggghts_settings = LiggghtsModel()
+        fixtures = os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+        openfoam_settings.input_file = os.path.join(
+            fixtures, 'openfoam_input.txt')
+        liggghts_settings.input_file = os.path.join(
+            fixtures, 'liggghts_input.dat')
+
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        openfoam_settings.output_path = temp_dir
+
+        iterations = []
+
+        def callback(datasets, current_iteration, total_iterations):
+            iterations.append(current_iteration)
+
+        datasets = run_calc(global_settings, openfoam_settings,
+                            liggghts_settings, callback)
+        return datasets, iterations
+
+    def test_same_results_as_sequential(self):
+        sequential, sequential_iterations = self.run_calc('sequential')
+        pipelined, pipelined_iterations = self.run_calc('pipelined')
+
+        self.assertEqual(pipelined_iterations, sequential_iterations)
+
+        # The particles of the two runs have different uids, so their
+        # states are compared in sorted order.
+        for name in ('coordinates', 'velocities'):
+            np.testing.assert_allclose(
+                sorted(getattr(
+                    ParticleStore.from_particles(pipelined[1]),
+                    name).tolist()),
+                sorted(getattr(
+                    ParticleStore.from_particles(sequential[1]),
+                    name).tolist()))
+
+        for cuba_key in (CUBA.VELOCITY, CUBA.PRESSURE):
+            np.testing.assert_allclose(
+                sorted(cell.data[cuba_key]
+                       for cell in pipelined[0].iter_cells()),
+                sorted(cell.data[cuba_key]
+                       for cell in sequential[0].iter_cells()))
+
+
 class TestForceComputation(unittest.TestCase):
 
     def setUp(self):
@@ -161,3 +230,74 @@ class TestForceComputation(unittest.TestCase):
                 self.viscosity,
                 self.density
             )
+
+
+class TestForcesComputation(unittest.TestCase):
+
+    def setUp(self):
+        self.radii = np.array([0.02, 0.01, 0.005])
+        self.rel_velos = np.array([
+            [1.2, 5.2, 0.2],
+            [-0.3, 0.0, 2.1],
+            [0.001, 0.002, -0.003]])
+        self.viscosity = 0.0062
+        self.density = 1005.2
+
+    def check_against_single_particle(self, force_type):
+        forces = compute_drag_forces(
+            force_type,
+            self.radii,
+            self.rel_velos,
+            self.viscosity,
+            self.density
+        )
+        self.assertEqual(forces.shape, (3, 3))
+        for radius, rel_velo, force in zip(
+                self.radii, self.rel_velos, forces):
+            np.testing.assert_allclose(
+                force,
+                compute_drag_force(
+                    force_type,
+                    radius,
+                    rel_velo,
+                    self.viscosity,
+                    self.density
+                ),
+                rtol=1e-12
+            )
+
+    def test_stokes(self):
+        self.check_against_single_particle('Stokes')
+
+    def test_dala(self):
+        self.check_against_single_particle('Dala')
+
+    def test_coul(self):
+        self.check_against_single_particle('Coul')
+
+    def test_null_relative_velocity(self):
+        for force_type in ('Stokes', 'Dala', 'Coul'):
+            forces = compute_drag_forces(
+                force_type,
+                [0.01, 0.01],
+                [[0.0, 0.0, 0.0], [0.1, 0.0, 0.0]],
+                self.viscosity,
+                self.density
+            )
+            self.assertEqual(forces[0].tolist(), [0.0, 0.0, 0.0])
+            self.assertNotEqual(forces[1][0], 0.0)
+
+    def test_no_particles(self):
+        forces = compute_drag_forces(
+            'Dala', [], [], self.viscosity, self.density)
+        self.assertEqual(forces.shape, (0, 3))
+
+    def test_unknown_force(self):
+        with self.assertRaises(ValueError):
+            compute_drag_forces(
+                'Coucou heho',
+                self.radii,
+                self.rel_velos,
+                self.viscosity,
+                self.density
+            )
@@ -0,0 +1,134 @@
+"""
+Tests the saving and reopening of runs
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from simphony.cuds.particles import Particle, Particles
+
+from simphony_ui.frame_store import FrameStore
+from simphony_ui.frames import FRAMES_DIRECTORY, snapshot_datasets
+from simphony_ui.global_parameters_model import GlobalParametersModel
+from simphony_ui.liggghts_model.liggghts_model import LiggghtsModel
+from simphony_ui.openfoam_model.mesh_index import extract_mesh_arrays
+from simphony_ui.openfoam_model.openfoam_model import OpenfoamModel
+from simphony_ui.saved_run import (
+    RUN_INDEX_FILE, RUN_SETTINGS_FILE, open_run, save_run)
+from simphony_ui.tests.test_utils import (
+    cleanup_garbage, create_cartesian_mesh)
+
+
+class TestSavedRun(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        with cleanup_garbage(self.temp_dir):
+            self.frames = FrameStore.create(
+                os.path.join(self.temp_dir, 'output', FRAMES_DIRECTORY))
+            self.addCleanup(self.frames.close)
+
+            mesh = create_cartesian_mesh((1.0, 1.0, 1.0), (2, 3, 1))
+            mesh_arrays = extract_mesh_arrays(mesh)
+            for index in range(3):
+                flow_particles = Particles('flow_particles')
+                flow_particles.add_particles([
+                    Particle((0.1 * i, 0.5, 0.5)) for i in range(index + 1)])
+                self.frames.append(snapshot_datasets(
+                    (mesh, flow_particles, Particles('wall_particles')),
+                    index, mesh_arrays))
+
+            self.settings = (
+                GlobalParametersModel(num_iterations=3),
+                OpenfoamModel(input_file='openfoam_input.txt'),
+                LiggghtsModel(timestep=1e-5))
+            self.run_dir = os.path.join(self.temp_dir, 'run')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_save_and_open(self):
+        progress = []
+        save_run(self.run_dir, self.frames, *self.settings,
+                 progress_callback=lambda *args: progress.append(args))
+
+        self.assertEqual(progress[-1], (4, 4))
+        self.assertTrue(os.path.exists(
+            os.path.join(self.run_dir, RUN_SETTINGS_FILE)))
+
+        run = open_run(self.run_dir)
+        self.addCleanup(run.frames.close)
+
+        self.assertEqual(len(run.frames), 3)
+        self.assertEqual(run.frames.num_cached, 0)
+        self.assertEqual(run.global_settings.num_iterations, 3)
+        self.assertEqual(run.liggghts_settings.timestep, 1e-5)
+        self.assertTrue(run.openfoam_settings.valid)
+
+        snapshot = run.frames[2]
+        self.assertEqual(snapshot.iteration, 2)
+        np.testing.assert_allclose(
+            snapshot.particles['flow'].coordinates,
+            self.frames[2].particles['flow'].coordinates)
+
+    def test_save_reopened_run_in_place(self):
+        save_run(self.run_dir, self.frames, *self.settings)
+        run = open_run(self.run_dir)
+        self.addCleanup(run.frames.close)
+
+        save_run(self.run_dir, run.frames, *self.settings)
+
+        reopened = open_run(self.run_dir)
+        self.addCleanup(reopened.frames.close)
+        self.assertEqual(len(reopened.frames), 3)
+        self.assertEqual(reopened.frames[2].iteration, 2)
+
+    def test_save_in_output_path_and_run_again(self):
+        output_path = os.path.dirname(self.frames.directory)
+        coordinates = self.frames[2].particles['flow'].coordinates
+        save_run(output_path, self.frames, *self.settings)
+
+        # The next run clears the frames directory of the output path
+        frames = FrameStore.create(self.frames.directory)
+        self.addCleanup(frames.close)
+        mesh = create_cartesian_mesh((1.0, 1.0, 1.0), (2, 3, 1))
+        frames.append(snapshot_datasets(
+            (mesh, Particles('flow_particles'), Particles('wall_particles')),
+            10))
+
+        run = open_run(output_path)
+        self.addCleanup(run.frames.close)
+        self.assertEqual(len(run.frames), 3)
+        for index in range(3):
+            self.assertEqual(run.frames[index].iteration, index)
+        np.testing.assert_allclose(
+            run.frames[2].particles['flow'].coordinates, coordinates)
+
+    def test_save_without_frames(self):
+        frames = FrameStore.create(os.path.join(self.temp_dir, 'empty'))
+        with self.assertRaises(ValueError):
+            save_run(self.run_dir, frames, *self.settings)
+
+    def test_open_not_a_run(self):
+        with self.assertRaises(ValueError):
+            open_run(self.temp_dir)
+
+    def test_open_unsupported_version(self):
+        save_run(self.run_dir, self.frames, *self.settings)
+        index_path = os.path.join(self.run_dir, RUN_INDEX_FILE)
+        with open(index_path, 'r') as index_file:
+            index = json.load(index_file)
+        index['format_version'] = 0
+        with open(index_path, 'w') as index_file:
+            json.dump(index, index_file)
+
+        with self.assertRaises(ValueError):
+            open_run(self.run_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+"""
+Tests the settings file loading
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from traits.api import TraitError
+
+from simphony_ui.settings_file import (
+    apply_settings, load_settings, read_settings_file, settings_mapping,
+    write_settings_file)
+from simphony_ui.openfoam_model.openfoam_model import OpenfoamModel
+from simphony_ui.tests.test_utils import cleanup_garbage
+
+SETTINGS = {
+    'global': {'num_iterations': 3, 'force_type': 'Dala'},
+    'openfoam': {
+        'input_file': 'openfoam_input.txt',
+        'mesh_type': 'quad',
+        'boundary_conditions': {
+            'inlet_BC': {
+                'pressure_boundary_condition': {'fixed_value': 0.01}
+            }
+        }
+    },
+    'liggghts': {'input_file': '/data/liggghts_input.dat'},
+}
+
+
+class TestSettingsFile(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        with cleanup_garbage(self.temp_dir):
+            self.path = os.path.join(self.temp_dir, 'settings.json')
+            self._write(SETTINGS)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _write(self, content):
+        with open(self.path, 'w') as settings_file:
+            json.dump(content, settings_file)
+
+    def test_load_settings(self):
+        global_settings, openfoam_settings, liggghts_settings = \
+            load_settings(self.path)
+
+        self.assertEqual(global_settings.num_iterations, 3)
+        self.assertEqual(global_settings.force_type, 'Dala')
+        self.assertEqual(openfoam_settings.mesh_type, 'quad')
+        self.assertEqual(
+            openfoam_settings.boundary_conditions.inlet_BC
+            .pressure_boundary_condition.fixed_value, 0.01)
+        self.assertTrue(openfoam_settings.valid)
+
+    def test_relative_paths(self):
+        _, openfoam_settings, liggghts_settings = load_settings(self.path)
+        self.assertEqual(
+            openfoam_settings.input_file,
+            os.path.join(self.temp_dir, 'openfoam_input.txt'))
+        self.assertEqual(
+            liggghts_settings.input_file, '/data/liggghts_input.dat')
+
+    def test_missing_sections(self):
+        self._write({})
+        global_settings, _, liggghts_settings = load_settings(self.path)
+        self.assertEqual(global_settings.num_iterations, 10)
+        self.assertFalse(liggghts_settings.valid)
+
+    def test_unknown_section(self):
+        self._write({'lammps': {}})
+        with self.assertRaises(ValueError):
+            read_settings_file(self.path)
+
+    def test_not_a_mapping(self):
+        self._write([1, 2])
+        with self.assertRaises(ValueError):
+            read_settings_file(self.path)
+
+    def test_unknown_trait(self):
+        with self.assertRaises(TraitError):
+            apply_settings(OpenfoamModel(), {'num_grid_w': 3})
+
+    def test_invalid_value(self):
+        with self.assertRaises(TraitError):
+            apply_settings(OpenfoamModel(), {'num_grid_x': -3})
+
+    def test_settings_mapping(self):
+        openfoam_settings = OpenfoamModel(mesh_type='quad')
+        openfoam_settings.boundary_conditions.inlet_BC\
+            .velocity_boundary_condition.fixed_value = [[0.1, 0.0, 0.0]]
+
+        values = settings_mapping(openfoam_settings)
+
+        self.assertEqual(values['mesh_type'], 'quad')
+        self.assertNotIn('valid', values)
+        self.assertEqual(
+            values['boundary_conditions']['inlet_BC']
+            ['velocity_boundary_condition']['fixed_value'],
+            [[0.1, 0.0, 0.0]])
+
+    def test_write_settings_file(self):
+        models = load_settings(self.path)
+        path = os.path.join(self.temp_dir, 'written.json')
+
+        write_settings_file(path, *models)
+        written_models = load_settings(path)
+
+        for model, written_model in zip(models, written_models):
+            self.assertEqual(settings_mapping(written_model),
+                             settings_mapping(model))
+        self.assertTrue(written_models[1].valid)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,180 @@
+"""
+Tests the parameter sweep runner
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+from simphony.core.cuba import CUBA
+from simphony.cuds.particles import Particle, Particles
+
+from simphony_ui.sweep import (
+    CACHE_DIRECTORY, SUMMARY_FILE, expand_grid, merge_settings, run_one,
+    run_sweep)
+from simphony_ui.tests.test_utils import cleanup_garbage
+
+
+def fake_runner(settings, base_directory, run_directory,
+                cache_directory=None):
+    """ Runner standing in for run_one in the worker processes """
+    os.makedirs(run_directory)
+    return {
+        'run_directory': run_directory,
+        'cache_directory': cache_directory,
+        'settings': settings,
+        'status': ('failed' if settings['global']['force_type'] == 'Coul'
+                   else 'completed'),
+        'pid': os.getpid(),
+    }
+
+
+class TestExpandGrid(unittest.TestCase):
+
+    def test_product(self):
+        overrides = expand_grid({
+            'global.force_type': ['Stokes', 'Dala'],
+            'openfoam.viscosity': [1.0, 2.0, 3.0],
+        })
+        self.assertEqual(len(overrides), 6)
+        self.assertEqual(overrides[0], {
+            'global': {'force_type': 'Stokes'},
+            'openfoam': {'viscosity': 1.0}})
+        self.assertEqual(overrides[-1], {
+            'global': {'force_type': 'Dala'},
+            'openfoam': {'viscosity': 3.0}})
+
+    def test_nested_path(self):
+        overrides = expand_grid({
+            'openfoam.boundary_conditions.inlet_BC.'
+            'pressure_boundary_condition.fixed_value': [0.1],
+        })
+        self.assertEqual(
+            overrides[0]['openfoam']['boundary_conditions']['inlet_BC'],
+            {'pressure_boundary_condition': {'fixed_value': 0.1}})
+
+    def test_empty_grid(self):
+        self.assertEqual(expand_grid({}), [{}])
+
+    def test_invalid_path(self):
+        with self.assertRaises(ValueError):
+            expand_grid({'lammps.timestep': [1.0]})
+        with self.assertRaises(ValueError):
+            expand_grid({'global': [1.0]})
+
+    def test_no_value(self):
+        with self.assertRaises(ValueError):
+            expand_grid({'global.force_type': []})
+
+    def test_merge_settings(self):
+        base = {'global': {'num_iterations': 3, 'force_type': 'Stokes'}}
+        merged = merge_settings(base, {'global': {'force_type': 'Dala'}})
+        self.assertEqual(
+            merged, {'global': {'num_iterations': 3, 'force_type': 'Dala'}})
+        self.assertEqual(base['global']['force_type'], 'Stokes')
+
+
+class TestRunOne(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        with cleanup_garbage(self.temp_dir):
+            self.run_directory = os.path.join(self.temp_dir, 'run-0000')
+            self.settings = {
+                'global': {'num_iterations': 2},
+                'liggghts': {'input_file': 'liggghts_input.dat'},
+            }
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_completed(self):
+        flow_particles = Particles('flow_particles')
+        flow_particles.add_particles([
+            Particle((1.0, 0.0, 0.0), data={CUBA.VELOCITY: (2.0, 0.0, 0.0)}),
+            Particle((3.0, 0.0, 0.0), data={CUBA.VELOCITY: (0.0, 0.0, 0.0)}),
+        ])
+        calls = []
+
+        def run_calc(global_settings, openfoam_settings, liggghts_settings,
+                     progress_callback, cache_directory):
+            calls.append((os.getcwd(), openfoam_settings.output_path,
+                          liggghts_settings.input_file, cache_directory))
+            progress_callback(None, 0, 2)
+            progress_callback(None, 1, 2)
+            return None, flow_particles, None
+
+        cwd = os.getcwd()
+        with mock.patch('simphony_ui.sweep.run_calc', side_effect=run_calc):
+            summary = run_one(self.settings, '/data', self.run_directory,
+                              '/cache')
+
+        self.assertEqual(os.getcwd(), cwd)
+        self.assertEqual(calls, [(
+            os.path.realpath(self.run_directory), self.run_directory,
+            '/data/liggghts_input.dat', '/cache')])
+        self.assertEqual(summary['status'], 'completed')
+        self.assertEqual(summary['num_frames'], 2)
+        self.assertEqual(summary['num_flow_particles'], 2)
+        self.assertEqual(summary['mean_flow_velocity'], [1.0, 0.0, 0.0])
+        with open(os.path.join(self.run_directory, SUMMARY_FILE)) as output:
+            self.assertEqual(json.load(output)['status'], 'completed')
+
+    def test_failed(self):
+        cwd = os.getcwd()
+        with mock.patch('simphony_ui.sweep.run_calc',
+                        side_effect=RuntimeError('diverged')):
+            summary = run_one(self.settings, '/data', self.run_directory)
+
+        self.assertEqual(os.getcwd(), cwd)
+        self.assertEqual(summary['status'], 'failed')
+        self.assertIn('diverged', summary['error'])
+
+
+class TestRunSweep(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_run_sweep(self):
+        summaries = run_sweep(
+            {'global': {'num_iterations': 2}},
+            {'global.force_type': ['Stokes', 'Dala', 'Coul']},
+            self.temp_dir, max_workers=2, runner=fake_runner)
+
+        self.assertEqual(
+            [summary['settings']['global']['force_type']
+             for summary in summaries],
+            ['Stokes', 'Dala', 'Coul'])
+        self.assertEqual(
+            [summary['status'] for summary in summaries],
+            ['completed', 'completed', 'failed'])
+        self.assertEqual(
+            len(set(summary['run_directory'] for summary in summaries)), 3)
+        self.assertNotIn(os.getpid(), [s['pid'] for s in summaries])
+        self.assertEqual(
+            set(summary['cache_directory'] for summary in summaries),
+            {os.path.join(self.temp_dir, CACHE_DIRECTORY)})
+        with open(os.path.join(self.temp_dir, SUMMARY_FILE)) as output:
+            self.assertEqual(len(json.load(output)), 3)
+
+    def test_worker_cap(self):
+        with mock.patch('simphony_ui.sweep.multiprocessing.cpu_count',
+                        return_value=2), \
+                mock.patch('simphony_ui.sweep.futures.ProcessPoolExecutor',
+                           wraps=__import__('concurrent.futures').futures
+                           .ProcessPoolExecutor) as executor:
+            run_sweep({}, {'global.force_type': ['Stokes', 'Dala', 'Coul']},
+                      self.temp_dir, max_workers=8, runner=fake_runner)
+
+        executor.assert_called_once_with(max_workers=2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,19 +1,42 @@
 import unittest
 import mock
 import os
+import shutil
 import tempfile
+import threading
 
+import numpy as np
 from pyface.constant import OK, CANCEL
 from pyface.ui.qt4.util.gui_test_assistant import GuiTestAssistant
-from simphony_mayavi.cuds.vtk_mesh import VTKMesh
-from simphony_mayavi.cuds.vtk_particles import VTKParticles
-
-from simphony_ui.couple_openfoam_liggghts import run_calc
-from simphony_ui.global_parameters_model import GlobalParametersModel
-from simphony_ui.liggghts_model.liggghts_model import LiggghtsModel
-from simphony_ui.openfoam_model.openfoam_model import OpenfoamModel
-from simphony_ui.tests.test_utils import cleanup_garbage
+from simphony.core.cuds_item import CUDSItem
+from simphony.cuds.particles import Particle, Particles
+from traits.api import TraitError
+
+from simphony_ui.frame_store import FrameStore
+from simphony_ui.frames import snapshot_datasets
+from simphony_ui.openfoam_model.mesh_index import extract_mesh_arrays
+from simphony_ui.playback import PlaybackClock
+from simphony_ui.tests.test_utils import (
+    cleanup_garbage, create_cartesian_mesh)
 from simphony_ui.ui import Application, dataset2cudssource
+from simphony_ui.vtk_frames import snapshot_to_vtk
+
+
+def create_snapshots(num_frames):
+    """ Creates the snapshots of a calculation, sharing their mesh. The
+    frame i holds i + 1 flow particles.
+    """
+    mesh = create_cartesian_mesh((1.0, 1.0, 1.0), (2, 2, 2))
+    mesh_arrays = extract_mesh_arrays(mesh)
+    snapshots = []
+    for index in range(num_frames):
+        flow_particles = Particles('flow_particles')
+        flow_particles.add_particles([
+            Particle((0.1 * i, 0.5, 0.5)) for i in range(index + 1)])
+        snapshots.append(snapshot_datasets(
+            (mesh, flow_particles, Particles('wall_particles')), index,
+            mesh_arrays))
+    return snapshots
 
 
 class TestUI(unittest.TestCase, GuiTestAssistant):
@@ -21,6 +44,21 @@ class TestUI(unittest.TestCase, GuiTestAssistant):
     def setUp(self):
         GuiTestAssistant.setUp(self)
         self.application = Application()
+        self.frames_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        if self.application.frames is not None:
+            self.application.frames.close()
+        shutil.rmtree(self.frames_dir)
+        GuiTestAssistant.tearDown(self)
+
+    def create_frame_store(self, num_frames):
+        """ Creates a frame store holding the snapshots of create_snapshots
+        """
+        frames = FrameStore.create(self.frames_dir)
+        for snapshot in create_snapshots(num_frames):
+            frames.append(snapshot)
+        return frames
 
     def test_multi_thread(self):
         app = self.application
@@ -43,12 +81,12 @@ class TestUI(unittest.TestCase, GuiTestAssistant):
         with cleanup_garbage(temp_dir):
             app.openfoam_settings.output_path = temp_dir
 
-            self.assertEqual(len(app.frames), 0)
+            self.assertIsNone(app.frames)
 
             app.run_calc()
 
             with self.event_loop_until_condition(
-                    lambda: (len(app.frames) != 0),
+                    lambda: (app.num_frames != 0),
                     timeout=30
             ):
                 pass
@@ -59,8 +97,9 @@ class TestUI(unittest.TestCase, GuiTestAssistant):
             ):
                 pass
 
-            self.assertNotEqual(len(app.frames), 0)
-            self.assertEqual(len(app.frames[0]), 3)
+            self.assertNotEqual(app.num_frames, 0)
+            self.assertEqual(len(app._current_frame), 3)
+            self.assertTrue(os.path.isdir(os.path.join(temp_dir, 'frames')))
 
             # Last added module was the arrow_module
             self.assertEqual(
@@ -78,7 +117,7 @@ class TestUI(unittest.TestCase, GuiTestAssistant):
             app.run_calc()
 
             with self.event_loop_until_condition(
-                    lambda: (len(app.frames) != 0),
+                    lambda: (app.num_frames != 0),
                     timeout=30
             ):
                 pass
@@ -99,38 +138,123 @@ class TestUI(unittest.TestCase, GuiTestAssistant):
                 app.sources[1].children[0].children[1].glyph.color_mode,
                 'color_by_vector')
 
-    def test_ui_timeout(self):
-        openfoam_settings = OpenfoamModel()
-        openfoam_settings.input_file = os.path.join(
-            os.path.join(
-                os.path.dirname(os.path.abspath(__file__)),
-                'fixtures'
-            ),
-            'openfoam_input.txt')
-        liggghts_settings = LiggghtsModel()
-        liggghts_settings.input_file = os.path.join(
-            os.path.join(
-                os.path.dirname(os.path.abspath(__file__)),
-                'fixtures'
-            ),
-            'liggghts_input.dat')
+    def test_progress_callback_does_not_wait(self):
+        snapshot = mock.Mock()
+        with mock.patch('pyface.gui.GUI'):
+            # No event loop runs, the snapshot is only queued
+            self.application.progress_callback(snapshot, 0, 10)
 
-        global_settings = GlobalParametersModel()
+        self.assertIs(self.application._snapshots.get_nowait(), snapshot)
+        self.assertIs(self.application._last_snapshot, snapshot)
 
-        def progress_callback(*args, **kwargs):
+    def test_convert_snapshots(self):
+        app = self.application
+        app.interactive = False
+        app.frames = FrameStore.create(self.frames_dir)
+        snapshots = create_snapshots(2)
+        for snapshot in snapshots:
+            app._snapshots.put(snapshot)
+        app._snapshots.put(None)
+
+        app._convert_snapshots()
+
+        with self.event_loop_until_condition(
+                lambda: app.interactive,
+                timeout=30
+        ):
             pass
+        self.assertEqual(app.num_frames, 2)
+        for index, snapshot in enumerate(snapshots):
+            self.assertIs(app.frames[index], snapshot)
+        self.assertEqual(app.current_frame_index, 1)
+        self.assertEqual(
+            app._current_frame[1].count_of(CUDSItem.PARTICLE), 2)
 
-        event_lock = mock.Mock()
-        event_lock.wait.return_value = False
-        temp_dir = tempfile.mkdtemp()
-        with cleanup_garbage(temp_dir):
-            self.assertIsNone(
-                run_calc(
-                    global_settings,
-                    openfoam_settings,
-                    liggghts_settings,
-                    progress_callback,
-                    event_lock))
+    def test_shared_topology(self):
+        app = self.application
+        app.frames = self.create_frame_store(2)
+        topology = app._topology
+
+        app._to_next_frame()
+
+        self.assertIs(app._topology, topology)
+        self.assertEqual(
+            app._current_frame[0].count_of(CUDSItem.CELL), 8)
+        self.assertEqual(
+            app._current_frame[1].count_of(CUDSItem.PARTICLE), 2)
+
+    def test_in_place_update(self):
+        app = self.application
+        snapshots = create_snapshots(2)
+        snapshots[1].cell_data['velocity'] = (
+            snapshots[0].cell_data['velocity'] + 1.0)
+        frames = FrameStore.create(self.frames_dir)
+        for snapshot in snapshots:
+            frames.append(snapshot)
+        app.frames = frames
+        first_mesh, first_flow, first_wall = app._current_frame
+        mesh_modules = app.sources[0].children[0]
+        flow_modules = app.sources[1].children[0]
+
+        app._to_next_frame()
+
+        # The mesh and the wall particles are updated in place, the flow
+        # particles, whose number changed, are replaced
+        mesh, flow, wall = app._current_frame
+        self.assertIs(mesh, first_mesh)
+        self.assertIs(wall, first_wall)
+        self.assertIsNot(flow, first_flow)
+        self.assertEqual(flow.count_of(CUDSItem.PARTICLE), 2)
+        np.testing.assert_array_equal(
+            mesh.data_set.cell_data.get_array('VELOCITY').to_array(),
+            snapshots[1].cell_data['velocity'])
+        # The pipeline is kept
+        self.assertIs(app.sources[0].children[0], mesh_modules)
+        self.assertIs(app.sources[1].children[0], flow_modules)
+        self.assertIs(app.sources[1].cuds, flow)
+
+    def test_prepared_frame(self):
+        app = self.application
+        snapshots = create_snapshots(2)
+        frames = FrameStore.create(self.frames_dir)
+        for snapshot in snapshots:
+            frames.append(snapshot)
+        app.frames = frames
+        first_mesh = app._current_frame[0]
+        prepared = snapshot_to_vtk(snapshots[1], app._topology)
+
+        app._frame_appended(snapshots[1], prepared)
+
+        # The datasets built by the converter are swapped in
+        mesh, flow, wall = app._current_frame
+        self.assertIs(mesh, first_mesh)
+        self.assertIs(
+            mesh.data_set.cell_data.get_array('VELOCITY'),
+            prepared[0].data_set.cell_data.get_array('VELOCITY'))
+        self.assertIs(flow, prepared[1])
+        self.assertIs(app.sources[1].cuds, prepared[1])
+        self.assertIsNone(app._prepared_frame)
+
+    def test_particle_lod(self):
+        app = self.application
+        app.lod_settings.low_detail_threshold = 1
+        app.frames = self.create_frame_store(2)
+        # The second frame holds two flow particles
+        app._to_next_frame()
+        sphere_module = app.sources[1].children[0].children[0]
+        arrow_module = app.sources[1].children[0].children[1]
+
+        app._interacting = True
+
+        sphere = sphere_module.glyph.glyph_source.glyph_source
+        self.assertEqual(sphere.theta_resolution, 4)
+        self.assertTrue(arrow_module.glyph.mask_input_points)
+
+        app._interacting = False
+
+        self.assertIs(sphere_module.glyph.glyph_source.glyph_source, sphere)
+        self.assertEqual(sphere.theta_resolution, 8)
+        self.assertFalse(arrow_module.glyph.mask_input_points)
 
     def test_double_run(self):
         # Simulate the calculation running
@@ -143,7 +267,7 @@ class TestUI(unittest.TestCase, GuiTestAssistant):
         def mock_cudssource(cuds):
             return cuds
 
-        with mock.patch('simphony_ui.ui.CUDSSource') as mock_cuds:
+        with mock.patch('simphony_mayavi.sources.api.CUDSSource') as mock_cuds:
             mock_cuds.side_effect = mock_cudssource
 
             self.assertEqual(dataset2cudssource(36), 36)
@@ -153,12 +277,26 @@ class TestUI(unittest.TestCase, GuiTestAssistant):
         def mock_msg(*args, **kwargs):
             return
 
-        with mock.patch('simphony_ui.ui.error') as mock_message:
+        with mock.patch('pyface.api.error') as mock_message:
             mock_message.side_effect = mock_msg
 
             # Those methods are not supposed to be called
             self.assertIsNone(self.application._run_calc_threaded())
-            self.assertEquals(len(self.application.frames), 0)
+            self.assertEquals(self.application.num_frames, 0)
+
+    def test_sequential_coupling(self):
+        app = self.application
+        app.global_settings.coupling_mode = 'pipelined'
+        coupling_modes = []
+
+        def run_calc(global_settings, *args):
+            coupling_modes.append(global_settings.coupling_mode)
+
+        with mock.patch('simphony_ui.ui.run_calc', side_effect=run_calc):
+            app._run_calc_threaded()
+
+        self.assertEqual(coupling_modes, ['sequential'])
+        self.assertEqual(app.global_settings.coupling_mode, 'pipelined')
 
     def test_update_valid(self):
         self.assertFalse(self.application.valid)
@@ -169,46 +307,37 @@ class TestUI(unittest.TestCase, GuiTestAssistant):
 
     def test_movie_controls(self):
         app = self.application
-        app.frames = [
-            (VTKMesh('mesh'),
-             VTKParticles("flow_particles"),
-             VTKParticles("wall_particles")),
-            (VTKMesh('mesh'),
-             VTKParticles("flow_particles"),
-             VTKParticles("wall_particles")),
-            (VTKMesh('mesh'),
-             VTKParticles("flow_particles"),
-             VTKParticles("wall_particles")),
-        ]
+        app.frames = self.create_frame_store(3)
 
+        self.assertEqual(app.num_frames, 3)
         self.assertEqual(app.current_frame_index, 0)
-        self.assertEqual(app._current_frame, app.frames[0])
+        self.assertIs(app._current_snapshot, app.frames[0])
         app._to_next_frame()
         self.assertEqual(app.current_frame_index, 1)
-        self.assertEqual(app._current_frame, app.frames[1])
+        self.assertIs(app._current_snapshot, app.frames[1])
         app._to_next_frame()
         self.assertEqual(app.current_frame_index, 2)
-        self.assertEqual(app._current_frame, app.frames[2])
+        self.assertIs(app._current_snapshot, app.frames[2])
         app._to_next_frame()
         self.assertEqual(app.current_frame_index, 2)
-        self.assertEqual(app._current_frame, app.frames[2])
+        self.assertIs(app._current_snapshot, app.frames[2])
         app._to_prev_frame()
         self.assertEqual(app.current_frame_index, 1)
-        self.assertEqual(app._current_frame, app.frames[1])
+        self.assertIs(app._current_snapshot, app.frames[1])
 
         app._to_first_frame()
         self.assertEqual(app.current_frame_index, 0)
-        self.assertEqual(app._current_frame, app.frames[0])
+        self.assertIs(app._current_snapshot, app.frames[0])
         app._to_prev_frame()
         self.assertEqual(app.current_frame_index, 0)
-        self.assertEqual(app._current_frame, app.frames[0])
+        self.assertIs(app._current_snapshot, app.frames[0])
 
         app._to_last_frame()
-        self.assertEqual(app.current_frame_index, len(app.frames)-1)
-        self.assertEqual(app._current_frame, app.frames[-1])
+        self.assertEqual(app.current_frame_index, app.num_frames-1)
+        self.assertIs(app._current_snapshot, app.frames[-1])
         app._to_next_frame()
-        self.assertEqual(app.current_frame_index, len(app.frames)-1)
-        self.assertEqual(app._current_frame, app.frames[-1])
+        self.assertEqual(app.current_frame_index, app.num_frames-1)
+        self.assertIs(app._current_snapshot, app.frames[-1])
 
         self.assertIsNone(app.play_timer)
         app._start_stop_video()
@@ -230,63 +359,184 @@ class TestUI(unittest.TestCase, GuiTestAssistant):
         app._start_stop_video()
         self.assertIsNone(app.play_timer)
 
+    def test_play_tick(self):
+        app = self.application
+        app.frames = self.create_frame_store(5)
+        clock = mock.Mock(return_value=10.0)
+        app._playback_clock = PlaybackClock(10, 0, clock=clock)
+
+        app._play_tick()
+        self.assertEqual(app.current_frame_index, 0)
+
+        # The frames 1 and 2 are dropped
+        clock.return_value = 10.3
+        app._play_tick()
+        self.assertEqual(app.current_frame_index, 3)
+        self.assertIs(app._current_snapshot, app.frames[3])
+        self.assertEqual(app._playback_stats.dropped_frames, 2)
+        self.assertIn('2 dropped', app.playback_status)
+
+        clock.return_value = 10.6
+        app._play_tick()
+        self.assertEqual(app.current_frame_index, 1)
+
+    def test_frame_cache_size(self):
+        app = self.application
+        app.frames = self.create_frame_store(3)
+
+        app.frame_cache_size = 1
+        self.assertEqual(app.frames.cache_size, 1)
+
+        with self.assertRaises(TraitError):
+            app.frame_cache_size = 0
+        self.assertEqual(app.frames.cache_size, 1)
+
+    def test_playback_fps(self):
+        app = self.application
+        app.frames = self.create_frame_store(3)
+        app.playback_fps = 50
+
+        app._start_stop_video()
+        timer = app.play_timer
+        self.assertEqual(app._playback_clock.fps, 50)
+
+        app.playback_fps = 20
+        self.assertIsNot(app.play_timer, timer)
+        self.assertEqual(app._playback_clock.fps, 20)
+
+        app._start_stop_video()
+        self.assertIsNone(app.play_timer)
+
     def test_save_images(self):
         app = self.application
-        app.frames = [
-            (VTKMesh('mesh'),
-             VTKParticles("flow_particles"),
-             VTKParticles("wall_particles")),
-            (VTKMesh('mesh'),
-             VTKParticles("flow_particles"),
-             VTKParticles("wall_particles")),
-            (VTKMesh('mesh'),
-             VTKParticles("flow_particles"),
-             VTKParticles("wall_particles")),
-        ]
+        app.frames = self.create_frame_store(3)
 
         temp_dir = tempfile.mkdtemp()
         with cleanup_garbage(temp_dir), \
-                mock.patch("simphony_ui.ui.DirectoryDialog") as dialog_cls, \
-                mock.patch("simphony_ui.ui.mlab") as mlab:
+                mock.patch(
+                    "pyface.directory_dialog.DirectoryDialog") as dialog_cls, \
+                mock.patch("simphony_ui.ui.export_images") as export:
             dialog = mock.Mock()
             dialog_cls.return_value = dialog
             dialog.open.return_value = CANCEL
             dialog.path = temp_dir
-            mlab.savefig = mock.Mock()
 
             app._save_images()
-            self.assertFalse(mlab.savefig.called)
+            self.assertFalse(export.called)
 
-            mlab.savefig.reset_mock()
             dialog.open.return_value = OK
 
             app._save_images()
+            self.assertTrue(app.exporting)
+            with self.event_loop_until_condition(
+                    lambda: not app.exporting,
+                    timeout=30
+            ):
+                pass
+
+            self.assertEqual(export.call_count, 1)
+            args = export.call_args[0]
+            self.assertEqual(args[:3], (self.frames_dir, 3, temp_dir))
+            self.assertIn('position', args[4])
+            self.assertTrue(app.interactive)
+
+    def test_save_and_open_run(self):
+        app = self.application
+        app.frames = self.create_frame_store(3)
+        app.global_settings.num_iterations = 3
+
+        temp_dir = tempfile.mkdtemp()
+        with cleanup_garbage(temp_dir), \
+                mock.patch(
+                    "pyface.directory_dialog.DirectoryDialog") as dialog_cls:
+            dialog = mock.Mock()
+            dialog_cls.return_value = dialog
+            dialog.open.return_value = OK
+            dialog.path = temp_dir
+
+            app._save_run()
+            self.assertFalse(app.interactive)
+            with self.event_loop_until_condition(
+                    lambda: app.interactive,
+                    timeout=30
+            ):
+                pass
+
+            app.global_settings.num_iterations = 5
+            app._to_last_frame()
+            app._open_run()
+
+            self.assertEqual(app.global_settings.num_iterations, 3)
+            self.assertEqual(app.num_frames, 3)
+            self.assertEqual(app.current_frame_index, 0)
+            self.assertEqual(app._current_snapshot.iteration, 0)
+            self.assertEqual(
+                app._current_frame[1].count_of(CUDSItem.PARTICLE), 1)
+            app.frames.close()
+
+    def test_save_run_in_thread(self):
+        app = self.application
+        app.frames = self.create_frame_store(3)
+        threads = []
+        progress = []
+
+        def save_run(*args):
+            threads.append(threading.current_thread())
+            args[-1](1, 2)
+
+        temp_dir = tempfile.mkdtemp()
+        with cleanup_garbage(temp_dir), \
+                mock.patch(
+                    "pyface.directory_dialog.DirectoryDialog") as dialog_cls, \
+                mock.patch("simphony_ui.ui.save_run", side_effect=save_run), \
+                mock.patch.object(
+                    app.progress_dialog, 'update',
+                    side_effect=lambda value: progress.append(
+                        (value, threading.current_thread()))):
+            dialog = mock.Mock()
+            dialog_cls.return_value = dialog
+            dialog.open.return_value = OK
+            dialog.path = temp_dir
+
+            app._save_run()
+            with self.event_loop_until_condition(
+                    lambda: app.interactive,
+                    timeout=30
+            ):
+                pass
+
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads[0], threading.current_thread())
+        self.assertEqual([value for value, _ in progress], [50, 100])
+        self.assertEqual(set(thread for _, thread in progress),
+                         {threading.current_thread()})
+
+    def test_open_run_error(self):
+        app = self.application
+        temp_dir = tempfile.mkdtemp()
+        with cleanup_garbage(temp_dir), \
+                mock.patch(
+                    "pyface.directory_dialog.DirectoryDialog") as dialog_cls, \
+                mock.patch('pyface.api.error'):
+            dialog = mock.Mock()
+            dialog_cls.return_value = dialog
+            dialog.open.return_value = OK
+            dialog.path = temp_dir
 
-            self.assertEqual(mlab.savefig.call_count, 3)
-            for i in xrange(3):
-                self.assertEqual(
-                    mlab.savefig.call_args_list[i][0][0],
-                    os.path.join(temp_dir, "frame-{}.png".format(i)))
+            app._open_run()
+
+            self.assertIsNone(app.frames)
 
     def test_save_images_exception(self):
         app = self.application
-        app.frames = [
-            (VTKMesh('mesh'),
-             VTKParticles("flow_particles"),
-             VTKParticles("wall_particles")),
-            (VTKMesh('mesh'),
-             VTKParticles("flow_particles"),
-             VTKParticles("wall_particles")),
-            (VTKMesh('mesh'),
-             VTKParticles("flow_particles"),
-             VTKParticles("wall_particles")),
-        ]
+        app.frames = self.create_frame_store(3)
 
         temp_dir = tempfile.mkdtemp()
         with cleanup_garbage(temp_dir), \
-                mock.patch("simphony_ui.ui.DirectoryDialog") as dialog_cls, \
-                mock.patch('simphony_ui.ui.error') as mock_message, \
-                mock.patch("simphony_ui.ui.mlab") as mlab:
+                mock.patch(
+                    "pyface.directory_dialog.DirectoryDialog") as dialog_cls, \
+                mock.patch('pyface.api.error') as mock_message, \
+                mock.patch("simphony_ui.ui.export_images") as export:
 
             def mock_msg(*args, **kwargs):
                 return
@@ -296,9 +546,45 @@ class TestUI(unittest.TestCase, GuiTestAssistant):
             dialog_cls.return_value = dialog
             dialog.open.return_value = OK
             dialog.path = temp_dir
-            savefig = mock.Mock(side_effect=Exception())
-            mlab.savefig = savefig
+            export.side_effect = Exception()
 
             app._save_images()
+            with self.event_loop_until_condition(
+                    lambda: not app.exporting,
+                    timeout=30
+            ):
+                pass
+
             self.assertTrue(app.interactive)
             self.assertTrue(mock_message.called)
+
+    def test_save_video(self):
+        app = self.application
+        app.frames = self.create_frame_store(3)
+        app.video_settings.last_frame = 1
+
+        with mock.patch("pyface.file_dialog.FileDialog") as dialog_cls, \
+                mock.patch("simphony_ui.ui.export_video") as export:
+            dialog = mock.Mock()
+            dialog_cls.return_value = dialog
+            dialog.open.return_value = OK
+            dialog.path = '/tmp/video.mp4'
+
+            app._save_video()
+            with self.event_loop_until_condition(
+                    lambda: not app.exporting,
+                    timeout=30
+            ):
+                pass
+
+            self.assertEqual(export.call_count, 1)
+            args = export.call_args[0]
+            self.assertEqual(
+                args[:7], (self.frames_dir, 3, '/tmp/video.mp4', 0, 2, 1,
+                           (800, 600)))
+            self.assertIn('progress_callback', export.call_args[1])
+
+    def test_no_run_while_exporting(self):
+        self.application.exporting = True
+        with self.assertRaises(RuntimeError):
+            self.application.run_calc()
@@ -14,3 +14,63 @@ def cleanup_garbage(tmpdir):
         except OSError:
             logging.exception("could not delete the tmp directory")
         raise
+
+
+def create_cartesian_mesh(channel_size, num_grid):
+    """ Creates a CUDS mesh made of a regular grid of hexahedral cells
+
+    Parameters
+    ----------
+    channel_size : sequence of 3 floats
+        The size of the mesh in each direction
+    num_grid : sequence of 3 ints
+        The number of cells in each direction
+
+    Returns
+    -------
+    mesh : Mesh
+        The mesh, whose cells carry a VELOCITY equal to their (i, j, k)
+        position in the grid
+    """
+    return create_rectilinear_mesh(*[
+        [index * size / float(n) for index in range(n + 1)]
+        for size, n in zip(channel_size, num_grid)])
+
+
+def create_rectilinear_mesh(x_nodes, y_nodes, z_nodes):
+    """ Creates a CUDS mesh made of a rectilinear grid of hexahedral cells
+
+    Parameters
+    ----------
+    x_nodes, y_nodes, z_nodes : sequences of floats
+        The increasing coordinates of the grid nodes in each direction
+
+    Returns
+    -------
+    mesh : Mesh
+        The mesh, whose cells carry a VELOCITY equal to their (i, j, k)
+        position in the grid
+    """
+    from simphony.core.cuba import CUBA
+    from simphony.cuds.mesh import Mesh, Point, Cell
+
+    mesh = Mesh('mesh')
+    point_uids = {}
+    for i, x in enumerate(x_nodes):
+        for j, y in enumerate(y_nodes):
+            for k, z in enumerate(z_nodes):
+                point_uids[i, j, k] = mesh.add_points([Point((x, y, z))])[0]
+
+    hex_offsets = [(0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0),
+                   (0, 0, 1), (1, 0, 1), (1, 1, 1), (0, 1, 1)]
+    cells = []
+    for i in range(len(x_nodes) - 1):
+        for j in range(len(y_nodes) - 1):
+            for k in range(len(z_nodes) - 1):
+                cell = Cell([point_uids[i + a, j + b, k + c]
+                             for a, b, c in hex_offsets])
+                cell.data[CUBA.VELOCITY] = (float(i), float(j), float(k))
+                cells.append(cell)
+    mesh.add_cells(cells)
+
+    return mesh
@@ -0,0 +1,183 @@
+"""
+Tests the export of the frames to a video
+"""
+
+import os
+import shutil
+import stat
+import sys
+import tempfile
+import unittest
+
+import mock
+import numpy as np
+
+from simphony_ui.tests.test_utils import cleanup_garbage
+from simphony_ui.video_export import (
+    VideoEncoder, export_video, frame_indices)
+from simphony_ui.video_export_model import VideoExportModel
+from simphony_ui.worker_pool import WorkerPool
+
+# A fake ffmpeg, writing the number of bytes read from its standard input
+# to the video file
+FAKE_FFMPEG = """#!{python}
+import sys
+data = sys.stdin.read()
+with open(sys.argv[-1], 'w') as video:
+    video.write(str(len(data)))
+"""
+
+# A fake ffmpeg failing without reading its input
+FAILING_FFMPEG = """#!{python}
+import sys
+sys.stderr.write('Unknown encoder')
+sys.exit(1)
+"""
+
+SIZE = (4, 2)
+
+
+def fake_renderer(frames_directory, indices, size, camera):
+    """ Renders frames to images filled with their index """
+    width, height = size
+    return [np.full((height, width, 3), index, dtype=np.uint8)
+            for index in indices]
+
+
+def failing_renderer(frames_directory, indices, size, camera):
+    raise RuntimeError('Rendering failed')
+
+
+class TestVideoExport(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        with cleanup_garbage(self.temp_dir):
+            self.ffmpeg = self.write_script('ffmpeg', FAKE_FFMPEG)
+            self.failing_ffmpeg = self.write_script(
+                'failing_ffmpeg', FAILING_FFMPEG)
+            self.path = os.path.join(self.temp_dir, 'video.mp4')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write_script(self, name, content):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, 'w') as script:
+            script.write(content.format(python=sys.executable))
+        os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+        return path
+
+    def read_video_size(self):
+        with open(self.path, 'r') as video:
+            return int(video.read())
+
+    def test_frame_indices(self):
+        self.assertEqual(frame_indices(5), [0, 1, 2, 3, 4])
+        self.assertEqual(frame_indices(10, 2, 9, 3), [2, 5, 8])
+        self.assertEqual(frame_indices(10, 4, None, 4), [4, 8])
+        self.assertEqual(frame_indices(10, -3), [7, 8, 9])
+        self.assertEqual(frame_indices(3, 5), [])
+        with self.assertRaises(ValueError):
+            frame_indices(10, step=0)
+
+    def test_frame_range(self):
+        settings = VideoExportModel()
+        self.assertEqual(settings.frame_range(), (0, None, 1))
+
+        settings.first_frame = 2
+        settings.last_frame = 8
+        settings.stride = 3
+        self.assertEqual(settings.frame_range(), (2, 9, 3))
+        self.assertEqual(frame_indices(10, *settings.frame_range()),
+                         [2, 5, 8])
+
+        settings.last_frame = -2
+        self.assertEqual(frame_indices(10, *settings.frame_range()),
+                         range(2, 9, 3))
+
+    def test_encoder(self):
+        encoder = VideoEncoder(self.path, SIZE, ffmpeg=self.ffmpeg)
+        for _ in range(3):
+            encoder.write(np.zeros((2, 4, 3), dtype=np.uint8))
+        encoder.close()
+
+        self.assertEqual(encoder.num_frames, 3)
+        self.assertEqual(self.read_video_size(), 3 * 2 * 4 * 3)
+
+    def test_encoder_invalid_size(self):
+        with self.assertRaises(ValueError):
+            VideoEncoder(self.path, (3, 2), ffmpeg=self.ffmpeg)
+
+        encoder = VideoEncoder(self.path, SIZE, ffmpeg=self.ffmpeg)
+        with self.assertRaises(ValueError):
+            encoder.write(np.zeros((4, 2, 3), dtype=np.uint8))
+        encoder.close()
+
+    def test_encoder_failure(self):
+        encoder = VideoEncoder(self.path, (640, 480),
+                               ffmpeg=self.failing_ffmpeg)
+
+        with self.assertRaises(RuntimeError) as context:
+            for _ in range(10):
+                encoder.write(np.zeros((480, 640, 3), dtype=np.uint8))
+            encoder.close()
+        self.assertIn('Unknown encoder', str(context.exception))
+
+    def test_export_video(self):
+        progress = []
+
+        num_encoded = export_video(
+            self.temp_dir, 20, self.path, start=1, stop=19, step=2,
+            size=SIZE, ffmpeg=self.ffmpeg, max_workers=2,
+            progress_callback=lambda *args: progress.append(args),
+            renderer=fake_renderer)
+
+        self.assertEqual(num_encoded, 9)
+        self.assertEqual(self.read_video_size(), 9 * 2 * 4 * 3)
+        self.assertEqual(progress, [(4, 9), (8, 9), (9, 9)])
+
+    def test_encoder_not_inherited(self):
+        encoder = VideoEncoder(self.path, SIZE, ffmpeg=self.ffmpeg)
+        with WorkerPool(2) as pool:
+            for image in pool.submit(
+                    fake_renderer, self.temp_dir, [0, 1], SIZE,
+                    None).result():
+                encoder.write(image)
+            # ffmpeg only sees the end of its input if the workers, which
+            # are still running, do not hold its standard input
+            encoder.close()
+
+        self.assertEqual(self.read_video_size(), 2 * 2 * 4 * 3)
+
+    def test_export_video_order(self):
+        images = []
+
+        class RecordingEncoder(VideoEncoder):
+            def write(self, image):
+                images.append(int(image[0, 0, 0]))
+                super(RecordingEncoder, self).write(image)
+
+        with mock.patch('simphony_ui.video_export.VideoEncoder',
+                        RecordingEncoder):
+            export_video(
+                self.temp_dir, 30, self.path, size=SIZE, ffmpeg=self.ffmpeg,
+                max_workers=3, renderer=fake_renderer)
+
+        self.assertEqual(images, range(30))
+
+    def test_export_video_failure(self):
+        with self.assertRaises(RuntimeError):
+            export_video(
+                self.temp_dir, 10, self.path, size=SIZE, ffmpeg=self.ffmpeg,
+                renderer=failing_renderer)
+
+    def test_export_no_frames(self):
+        with self.assertRaises(ValueError):
+            export_video(
+                self.temp_dir, 10, self.path, start=10, size=SIZE,
+                ffmpeg=self.ffmpeg, renderer=fake_renderer)
+
+
+if __name__ == '__main__':
+    unittest.main()
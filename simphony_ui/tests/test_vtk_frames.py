@@ -0,0 +1,164 @@
+"""
+Tests the conversion of frame snapshots to VTK datasets
+"""
+
+import unittest
+
+import numpy as np
+from simphony.cuds.particles import Particle, Particles
+
+from simphony_ui.frames import ParticleArrays, snapshot_datasets
+from simphony_ui.openfoam_model.mesh_index import MeshArrays
+from simphony_ui.tests.test_utils import create_cartesian_mesh
+from simphony_ui.vtk_frames import (
+    MeshTopology, cell_array_ids, mesh_data_set, particles_data_set,
+    share_cell_arrays, share_particle_arrays, snapshot_to_vtk,
+    update_cell_arrays, update_particle_arrays)
+
+
+class TestVTKFrames(unittest.TestCase):
+
+    def setUp(self):
+        mesh = create_cartesian_mesh((1.0, 1.0, 1.0), (2, 3, 1))
+        flow_particles = Particles('flow_particles')
+        flow_particles.add_particles([
+            Particle((0.1, 0.2, 0.3)), Particle((0.4, 0.5, 0.6))])
+        self.snapshot = snapshot_datasets(
+            (mesh, flow_particles, Particles('wall_particles')), 0)
+
+    def test_cell_array_ids(self):
+        ids = cell_array_ids(
+            [4, 2], np.array([[0, 1, 2, 3], [4, 5, 5, 5]]))
+        self.assertEqual(ids.tolist(), [4, 0, 1, 2, 3, 2, 4, 5])
+
+    def test_mesh_data_set(self):
+        data_set = mesh_data_set(
+            self.snapshot.mesh, self.snapshot.cell_data)
+
+        self.assertEqual(data_set.number_of_points, 24)
+        self.assertEqual(data_set.number_of_cells, 6)
+        self.assertEqual(data_set.get_cell_type(0), 12)
+        np.testing.assert_array_equal(
+            data_set.cell_data.get_array('VELOCITY').to_array(),
+            self.snapshot.cell_data['velocity'])
+
+    def test_mixed_cells(self):
+        mesh = MeshArrays(
+            np.eye(3).tolist() + [[0.0, 0.0, 0.0], [1.0, 1.0, 1.0]],
+            np.array([[0, 1, 2, 3, 3], [0, 1, 2, 3, 4]]),
+            np.array([4, 5]),
+            np.array(['a', 'b'], dtype=object))
+        data_set = mesh_data_set(mesh, {})
+
+        self.assertEqual(data_set.get_cell_type(0), 10)
+        self.assertEqual(data_set.get_cell_type(1), 14)
+
+    def test_shared_topology(self):
+        topology = MeshTopology(self.snapshot.mesh)
+        velocities = self.snapshot.cell_data['velocity']
+        first = topology.frame_data_set({'velocity': velocities})
+        second = topology.frame_data_set({'velocity': velocities * 2.0})
+
+        self.assertIs(first.points, topology.data_set.points)
+        self.assertIs(second.points, topology.data_set.points)
+        self.assertEqual(topology.data_set.cell_data.number_of_arrays, 0)
+        np.testing.assert_array_equal(
+            second.cell_data.get_array('VELOCITY').to_array(),
+            velocities * 2.0)
+        np.testing.assert_array_equal(
+            first.cell_data.get_array('VELOCITY').to_array(), velocities)
+
+    def test_particles_data_set(self):
+        data_set = particles_data_set(self.snapshot.particles['flow'])
+
+        self.assertEqual(data_set.number_of_points, 2)
+        self.assertEqual(data_set.number_of_verts, 2)
+        np.testing.assert_allclose(
+            data_set.points.to_array(), [(0.1, 0.2, 0.3), (0.4, 0.5, 0.6)])
+        self.assertIsNotNone(data_set.point_data.get_array('RADIUS'))
+
+    def test_update_cell_arrays(self):
+        velocities = self.snapshot.cell_data['velocity']
+        data_set = mesh_data_set(
+            self.snapshot.mesh, {'velocity': velocities})
+        array = data_set.cell_data.get_array('VELOCITY')
+        pressures = np.arange(6.0)
+
+        update_cell_arrays(
+            data_set, {'velocity': velocities + 1.0, 'pressure': pressures})
+
+        self.assertIs(data_set.cell_data.get_array('VELOCITY'), array)
+        np.testing.assert_array_equal(array.to_array(), velocities + 1.0)
+        np.testing.assert_array_equal(
+            data_set.cell_data.get_array('PRESSURE').to_array(), pressures)
+
+        update_cell_arrays(data_set, {'velocity': velocities})
+        self.assertIsNone(data_set.cell_data.get_array('PRESSURE'))
+
+    def test_update_particle_arrays(self):
+        particles = self.snapshot.particles['flow']
+        data_set = particles_data_set(particles)
+        verts = data_set.verts
+
+        update_particle_arrays(data_set, ParticleArrays(
+            particles.coordinates + 1.0, particles.velocities,
+            np.array([0.5, 0.25])))
+
+        self.assertIs(data_set.verts, verts)
+        np.testing.assert_allclose(
+            data_set.points.to_array(), [(1.1, 1.2, 1.3), (1.4, 1.5, 1.6)])
+        np.testing.assert_array_equal(
+            data_set.point_data.get_array('RADIUS').to_array(),
+            [0.5, 0.25])
+
+        with self.assertRaises(ValueError):
+            update_particle_arrays(
+                data_set, self.snapshot.particles['wall'])
+
+    def test_share_cell_arrays(self):
+        topology = MeshTopology(self.snapshot.mesh)
+        velocities = self.snapshot.cell_data['velocity']
+        data_set = topology.frame_data_set({'velocity': velocities})
+        source = topology.frame_data_set(
+            {'velocity': velocities + 1.0, 'pressure': np.arange(6.0)})
+
+        share_cell_arrays(data_set, source)
+
+        self.assertIs(data_set.points, topology.data_set.points)
+        self.assertIs(
+            data_set.cell_data.get_array('VELOCITY'),
+            source.cell_data.get_array('VELOCITY'))
+        np.testing.assert_array_equal(
+            data_set.cell_data.get_array('PRESSURE').to_array(),
+            np.arange(6.0))
+
+    def test_share_particle_arrays(self):
+        particles = self.snapshot.particles['flow']
+        data_set = particles_data_set(particles)
+        source = particles_data_set(ParticleArrays(
+            particles.coordinates + 1.0, particles.velocities,
+            np.array([0.5, 0.25])))
+
+        share_particle_arrays(data_set, source)
+
+        self.assertIs(data_set.points, source.points)
+        np.testing.assert_array_equal(
+            data_set.point_data.get_array('RADIUS').to_array(),
+            [0.5, 0.25])
+
+        with self.assertRaises(ValueError):
+            share_particle_arrays(
+                data_set,
+                particles_data_set(self.snapshot.particles['wall']))
+
+    def test_snapshot_to_vtk(self):
+        mesh, flow_particles, wall_particles = snapshot_to_vtk(
+            self.snapshot)
+
+        self.assertEqual(mesh.name, 'mesh')
+        self.assertEqual(flow_particles.name, 'flow_particles')
+        self.assertEqual(wall_particles.name, 'wall_particles')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+"""
+Tests the pool of worker processes
+"""
+
+import os
+import unittest
+
+from simphony_ui.worker_pool import WorkerError, WorkerPool
+
+
+def square(value):
+    return value * value
+
+
+def process_id():
+    return os.getpid()
+
+
+def fail(message):
+    raise ValueError(message)
+
+
+def stop(code):
+    os._exit(code)
+
+
+def print_value(value):
+    """ Writes to the standard output of the worker """
+    print value
+    return value
+
+
+class TestWorkerPool(unittest.TestCase):
+
+    def test_results(self):
+        with WorkerPool(2) as pool:
+            futures = [pool.submit(square, value) for value in range(10)]
+            pids = set(pool.submit(process_id).result() for _ in range(4))
+
+        self.assertEqual([future.result() for future in futures],
+                         [value * value for value in range(10)])
+        self.assertNotIn(os.getpid(), pids)
+
+    def test_exception(self):
+        with WorkerPool(1) as pool:
+            future = pool.submit(fail, 'Task failed')
+            self.assertEqual(pool.submit(square, 3).result(), 9)
+
+        with self.assertRaises(ValueError) as context:
+            future.result()
+        self.assertEqual(str(context.exception), 'Task failed')
+
+    def test_unpicklable_task(self):
+        with WorkerPool(1) as pool:
+            future = pool.submit(lambda: None)
+            self.assertEqual(pool.submit(square, 3).result(), 9)
+
+        self.assertIsNotNone(future.exception())
+
+    def test_stopped_worker(self):
+        with WorkerPool(1) as pool:
+            stopped = pool.submit(stop, 3)
+            after = pool.submit(square, 3)
+
+        with self.assertRaises(WorkerError):
+            stopped.result()
+        with self.assertRaises(WorkerError):
+            after.result()
+
+    def test_task_output(self):
+        with WorkerPool(1) as pool:
+            self.assertEqual(pool.submit(print_value, 7).result(), 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
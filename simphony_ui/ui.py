@@ -1,48 +1,54 @@
 from __future__ import division
 
+import Queue
 import threading
 import os
-from concurrent import futures
 import logging
 import traceback
 
-from pyface.constant import OK
-from pyface.directory_dialog import DirectoryDialog
-from pyface.gui import GUI
-from pyface.api import error
-from pyface.timer.api import Timer
-
-import mayavi.tools.mlab_scene_model
-from mayavi import mlab
-from mayavi.modules.api import Surface, Glyph
-from simphony_mayavi.cuds.vtk_mesh import VTKMesh
-from simphony_mayavi.cuds.vtk_particles import VTKParticles
-from tvtk.tvtk_classes.sphere_source import SphereSource
-
-from simphony_mayavi.sources.api import CUDSSource
-
-from tvtk.pyface.scene_editor import SceneEditor
-from mayavi.core.ui.mayavi_scene import MayaviScene
-
-from traits.api import (HasStrictTraits, Instance, Button,
-                        on_trait_change, Bool, Event, Str, Dict, List, Tuple,
+from traits.api import (HasStrictTraits, Instance, Button, Any,
+                        on_trait_change, Bool, Event, Str, Dict, Tuple,
                         Either, Int, TraitError)
-from traitsui.api import (View, UItem, Tabbed, VGroup, HSplit, VSplit,
-                          ShellEditor, HGroup, Item, ButtonEditor)
-
-from pyface.api import ProgressDialog
 
 from simphony_ui.couple_openfoam_liggghts import run_calc
+from simphony_ui.frame_store import DEFAULT_CACHE_SIZE, FrameStore
+from simphony_ui.frames import (
+    FRAMES_DIRECTORY, FrameSnapshot, snapshot_datasets)
 from simphony_ui.global_parameters_model import GlobalParametersModel
+from simphony_ui.image_export import camera_parameters, export_images
 from simphony_ui.liggghts_model.liggghts_model import LiggghtsModel
+from simphony_ui.local_traits import PositiveInt
 from simphony_ui.openfoam_model.openfoam_model import OpenfoamModel
-
-MlabSceneModel = mayavi.tools.mlab_scene_model.MlabSceneModel
+from simphony_ui.particle_lod import ParticleLODModel, apply_particle_lod
+from simphony_ui.playback import (
+    DEFAULT_PLAYBACK_FPS, PLAYBACK_PREFETCH, TICKS_PER_FRAME, PlaybackClock,
+    PlaybackStats)
+from simphony_ui.saved_run import open_run, save_run
+from simphony_ui.video_export import export_video
+from simphony_ui.video_export_model import VideoExportModel
+from simphony_ui.vtk_frames import (
+    MeshTopology, particles_to_vtk, share_cell_arrays, share_particle_arrays,
+    snapshot_to_vtk, update_cell_arrays, update_particle_arrays)
+
+# The GUI, Mayavi and TVTK modules are heavy to import. They are imported
+# where first used, and the traits refer to their classes by name.
+CUDS_SOURCE = 'simphony_mayavi.sources.cuds_source.CUDSSource'
+VTK_MESH = 'simphony_mayavi.cuds.vtk_mesh.VTKMesh'
+VTK_PARTICLES = 'simphony_mayavi.cuds.vtk_particles.VTKParticles'
+
+#: The maximum number of frame snapshots waiting for their conversion.
+#: The calculation only waits for the conversions when the queue is full.
+FRAME_QUEUE_SIZE = 8
+
+#: The number of frames prefetched after and before the current frame
+PREFETCH_AFTER = 2
+PREFETCH_BEFORE = 1
 
 log = logging.getLogger(__name__)
 
 
 def dataset2cudssource(dataset):
+    from simphony_mayavi.sources.api import CUDSSource
     return CUDSSource(cuds=dataset)
 
 
@@ -60,31 +66,61 @@ class Application(HasStrictTraits):
     #: The Openfoam settings for the calculation
     openfoam_settings = Instance(OpenfoamModel)
 
+    #: The settings of the video export
+    video_settings = Instance(VideoExportModel, ())
+
+    #: The level of detail settings of the particles rendering
+    lod_settings = Instance(ParticleLODModel, ())
+
     # The mayavi sources, associated to the following datasets:
     # first element is the openfoam mesh, second and third are
     # the flow and walls particles, respectively.
     # It is an invariant. The cuds gets changed as we select different
     # frames.
-    sources = Tuple(Instance(CUDSSource),
-                    Instance(CUDSSource),
-                    Instance(CUDSSource))
+    sources = Tuple(Instance(CUDS_SOURCE),
+                    Instance(CUDS_SOURCE),
+                    Instance(CUDS_SOURCE))
 
     # All the frames resulting from the execution of our computation.
-    frames = List(Tuple(VTKMesh, VTKParticles, VTKParticles))
+    # They are stored on disk and only hold the arrays of each step. The
+    # mesh topology is shared by the frames of a calculation.
+    frames = Instance(FrameStore)
+
+    # The number of frames available to the UI
+    num_frames = Int()
+
+    #: The maximum number of frames kept in memory
+    frame_cache_size = PositiveInt(DEFAULT_CACHE_SIZE)
 
     # The frame to visualize
     current_frame_index = Int()
 
-    # The physical current frame, for practicality
+    # The snapshot of the current frame
+    _current_snapshot = Instance(FrameSnapshot)
+
+    # The datasets of the current frame, built from its arrays when it is
+    # shown. They are updated in place while the mesh topology does not
+    # change.
     _current_frame = Either(
         None,
-        Tuple(VTKMesh, VTKParticles, VTKParticles)
+        Tuple(Instance(VTK_MESH),
+              Instance(VTK_PARTICLES),
+              Instance(VTK_PARTICLES))
     )
 
+    # The last appended snapshot and its datasets, built by the converter
+    # thread, until they are shown
+    _prepared_frame = Any()
+
     #: The button on which the user will click to run the
     # calculation
     run_button = Button("Run")
 
+    #: The buttons saving the frames and settings of the calculation to a
+    #: run directory, and opening a saved run
+    save_run_button = Button("Save run...")
+    open_run_button = Button("Open run...")
+
     first_button = Button("First")
     previous_button = Button("Previous")
     play_stop_button = Button()
@@ -92,19 +128,33 @@ class Application(HasStrictTraits):
     next_button = Button("Next")
     last_button = Button("Last")
     save_button = Button("Save...")
+    save_video_button = Button("Save video...")
+
+    #: True while the frames are exported to images or to a video
+    exporting = Bool(False)
+
+    #: The progress of the export, in percent
+    export_progress = Int()
+
+    play_timer = Instance('pyface.timer.api.Timer')
 
-    play_timer = Instance(Timer)
+    #: The target frame rate of the playback, in frames per second
+    playback_fps = PositiveInt(DEFAULT_PLAYBACK_FPS)
+
+    #: The achieved frame rate and stage timings of the playback
+    playback_status = Str()
 
     #: The pop up dialog which will show the status of the
     # calculation
-    progress_dialog = Instance(ProgressDialog)
+    progress_dialog = Instance('pyface.api.ProgressDialog')
 
     #: Boolean representing if the application should allow
     # operations or not
     interactive = Bool(True)
 
     #: The Mayavi traits model which contains the scene and engine
-    mlab_model = Instance(MlabSceneModel, ())
+    mlab_model = Instance(
+        'mayavi.tools.mlab_scene_model.MlabSceneModel', ())
 
     #: Event object which will be useful for error dialog
     calculation_error_event = Event(Str)
@@ -117,81 +167,140 @@ class Application(HasStrictTraits):
 
     # Private traits.
     #: Executor for the threaded action.
-    _executor = Instance(futures.ThreadPoolExecutor)
-
-    # Lock to synchronize the execution loop and the storage of the Datasets
-    # from application specific cuds to VTK Datasets. We need to do so because
-    # the computational engine can change the datasets, so we need to hold
-    # the computational engine until we are done "copying and storing" each
-    # frame
-    _event_lock = Instance(threading.Event, ())
-
-    traits_view = View(
-        HSplit(
-            VSplit(
-                VGroup(
-                    Tabbed(
-                        UItem('global_settings', style='custom'),
-                        UItem('liggghts_settings', style='custom'),
-                        UItem('openfoam_settings',
-                              label='OpenFOAM settings',
-                              style="custom"),
-                    ),
-                    UItem(
-                        name='run_button',
-                        enabled_when='valid'
+    _executor = Instance('concurrent.futures.ThreadPoolExecutor')
+
+    #: The snapshots sent by the calculation, waiting for their conversion
+    #: to VTK datasets. A None item ends the conversions of a calculation.
+    _snapshots = Instance(Queue.Queue)
+
+    #: The thread converting the snapshots
+    _converter = Instance(threading.Thread)
+
+    #: The thread exporting the frames
+    _exporter = Instance(threading.Thread)
+
+    #: The VTK topology of the mesh of the frames
+    _topology = Instance(MeshTopology)
+
+    #: The last snapshot sent by the calculation
+    _last_snapshot = Any()
+
+    #: The clock of the running playback
+    _playback_clock = Instance(PlaybackClock)
+
+    #: The frame rate and timings of the playback
+    _playback_stats = Instance(PlaybackStats, ())
+
+    #: True while the user moves the camera
+    _interacting = Bool(False)
+
+    def default_traits_view(self):
+        from mayavi.core.ui.mayavi_scene import MayaviScene
+        from traitsui.api import (View, UItem, Tabbed, VGroup, HSplit,
+                                  VSplit, ShellEditor, HGroup, Item,
+                                  ButtonEditor)
+        from tvtk.pyface.scene_editor import SceneEditor
+
+        return View(
+            HSplit(
+                VSplit(
+                    VGroup(
+                        Tabbed(
+                            UItem('global_settings', style='custom'),
+                            UItem('liggghts_settings', style='custom'),
+                            UItem('openfoam_settings',
+                                  label='OpenFOAM settings',
+                                  style="custom"),
+                            UItem('video_settings',
+                                  label='Video export',
+                                  style="custom"),
+                            UItem('lod_settings',
+                                  label='Rendering',
+                                  style="custom"),
+                        ),
+                        UItem(
+                            name='run_button',
+                            enabled_when='valid and not exporting'
+                        ),
+                        HGroup(
+                            UItem(
+                                name='save_run_button',
+                                enabled_when='num_frames > 0'
+                            ),
+                            UItem(name='open_run_button'),
+                        ),
+                        enabled_when='interactive',
                     ),
-                    enabled_when='interactive',
+                    UItem('shell', editor=ShellEditor())
                 ),
-                UItem('shell', editor=ShellEditor())
-            ),
-            VGroup(
-                UItem(
-                    name='mlab_model',
-                    editor=SceneEditor(scene_class=MayaviScene)
-                ),
-                HGroup(
-                    UItem(
-                        name="first_button",
-                        enabled_when=(
-                            "current_frame_index > 0 and play_timer is None"),
-                    ),
-                    UItem(
-                        name="previous_button",
-                        enabled_when=(
-                            "current_frame_index > 0 and play_timer is None"),
-                    ),
-                    UItem(
-                        name="play_stop_button",
-                        editor=ButtonEditor(label_value="play_stop_label")
-                    ),
+                VGroup(
                     UItem(
-                        name="next_button",
-                        enabled_when=(
-                            "current_frame_index < len(frames) "
-                            "and play_timer is None"),
+                        name='mlab_model',
+                        editor=SceneEditor(scene_class=MayaviScene)
                     ),
-                    UItem(
-                        name="last_button",
+                    HGroup(
+                        UItem(
+                            name="first_button",
+                            enabled_when=(
+                                "current_frame_index > 0 "
+                                "and play_timer is None"),
+                        ),
+                        UItem(
+                            name="previous_button",
+                            enabled_when=(
+                                "current_frame_index > 0 "
+                                "and play_timer is None"),
+                        ),
+                        UItem(
+                            name="play_stop_button",
+                            editor=ButtonEditor(label_value="play_stop_label")
+                        ),
+                        UItem(
+                            name="next_button",
+                            enabled_when=(
+                                "current_frame_index < num_frames "
+                                "and play_timer is None"),
+                        ),
+                        UItem(
+                            name="last_button",
+                            enabled_when=(
+                                "current_frame_index < num_frames "
+                                "and play_timer is None"),
+                        ),
+                        Item(name="current_frame_index", style="readonly"),
+                        Item(name="playback_fps", label="Target fps"),
+                        UItem(name="playback_status", style="readonly"),
+                        Item(name="frame_cache_size",
+                             label="Frames in memory"),
+                        UItem(
+                            name="save_button",
+                            enabled_when="not exporting",
+                        ),
+                        UItem(
+                            name="save_video_button",
+                            enabled_when="not exporting",
+                        ),
+                        Item(
+                            name="export_progress",
+                            label="Export (%)",
+                            style="readonly",
+                            visible_when="exporting",
+                        ),
                         enabled_when=(
-                            "current_frame_index < len(frames) "
-                            "and play_timer is None"),
-                    ),
-                    Item(name="current_frame_index", style="readonly"),
-                    UItem(name="save_button"),
-                    enabled_when=(
-                        'interactive and len(frames) > 0')
-                )
+                            'interactive and num_frames > 0')
+                    )
+                ),
             ),
-        ),
-        title='Simphony UI',
-        resizable=True,
-        width=1.0,
-        height=1.0
-    )
+            title='Simphony UI',
+            resizable=True,
+            width=1.0,
+            height=1.0
+        )
 
     @on_trait_change('calculation_error_event', dispatch='ui')
     def show_error(self, error_message):
+        from pyface.api import error
+
         error(
             None,
             'Oups ! Something went bad...\n\n{}'.format(error_message),
@@ -214,18 +323,28 @@ class Application(HasStrictTraits):
         RuntimeError
             If the calculation is already running
         """
-        if not self.interactive:
+        if not self.interactive or self.exporting:
             raise RuntimeError('Unable to start calculation. Another '
                                'operation is already in progress')
-        self.frames = []
+        if self.frames is not None:
+            self.frames.close()
+        self.frames = FrameStore.create(
+            os.path.join(self.openfoam_settings.output_path, FRAMES_DIRECTORY),
+            self.frame_cache_size)
         self.interactive = False
         self.progress_dialog.title = 'Calculation running...'
         self.progress_dialog.open()
-        future = self._executor.submit(self._run_calc_threaded)
-        future.add_done_callback(self._calculation_done)
+        self._last_snapshot = None
+        self._converter = threading.Thread(
+            target=self._convert_snapshots, name='SnapshotConverter')
+        self._converter.daemon = True
+        self._converter.start()
+        self._executor.submit(self._run_calc_threaded)
 
     def _add_sources_to_scene(self):
         """Add the sources to the main scene."""
+        from mayavi.modules.api import Surface
+
         mayavi_engine = self.mlab_model.engine
         mayavi_engine.add_source(self.sources[0])
 
@@ -241,6 +360,8 @@ class Application(HasStrictTraits):
         source :
             The mayavi source linked to the dataset
         """
+        from mayavi.modules.api import Glyph
+
         mayavi_engine = self.mlab_model.engine
 
         # Create Sphere glyph
@@ -248,21 +369,18 @@ class Application(HasStrictTraits):
 
         # Add Liggghts sources
         mayavi_engine.add_source(source)
-
-        try:
-            source.point_vectors_name = 'VELOCITY'
-        except TraitError:
-            # The data is not available in the dataset for some reason.
-            # Add the modules anyway, but don't select it.
-            pass
+        self._select_particle_vectors(source)
 
         # Add sphere glyph module
         mayavi_engine.add_module(sphere_glyph_module)
 
-        sphere_glyph_module.glyph.glyph_source.glyph_source = SphereSource()
+        # The sphere source of the glyph source is kept, so that the level
+        # of detail can switch back to it
+        glyph_source = sphere_glyph_module.glyph.glyph_source
+        glyph_source.glyph_source = glyph_source.glyph_dict['sphere_source']
         sphere_glyph_module.glyph.scale_mode = 'scale_by_scalar'
         sphere_glyph_module.glyph.glyph.range = [0.0, 1.0]
-        sphere_glyph_module.glyph.glyph_source.glyph_source.radius = 1.0
+        glyph_source.glyph_source.radius = 1.0
 
         # Velocities are in meter/second, this scale factor makes
         # 1 graphical unit = 1 millimeter/sec
@@ -277,6 +395,15 @@ class Application(HasStrictTraits):
         arrow_glyph_module.glyph.glyph.range = [0.0, 1.0]
         arrow_glyph_module.glyph.glyph.scale_factor = arrow_scale_factor
 
+    def _select_particle_vectors(self, source):
+        """ Selects the velocities as the vectors of a particles source """
+        try:
+            source.point_vectors_name = 'VELOCITY'
+        except TraitError:
+            # The data is not available in the dataset for some reason.
+            # Add the modules anyway, but don't select it.
+            pass
+
     def _remove_sources_from_scene(self):
         for source in self.sources:
             try:
@@ -289,90 +416,255 @@ class Application(HasStrictTraits):
         is only run by the secondary thread
         """
         try:
-            return run_calc(
-                self.global_settings,
+            datasets = run_calc(
+                self._calculation_global_settings(),
                 self.openfoam_settings,
                 self.liggghts_settings,
-                self.progress_callback,
-                self._event_lock
+                self.progress_callback
             )
+
+            # The last iteration is only sent to the callback when it
+            # falls on the update frequency
+            last_iteration = self.global_settings.num_iterations - 1
+            if (datasets is not None and
+                    last_iteration % self.global_settings.update_frequency):
+                mesh = (self._last_snapshot.mesh
+                        if self._last_snapshot is not None else None)
+                self._snapshots.put(
+                    snapshot_datasets(datasets, last_iteration, mesh))
+            return datasets
         except Exception:
             self.calculation_error_event = traceback.format_exc()
             log.exception('Error during the calculation')
             return None
+        finally:
+            self._snapshots.put(None)
 
-    def _calculation_done(self, future):
-        """ Function which will return the result of the computation to
-        the main thread
+    def _calculation_global_settings(self):
+        """ The global settings the calculation runs with. The pipelined
+        coupling mode forks a child process, which is unsafe from the
+        threads of the user interface, so the calculation falls back to
+        the sequential mode.
+        """
+        if self.global_settings.coupling_mode != 'pipelined':
+            return self.global_settings
+
+        log.warning('The pipelined coupling mode is not available in the '
+                    'user interface, running in sequential mode')
+        global_settings = self.global_settings.clone_traits()
+        global_settings.coupling_mode = 'sequential'
+        return global_settings
+
+    def _convert_snapshots(self):
+        """ Receives the snapshots of the calculation until its end. This
+        function is only run by the converter thread. It builds the VTK
+        topology of the mesh on the first snapshot, writes the frames to
+        the frame store and hands them to the main thread, with their VTK
+        datasets, so that the main thread only swaps them into the scene.
+        The datasets of a frame are not built when a newer snapshot is
+        already waiting, as only the last appended frame is shown.
+        """
+        from pyface.gui import GUI
 
-        Parameters
-        ----------
-        future
-            Object containing the result of the calculation
+        while True:
+            snapshot = self._snapshots.get()
+            if snapshot is None:
+                break
+            try:
+                topology = self._frame_topology(snapshot)
+                self.frames.append(snapshot)
+                vtk_frame = None
+                # The end of the calculation may be waiting after it
+                if self._snapshots.qsize() <= 1:
+                    vtk_frame = snapshot_to_vtk(snapshot, topology)
+            except Exception:
+                self.calculation_error_event = traceback.format_exc()
+                log.exception('Error while converting a frame')
+                continue
+            GUI.invoke_later(self._frame_appended, snapshot, vtk_frame)
+
+        GUI.invoke_later(self._computation_done)
+
+    def _frame_topology(self, snapshot):
+        """ The VTK topology of the mesh of a frame, shared by the frames
+        with the same mesh
         """
-        GUI.invoke_later(self._computation_done, future.result())
+        if self._topology is None or self._topology.mesh is not snapshot.mesh:
+            self._topology = MeshTopology(snapshot.mesh)
+        return self._topology
 
-    def _computation_done(self, datasets):
+    def _computation_done(self):
         self.progress_dialog.update(100)
-        if datasets is not None:
-            self._append_frame(datasets)
+        if self.num_frames > 0:
             self._to_last_frame()
         self.interactive = True
 
-    def _append_frame(self, datasets):
-        self.frames.append(
-            (
-                VTKMesh.from_mesh(datasets[0]),
-                VTKParticles.from_particles(datasets[1]),
-                VTKParticles.from_particles(datasets[2])
-            )
-        )
+    def _frame_appended(self, snapshot=None, vtk_frame=None):
+        """ Makes the frames appended to the store available and shows
+        the last one, with its datasets if they were built """
+        if vtk_frame is not None:
+            self._prepared_frame = (snapshot, vtk_frame)
+        self.num_frames = len(self.frames)
+        self.current_frame_index = self.num_frames - 1
+
+    def _frames_changed(self, new):
+        self._prepared_frame = None
+        self.num_frames = len(new) if new is not None else 0
 
-    @on_trait_change("current_frame_index,frames[]")
+    def _frame_cache_size_changed(self, new):
+        if self.frames is not None:
+            self.frames.cache_size = new
+
+    @on_trait_change("current_frame_index,num_frames,frames")
     def _sync_current_frame(self):
         """Synchronizes the current frame with the index and the available
-        frames."""
-        try:
-            self._current_frame = self.frames[self.current_frame_index]
-        except IndexError:
-            self._current_frame = None
-
-    @on_trait_change("_current_frame")
-    def _update_sources_with_current_frame(self, object, name, old, new):
-        """Called when the current frame is changed, updates the sources
-        with the new data. Parameters are from traits interface."""
+        frames. The frame is loaded from the frame store if needed, and its
+        neighbours are prefetched."""
+        stats = self._playback_stats
+        index = self.current_frame_index
+        snapshot = None
+        if 0 <= index < self.num_frames:
+            with stats.timing('load'):
+                snapshot = self.frames[index]
+            self.frames.prefetch(
+                range(index + 1, index + PREFETCH_AFTER + 1) +
+                range(index - PREFETCH_BEFORE, index))
+
+        previous = self._current_snapshot
+        if snapshot is previous and snapshot is not None:
+            return
+        self._current_snapshot = snapshot
+
+        prepared = None
+        if (self._prepared_frame is not None and
+                self._prepared_frame[0] is snapshot):
+            prepared = self._prepared_frame[1]
+            self._prepared_frame = None
+
         scene = self.mlab_model.mayavi_scene
         scene.scene.disable_render = True
+        try:
+            with stats.timing('swap'):
+                if snapshot is None:
+                    self._current_frame = None
+                    self._remove_sources_from_scene()
+                elif (self._current_frame is None or previous is None or
+                        previous.mesh is not snapshot.mesh):
+                    if prepared is None:
+                        prepared = snapshot_to_vtk(
+                            snapshot, self._frame_topology(snapshot))
+                    self._current_frame = prepared
+                    self._rebuild_scene()
+                else:
+                    self._update_current_frame(snapshot, prepared)
+        finally:
+            with stats.timing('render'):
+                scene.scene.disable_render = False
 
-        if new is None:
-            self._remove_sources_from_scene()
+    def _rebuild_scene(self):
+        """Builds the pipeline of the scene for the datasets of the current
+        frame."""
+        self._remove_sources_from_scene()
+        for source, dataset in zip(self.sources, self._current_frame):
+            source.cuds = dataset
+        self._add_sources_to_scene()
+
+    def _update_current_frame(self, snapshot, prepared=None):
+        """Shows a frame with the mesh topology of the current frame, without
+        rebuilding the pipeline of the scene. The data arrays of the
+        datasets are replaced in place, by those of the prepared datasets
+        of the frame if given. A particles dataset is only replaced when
+        the number of particles changed."""
+        mesh, flow_particles, wall_particles = self._current_frame
+        if prepared is None:
+            update_cell_arrays(mesh.data_set, snapshot.cell_data)
         else:
-            self._remove_sources_from_scene()
-            for i in xrange(len(self._current_frame)):
-                self.sources[i].cuds = self._current_frame[i]
-            self._add_sources_to_scene()
-
-        scene.scene.disable_render = False
+            share_cell_arrays(mesh.data_set, prepared[0].data_set)
+        self.sources[0].update()
+
+        particles_datasets = []
+        for index, (source, dataset, name) in enumerate(zip(
+                self.sources[1:], (flow_particles, wall_particles),
+                ('flow', 'wall')), 1):
+            particles = snapshot.particles[name]
+            if dataset.data_set.number_of_points == len(
+                    particles.coordinates):
+                if prepared is None:
+                    update_particle_arrays(dataset.data_set, particles)
+                else:
+                    share_particle_arrays(
+                        dataset.data_set, prepared[index].data_set)
+                source.update()
+            else:
+                dataset = (prepared[index] if prepared is not None
+                           else particles_to_vtk(dataset.name, particles))
+                source.cuds = dataset
+                self._select_particle_vectors(source)
+            particles_datasets.append(dataset)
+
+        self._current_frame = (mesh,) + tuple(particles_datasets)
+        if self._interacting:
+            self._update_particle_lod()
+
+    @on_trait_change('mlab_model.scene.activated')
+    def _observe_interaction(self):
+        """Tracks the camera interactions of the user, which lower the
+        level of detail of the particles."""
+        interactor = self.mlab_model.scene.interactor
+        interactor.add_observer(
+            'StartInteractionEvent', self._interaction_started)
+        interactor.add_observer(
+            'EndInteractionEvent', self._interaction_ended)
+
+    def _interaction_started(self, obj, event):
+        self._interacting = True
+
+    def _interaction_ended(self, obj, event):
+        self._interacting = False
+
+    @on_trait_change('_interacting,lod_settings.+')
+    def _update_particle_lod(self):
+        """Sets the level of detail of the particles sources, from their
+        number of particles and the camera interaction."""
+        if self._current_frame is None:
+            return
 
-    def progress_callback(self, datasets, current_iteration, total_iterations):
-        """ Function called in the secondary thread. It will transfer the
-        progress status of the calculation to the main thread
+        settings = self.lod_settings
+        for source, dataset in zip(self.sources[1:],
+                                   self._current_frame[1:]):
+            if len(source.children) == 0:
+                continue
+            modules = source.children[0].children
+            num_particles = dataset.data_set.number_of_points
+            level = settings.level(num_particles, self._interacting)
+            apply_particle_lod(
+                modules[0], modules[1], level,
+                settings.arrow_ratio(num_particles, level), settings)
+
+    def progress_callback(self, snapshot, current_iteration,
+                          total_iterations):
+        """ Function called in the secondary thread. It queues the snapshot
+        for its conversion and transfers the progress status of the
+        calculation to the main thread. It only waits when the snapshot
+        queue is full.
 
         Parameters
         ----------
-        progress
-            The progress of the calculation (Integer in the range [0, 100])
+        snapshot : FrameSnapshot
+            The snapshot of the calculation
+        current_iteration : int
+            The current iteration of the calculation
+        total_iterations : int
+            The number of iterations of the calculation
         """
+        from pyface.gui import GUI
+
         progress = current_iteration/total_iterations*100
 
-        GUI.invoke_later(self._append_frame_and_continue, datasets)
+        self._last_snapshot = snapshot
+        self._snapshots.put(snapshot)
         GUI.invoke_later(self.progress_dialog.update, progress)
 
-    def _append_frame_and_continue(self, datasets):
-        self._append_frame(datasets)
-        self._event_lock.set()
-        self.current_frame_index = len(self.frames) - 1
-
     def reset(self):
         """ Function which reset the Mayavi scene.
         """
@@ -387,7 +679,7 @@ class Application(HasStrictTraits):
     @on_trait_change('last_button')
     def _to_last_frame(self):
         """Goes to the last frame"""
-        self.current_frame_index = len(self.frames) - 1
+        self.current_frame_index = self.num_frames - 1
 
     @on_trait_change('previous_button')
     def _to_prev_frame(self):
@@ -401,72 +693,230 @@ class Application(HasStrictTraits):
     def _to_next_frame(self):
         """Goes to the next frame"""
         frame = self.current_frame_index + 1
-        if frame >= len(self.frames):
-            frame = len(self.frames) - 1
+        if frame >= self.num_frames:
+            frame = self.num_frames - 1
         self.current_frame_index = frame
 
     @on_trait_change('play_stop_button')
     def _start_stop_video(self):
-        """Starts the video playing"""
+        """Starts or stops the video playing"""
         if self.play_timer is None:
-            self.play_timer = Timer(500, self._next_frame_looped)
+            self._start_playback()
         else:
-            self.play_timer.Stop()
-            self.play_timer = None
+            self._stop_playback()
+
+    def _start_playback(self):
+        """Starts playing the frames from the current one, at the target
+        frame rate"""
+        from pyface.timer.api import Timer
+
+        self._playback_clock = PlaybackClock(
+            self.playback_fps, self.current_frame_index)
+        self._playback_stats.reset()
+        self.play_timer = Timer(
+            max(1, int(1000 / (self.playback_fps * TICKS_PER_FRAME))),
+            self._play_tick)
+
+    def _stop_playback(self):
+        self.play_timer.Stop()
+        self.play_timer = None
+
+    def _playback_fps_changed(self):
+        if self.play_timer is not None:
+            self._stop_playback()
+            self._start_playback()
+
+    def _play_tick(self):
+        """Shows the frame due at the current time of the playback. The
+        frames between the current frame and the due frame are dropped,
+        and the frames expected next are prefetched."""
+        num_frames = self.num_frames
+        if num_frames == 0:
+            return
+
+        clock = self._playback_clock
+        stats = self._playback_stats
+        advance = (clock.due_frame(num_frames) -
+                   self.current_frame_index) % num_frames
+        if advance == 0:
+            return
+
+        self.current_frame_index = (
+            self.current_frame_index + advance) % num_frames
+        stats.frame_shown(dropped=advance - 1)
+
+        step = 1
+        if stats.achieved_fps > 0.0:
+            step = max(1, int(round(clock.fps / stats.achieved_fps)))
+        self.frames.prefetch(
+            clock.upcoming_frames(num_frames, PLAYBACK_PREFETCH, step))
+        self.playback_status = stats.summary()
 
     @on_trait_change("save_button")
     def _save_images(self):
-        """Saves the current frames in individual images."""
+        """Saves the frames in individual images. The images are rendered
+        offscreen by worker processes, with the camera and size of the
+        scene, while the UI stays usable."""
+        from pyface.constant import OK
+        from pyface.directory_dialog import DirectoryDialog
+
         dialog = DirectoryDialog()
         if dialog.open() != OK:
             return
 
-        self.progress_dialog.title = 'Saving images...'
-        self.progress_dialog.open()
+        scene = self.mlab_model.scene
+        self._start_export(
+            export_images, self.frames.directory, self.num_frames,
+            dialog.path, tuple(scene.render_window.size),
+            camera_parameters(scene.camera))
+
+    @on_trait_change("save_video_button")
+    def _save_video(self):
+        """Saves the frames to a video. The frames are rendered offscreen
+        by worker processes, with the camera of the scene, and streamed to
+        the encoder while the UI stays usable."""
+        from pyface.constant import OK
+        from pyface.file_dialog import FileDialog
+
+        dialog = FileDialog(action='save as', wildcard='*.mp4')
+        if dialog.open() != OK:
+            return
 
-        dirpath = dialog.path
+        settings = self.video_settings
+        start, stop, step = settings.frame_range()
+        self._start_export(
+            export_video, self.frames.directory, self.num_frames,
+            dialog.path, start, stop, step,
+            (settings.width, settings.height),
+            camera_parameters(self.mlab_model.scene.camera),
+            settings.frame_rate)
+
+    def _start_export(self, export, *args):
+        """ Starts an export of the frames in the exporter thread
+
+        Parameters
+        ----------
+        export : function
+            The export function, accepting a progress_callback argument
+        args : tuple
+            The arguments of the export function
+        """
+        self.exporting = True
+        self.export_progress = 0
+        self._exporter = threading.Thread(
+            target=self._export_threaded, args=(export,) + args,
+            name='Exporter')
+        self._exporter.daemon = True
+        self._exporter.start()
+
+    def _export_threaded(self, export, *args):
+        """ Exports the frames. This function is only run by the exporter
+        thread.
+        """
+        from pyface.gui import GUI
+
+        def update_progress(num_done, total):
+            GUI.invoke_later(
+                setattr, self, 'export_progress', 100*num_done//total)
 
-        self.interactive = False
         try:
-            for frame_index in xrange(len(self.frames)):
-                self.current_frame_index = frame_index
-                mlab.savefig(os.path.join(
-                    dirpath, "frame-{}.png".format(frame_index)
-                ))
-                progress = 100*frame_index/len(self.frames)
-                self.progress_dialog.update(progress)
-
-            self.progress_dialog.update(100)
+            export(*args, progress_callback=update_progress)
         except Exception:
             self.calculation_error_event = traceback.format_exc()
             log.exception('Error while saving')
         finally:
-            self.interactive = True
+            GUI.invoke_later(setattr, self, 'exporting', False)
+
+    @on_trait_change('save_run_button')
+    def _save_run(self):
+        """Saves the frames and the settings to a run directory. The files
+        are copied by the secondary thread, while the UI stays responsive
+        but not interactive."""
+        from pyface.constant import OK
+        from pyface.directory_dialog import DirectoryDialog
+
+        dialog = DirectoryDialog()
+        if dialog.open() != OK:
+            return
+
+        self.progress_dialog.title = 'Saving run...'
+        self.progress_dialog.open()
+
+        self.interactive = False
+        self._executor.submit(self._save_run_threaded, dialog.path)
+
+    def _save_run_threaded(self, path):
+        """ Saves the run to a directory. This function is only run by the
+        secondary thread, the progress being transferred to the main
+        thread.
+        """
+        from pyface.gui import GUI
+
+        def update_progress(count, total):
+            GUI.invoke_later(self.progress_dialog.update, 100*count/total)
+
+        try:
+            save_run(
+                path, self.frames, self.global_settings,
+                self.openfoam_settings, self.liggghts_settings,
+                update_progress)
+        except Exception:
+            self.calculation_error_event = traceback.format_exc()
+            log.exception('Error while saving the run')
+        finally:
+            GUI.invoke_later(self._save_run_done)
+
+    def _save_run_done(self):
+        self.progress_dialog.update(100)
+        self.interactive = True
+
+    @on_trait_change('open_run_button')
+    def _open_run(self):
+        """Opens a saved run, replacing the frames and the settings. The
+        frames are loaded when shown."""
+        from pyface.constant import OK
+        from pyface.directory_dialog import DirectoryDialog
+
+        dialog = DirectoryDialog()
+        if dialog.open() != OK:
+            return
+
+        try:
+            run = open_run(dialog.path, self.frame_cache_size)
+        except Exception:
+            self.calculation_error_event = traceback.format_exc()
+            log.exception('Error while opening the run')
+            return
+
+        if self.frames is not None:
+            self.frames.close()
+        self.global_settings = run.global_settings
+        self.openfoam_settings = run.openfoam_settings
+        self.liggghts_settings = run.liggghts_settings
+        self.current_frame_index = 0
+        self.frames = run.frames
 
     @on_trait_change('play_timer')
     def _change_play_button_label(self):
         """Changes the label from play to stop and vice-versa"""
         self.play_stop_label = "Stop" if self.play_timer else "Start"
 
-    def _next_frame_looped(self):
-        """Goes to the next frame, but loop back to the first when over."""
-        if len(self.frames) == 0:
-            self.current_frame_index = 0
-
-        self.current_frame_index = (
-            self.current_frame_index + 1
-            ) % len(self.frames)
+    def __snapshots_default(self):
+        return Queue.Queue(FRAME_QUEUE_SIZE)
 
     def __executor_default(self):
+        from concurrent import futures
         return futures.ThreadPoolExecutor(max_workers=1)
 
     def _progress_dialog_default(self):
+        from pyface.api import ProgressDialog
         return ProgressDialog(
             min=0,
             max=100,
         )
 
     def _sources_default(self):
+        from simphony_mayavi.sources.api import CUDSSource
         return CUDSSource(), CUDSSource(), CUDSSource()
 
     def _global_settings_default(self):
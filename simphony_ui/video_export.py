@@ -0,0 +1,323 @@
+""" Export of the frames of a calculation to a video, by piping the raw RGB
+images rendered offscreen into an ffmpeg encoder process.
+
+No intermediate image file is written. The frames are rendered in chunks
+by worker processes, as for the image export, and are written to the
+encoder in order. Only a bounded number of chunks is in flight, so that
+the memory used does not depend on the number of frames.
+
+The ffmpeg binary is searched on the PATH, then provided by the optional
+imageio-ffmpeg package.
+"""
+import collections
+import logging
+import multiprocessing
+import os
+import subprocess
+import tempfile
+from distutils.spawn import find_executable
+
+import numpy as np
+
+from simphony_ui.frames import frame_file_name, read_frame
+from simphony_ui.image_export import (
+    DEFAULT_IMAGE_SIZE, RGB_CHANNELS, worker_renderer)
+from simphony_ui.worker_pool import WorkerPool
+
+log = logging.getLogger(__name__)
+
+#: The default number of frames per second of the videos
+DEFAULT_FRAME_RATE = 25
+
+#: The default ffmpeg video codec
+DEFAULT_CODEC = 'libx264'
+
+#: The number of frames rendered by a worker in one task
+VIDEO_CHUNK_SIZE = 4
+
+#: The number of chunks rendered or waiting to be encoded, per worker
+CHUNKS_PER_WORKER = 2
+
+
+def find_ffmpeg():
+    """ The path of the ffmpeg binary
+
+    Raises
+    ------
+    RuntimeError
+        If ffmpeg is not on the PATH and imageio-ffmpeg is not installed
+    """
+    ffmpeg = find_executable('ffmpeg')
+    if ffmpeg is not None:
+        return ffmpeg
+
+    try:
+        import imageio_ffmpeg
+    except ImportError:
+        raise RuntimeError(
+            'ffmpeg or imageio-ffmpeg is required to export videos')
+    return imageio_ffmpeg.get_ffmpeg_exe()
+
+
+def frame_indices(num_frames, start=0, stop=None, step=1):
+    """ The indices of the frames of a video, as in a slice of the frames
+
+    Parameters
+    ----------
+    num_frames : int
+        The number of frames of the calculation
+    start : int
+        The first frame
+    stop : int
+        The frame after the last frame. If None, the video ends at the
+        last frame of the calculation.
+    step : int
+        The stride between the frames of the video
+
+    Returns
+    -------
+    indices : list of int
+        The indices of the frames
+
+    Raises
+    ------
+    ValueError
+        If step is not positive
+    """
+    if step < 1:
+        raise ValueError('The frame stride must be positive')
+    return range(*slice(start, stop, step).indices(num_frames))
+
+
+class VideoEncoder(object):
+    """ Encodes RGB images to a video file, through an ffmpeg process
+    reading them from its standard input.
+    """
+
+    def __init__(self, path, size, frame_rate=DEFAULT_FRAME_RATE,
+                 codec=DEFAULT_CODEC, ffmpeg=None):
+        """
+        Parameters
+        ----------
+        path : str
+            The path of the video file. It is overwritten if it exists.
+        size : tuple
+            The width and height of the images, in pixels. They must be
+            even.
+        frame_rate : int
+            The number of frames per second of the video
+        codec : str
+            The ffmpeg video codec
+        ffmpeg : str
+            The path of the ffmpeg binary. If None, it is found by
+            find_ffmpeg.
+
+        Raises
+        ------
+        ValueError
+            If the width or height is odd
+        """
+        width, height = size
+        if width % 2 or height % 2:
+            raise ValueError(
+                'The video size must be even, not {}x{}'.format(
+                    width, height))
+
+        #: The width and height of the images
+        self.size = (width, height)
+
+        #: The number of images written
+        self.num_frames = 0
+
+        command = [
+            ffmpeg or find_ffmpeg(), '-y', '-loglevel', 'error',
+            '-f', 'rawvideo', '-pix_fmt', 'rgb24',
+            '-s', '{}x{}'.format(width, height),
+            '-r', str(frame_rate), '-i', '-',
+            '-an', '-vcodec', codec, '-pix_fmt', 'yuv420p', path]
+        log.info('Running %s', ' '.join(command))
+
+        # The errors are only read when the process failed. They are
+        # written to a file, so that the process never blocks on them.
+        # The file descriptors of the parent are not inherited, as the
+        # pipes of the worker processes would stay open in ffmpeg.
+        self._errors = tempfile.TemporaryFile()
+        self._process = subprocess.Popen(
+            command, stdin=subprocess.PIPE, stderr=self._errors,
+            close_fds=True)
+
+    def write(self, image):
+        """ Writes an image to the video
+
+        Parameters
+        ----------
+        image : (height, width, 3) uint8 array
+            The image, its first row being the top of the frame
+
+        Raises
+        ------
+        ValueError
+            If the image does not have the size of the video
+        RuntimeError
+            If the ffmpeg process failed
+        """
+        width, height = self.size
+        if image.shape != (height, width, RGB_CHANNELS):
+            raise ValueError(
+                'Expected an image of shape {}, not {}'.format(
+                    (height, width, RGB_CHANNELS), image.shape))
+
+        try:
+            self._process.stdin.write(
+                np.ascontiguousarray(image, dtype=np.uint8).tostring())
+        except IOError:
+            self._process.kill()
+            self._process.wait()
+            raise RuntimeError(
+                'ffmpeg stopped while encoding:\n{}'.format(
+                    self._error_output()))
+        self.num_frames += 1
+
+    def close(self):
+        """ Ends the video and waits for the encoder
+
+        Raises
+        ------
+        RuntimeError
+            If the ffmpeg process failed
+        """
+        if self._process.returncode is None:
+            self._process.stdin.close()
+            if self._process.wait() != 0:
+                raise RuntimeError(
+                    'ffmpeg failed with exit code {}:\n{}'.format(
+                        self._process.returncode, self._error_output()))
+        self._errors.close()
+
+    def abort(self):
+        """ Stops the encoder, leaving an incomplete video """
+        if self._process.returncode is None:
+            self._process.kill()
+            self._process.wait()
+        self._errors.close()
+
+    def _error_output(self):
+        self._errors.seek(0)
+        return self._errors.read()
+
+
+def render_rgb_frames(frames_directory, indices, size, camera):
+    """ Renders frames to RGB images. This function is run by the worker
+    processes, which build their renderer on their first call.
+
+    Parameters
+    ----------
+    frames_directory : str
+        The directory of the frames
+    indices : list of int
+        The indices of the frames to render
+    size : tuple
+        The width and height of the images, in pixels
+    camera : dict
+        The camera parameters, see OffscreenRenderer
+
+    Returns
+    -------
+    images : list of (height, width, 3) uint8 arrays
+        The images, in the order of indices
+    """
+    renderer = worker_renderer(frames_directory, size, camera)
+    return [
+        renderer.rgb(read_frame(
+            os.path.join(frames_directory, frame_file_name(index)),
+            renderer.topology.mesh))
+        for index in indices]
+
+
+def export_video(frames_directory, num_frames, path, start=0, stop=None,
+                 step=1, size=DEFAULT_IMAGE_SIZE, camera=None,
+                 frame_rate=DEFAULT_FRAME_RATE, codec=DEFAULT_CODEC,
+                 ffmpeg=None, max_workers=None, progress_callback=None,
+                 renderer=render_rgb_frames):
+    """ Renders frames of a calculation to a video file
+
+    Parameters
+    ----------
+    frames_directory : str
+        The directory of the frames, as written by FrameWriter
+    num_frames : int
+        The number of frames of the calculation
+    path : str
+        The path of the video file
+    start, stop, step : int
+        The range of the frames of the video, see frame_indices
+    size : tuple
+        The width and height of the video, in pixels. They must be even.
+    camera : dict
+        The camera parameters, as returned by camera_parameters. If None,
+        the camera is fitted to the bounds of the mesh.
+    frame_rate : int
+        The number of frames per second of the video
+    codec : str
+        The ffmpeg video codec
+    ffmpeg : str
+        The path of the ffmpeg binary. If None, it is found by find_ffmpeg.
+    max_workers : int
+        The maximum number of worker processes. It is capped at the
+        number of cores, which is also the default.
+    progress_callback : function
+        Called with the number of encoded frames and the number of frames
+        of the video after each chunk of frames
+    renderer : callable
+        The function rendering a chunk of frames, with the signature of
+        render_rgb_frames. It must be importable by the worker processes.
+
+    Returns
+    -------
+    num_encoded : int
+        The number of frames of the video
+
+    Raises
+    ------
+    ValueError
+        If the range has no frame, or the size is odd
+    RuntimeError
+        If ffmpeg is not found or failed
+    """
+    indices = frame_indices(num_frames, start, stop, step)
+    if len(indices) == 0:
+        raise ValueError('There are no frames to export')
+    chunks = collections.deque(
+        indices[first:first + VIDEO_CHUNK_SIZE]
+        for first in xrange(0, len(indices), VIDEO_CHUNK_SIZE))
+
+    num_cores = multiprocessing.cpu_count()
+    num_workers = min(max_workers or num_cores, num_cores, len(chunks))
+
+    # The workers are fresh interpreters started without the file
+    # descriptors of the parent, so that the standard input of ffmpeg is
+    # only open in this process, and closing it ends the video.
+    encoder = VideoEncoder(path, size, frame_rate, codec, ffmpeg)
+    log.info('Encoding %d frames on %d processes', len(indices), num_workers)
+    in_flight = collections.deque()
+    with WorkerPool(max(num_workers, 1)) as executor:
+        try:
+            while chunks or in_flight:
+                while chunks and len(in_flight) < (
+                        num_workers * CHUNKS_PER_WORKER):
+                    in_flight.append(executor.submit(
+                        renderer, frames_directory, chunks.popleft(), size,
+                        camera))
+
+                for image in in_flight.popleft().result():
+                    encoder.write(image)
+                if progress_callback is not None:
+                    progress_callback(encoder.num_frames, len(indices))
+        except Exception:
+            for future in in_flight:
+                future.cancel()
+            encoder.abort()
+            raise
+
+    encoder.close()
+    return encoder.num_frames
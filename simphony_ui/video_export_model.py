@@ -0,0 +1,51 @@
+from traits.api import HasStrictTraits, Int
+from traitsui.api import View, Item, VGroup, HGroup
+
+from simphony_ui.image_export import DEFAULT_IMAGE_SIZE
+from simphony_ui.local_traits import PositiveInt
+from simphony_ui.video_export import DEFAULT_FRAME_RATE
+
+
+class VideoExportModel(HasStrictTraits):
+    """ The model of the video export parameters """
+
+    #: The first frame of the video.
+    first_frame = Int(0)
+
+    #: The last frame of the video. Negative values count from the last
+    #: frame of the calculation, -1 being the last frame.
+    last_frame = Int(-1)
+
+    #: The stride between the frames of the video.
+    stride = PositiveInt(1)
+
+    #: The number of frames per second of the video.
+    frame_rate = PositiveInt(DEFAULT_FRAME_RATE)
+
+    #: The size of the video, in pixels. They must be even.
+    width = PositiveInt(DEFAULT_IMAGE_SIZE[0])
+    height = PositiveInt(DEFAULT_IMAGE_SIZE[1])
+
+    traits_view = View(
+        VGroup(
+            HGroup(
+                Item(name='first_frame', label='First frame'),
+                Item(name='last_frame', label='Last frame'),
+                Item(name='stride'),
+            ),
+            Item(name='frame_rate', label='Frames per second'),
+            HGroup(
+                Item(name='width'),
+                Item(name='height'),
+            ),
+            show_border=True
+        )
+    )
+
+    def frame_range(self):
+        """ The start, stop and step of the frames of the video, as
+        arguments of export_video """
+        stop = self.last_frame + 1
+        if stop == 0:
+            stop = None
+        return self.first_frame, stop, self.stride
@@ -0,0 +1,319 @@
+""" Conversion of frame snapshots to the VTK datasets shown by the UI.
+
+The TVTK and simphony_mayavi modules are heavy to import, so they are
+imported by the functions using them.
+"""
+import numpy as np
+
+#: The VTK cell type of the cells, by number of points. Cells with other
+#: numbers of points are convex point sets.
+VTK_CELL_TYPES = {
+    4: 10,  # VTK_TETRA
+    5: 14,  # VTK_PYRAMID
+    6: 13,  # VTK_WEDGE
+    8: 12,  # VTK_HEXAHEDRON
+}
+
+#: The VTK cell type of the cells with no entry in VTK_CELL_TYPES
+VTK_CONVEX_POINT_SET = 41
+
+#: The names of the VTK data arrays of the cell data, by name in CELL_DATA
+CELL_ARRAY_NAMES = {
+    'velocity': 'VELOCITY',
+    'pressure': 'PRESSURE',
+}
+
+#: The VTK point data arrays of the particles, with the field of
+#: ParticleArrays holding their values
+PARTICLE_ARRAYS = (
+    ('VELOCITY', 'velocities'),
+    ('RADIUS', 'radii'),
+)
+
+
+def cell_array_ids(point_counts, connectivity):
+    """ The flat VTK cell array of the cells of a mesh, each cell being
+    given by its number of points followed by its point ids
+
+    Parameters
+    ----------
+    point_counts : (ncells,) int array
+        The number of points of each cell
+    connectivity : (ncells, max_points_per_cell) int array
+        The point ids of each cell, padded after the last point
+
+    Returns
+    -------
+    ids : int array
+        The cell array
+    """
+    point_counts = np.asarray(point_counts)
+    columns = np.arange(connectivity.shape[1])
+    mask = np.column_stack([
+        np.ones(len(point_counts), dtype=bool),
+        columns < point_counts[:, np.newaxis]])
+    return np.column_stack([point_counts, connectivity])[mask]
+
+
+class MeshTopology(object):
+    """ The VTK grid of the topology of a mesh. It is built once and shared
+    by the frames of a calculation, whose grids only add their cell data
+    arrays to a shallow copy of it.
+    """
+
+    def __init__(self, mesh):
+        #: The MeshArrays of the topology
+        self.mesh = mesh
+
+        self._data_set = None
+
+    @property
+    def data_set(self):
+        """ The tvtk.UnstructuredGrid of the topology, without data. It is
+        built on first access.
+        """
+        if self._data_set is None:
+            from tvtk.api import tvtk
+
+            point_counts = np.asarray(self.mesh.point_counts)
+            cell_types = np.array(
+                [VTK_CELL_TYPES.get(count, VTK_CONVEX_POINT_SET)
+                 for count in point_counts], dtype=np.uint8)
+            offsets = np.cumsum(point_counts + 1) - (point_counts + 1)
+
+            cells = tvtk.CellArray()
+            cells.set_cells(
+                len(point_counts),
+                cell_array_ids(point_counts, self.mesh.connectivity))
+
+            data_set = tvtk.UnstructuredGrid(points=self.mesh.points)
+            data_set.set_cells(cell_types, offsets, cells)
+            self._data_set = data_set
+
+        return self._data_set
+
+    def frame_data_set(self, cell_data):
+        """ Builds the grid of a frame, sharing the points and cells of the
+        topology
+
+        Parameters
+        ----------
+        cell_data : dict
+            The arrays of cell data of the frame, in the row order of the
+            mesh, by name in CELL_DATA
+
+        Returns
+        -------
+        data_set : tvtk.UnstructuredGrid
+            The grid, with a cell data array per entry of cell_data
+        """
+        from tvtk.api import tvtk
+
+        data_set = tvtk.UnstructuredGrid()
+        data_set.shallow_copy(self.data_set)
+
+        for name, values in cell_data.items():
+            index = data_set.cell_data.add_array(values)
+            data_set.cell_data.get_array(index).name = CELL_ARRAY_NAMES[name]
+
+        return data_set
+
+
+def mesh_data_set(mesh, cell_data):
+    """ Builds a VTK unstructured grid from a mesh topology and its cell
+    data
+
+    Parameters
+    ----------
+    mesh : MeshArrays
+        The mesh topology
+    cell_data : dict
+        The arrays of cell data, in the row order of mesh, by name in
+        CELL_DATA
+
+    Returns
+    -------
+    data_set : tvtk.UnstructuredGrid
+        The grid, with a cell data array per entry of cell_data
+    """
+    return MeshTopology(mesh).frame_data_set(cell_data)
+
+
+def particles_data_set(particles):
+    """ Builds a VTK poly data of vertices from the arrays of a particles
+    dataset
+
+    Parameters
+    ----------
+    particles : ParticleArrays
+        The arrays of the particles
+
+    Returns
+    -------
+    data_set : tvtk.PolyData
+        The poly data, with VELOCITY and RADIUS point data arrays
+    """
+    from tvtk.api import tvtk
+
+    num_particles = len(particles.coordinates)
+    verts = tvtk.CellArray()
+    verts.set_cells(
+        num_particles,
+        np.column_stack([
+            np.ones(num_particles, dtype=int),
+            np.arange(num_particles)]).ravel())
+
+    data_set = tvtk.PolyData(points=particles.coordinates, verts=verts)
+    for name, field in PARTICLE_ARRAYS:
+        index = data_set.point_data.add_array(getattr(particles, field))
+        data_set.point_data.get_array(index).name = name
+
+    return data_set
+
+
+def update_cell_arrays(data_set, cell_data):
+    """ Replaces in place the cell data arrays of a grid built by
+    MeshTopology.frame_data_set, keeping its points and cells
+
+    Parameters
+    ----------
+    data_set : tvtk.UnstructuredGrid
+        The grid to update
+    cell_data : dict
+        The arrays of cell data of the new frame, in the row order of the
+        mesh, by name in CELL_DATA. The arrays of the grid missing from
+        cell_data are removed.
+    """
+    for name, array_name in CELL_ARRAY_NAMES.items():
+        array = data_set.cell_data.get_array(array_name)
+        if name not in cell_data:
+            if array is not None:
+                data_set.cell_data.remove_array(array_name)
+        elif array is None:
+            index = data_set.cell_data.add_array(cell_data[name])
+            data_set.cell_data.get_array(index).name = array_name
+        else:
+            array.from_array(cell_data[name])
+    data_set.modified()
+
+
+def update_particle_arrays(data_set, particles):
+    """ Replaces in place the coordinates and point data arrays of a poly
+    data built by particles_data_set, keeping its vertices
+
+    Parameters
+    ----------
+    data_set : tvtk.PolyData
+        The poly data to update
+    particles : ParticleArrays
+        The arrays of the particles. They must hold as many particles as
+        the poly data.
+
+    Raises
+    ------
+    ValueError
+        If the number of particles changed
+    """
+    if len(particles.coordinates) != data_set.number_of_points:
+        raise ValueError(
+            'Expected {} particles, not {}'.format(
+                data_set.number_of_points, len(particles.coordinates)))
+
+    data_set.points.from_array(particles.coordinates)
+    for name, field in PARTICLE_ARRAYS:
+        data_set.point_data.get_array(name).from_array(
+            getattr(particles, field))
+    data_set.modified()
+
+
+def share_cell_arrays(data_set, source):
+    """ Replaces the cell data arrays of a grid by the arrays of another
+    grid of the same topology, without copying their values
+
+    Parameters
+    ----------
+    data_set : tvtk.UnstructuredGrid
+        The grid to update
+    source : tvtk.UnstructuredGrid
+        The grid holding the arrays of the new frame
+    """
+    data_set.cell_data.shallow_copy(source.cell_data)
+    data_set.modified()
+
+
+def share_particle_arrays(data_set, source):
+    """ Replaces the coordinates, vertices and point data arrays of a poly
+    data by those of another poly data, without copying their values
+
+    Parameters
+    ----------
+    data_set : tvtk.PolyData
+        The poly data to update
+    source : tvtk.PolyData
+        The poly data of the new frame. It must hold as many particles as
+        data_set.
+
+    Raises
+    ------
+    ValueError
+        If the number of particles changed
+    """
+    if source.number_of_points != data_set.number_of_points:
+        raise ValueError(
+            'Expected {} particles, not {}'.format(
+                data_set.number_of_points, source.number_of_points))
+
+    data_set.shallow_copy(source)
+    data_set.modified()
+
+
+def particles_to_vtk(name, particles):
+    """ Converts the arrays of a particles dataset to a CUDS VTK
+    particles dataset
+
+    Parameters
+    ----------
+    name : str
+        The name of the dataset
+    particles : ParticleArrays
+        The arrays of the particles
+
+    Returns
+    -------
+    particles : VTKParticles
+        The particles dataset
+    """
+    from simphony_mayavi.cuds.vtk_particles import VTKParticles
+
+    return VTKParticles.from_dataset(name, particles_data_set(particles))
+
+
+def snapshot_to_vtk(snapshot, topology=None):
+    """ Converts a frame snapshot to the CUDS VTK datasets shown by the UI
+
+    Parameters
+    ----------
+    snapshot : FrameSnapshot
+        The snapshot to convert
+    topology : MeshTopology
+        The topology of the mesh of the snapshot, shared with the other
+        frames of the calculation. If None, a topology is built for the
+        snapshot.
+
+    Returns
+    -------
+    frame : tuple
+        The VTKMesh of the mesh, and the VTKParticles of the flow and
+        wall particles
+    """
+    from simphony_mayavi.cuds.vtk_mesh import VTKMesh
+
+    if topology is None:
+        topology = MeshTopology(snapshot.mesh)
+
+    return (
+        VTKMesh.from_dataset(
+            'mesh', topology.frame_data_set(snapshot.cell_data)),
+        particles_to_vtk('flow_particles', snapshot.particles['flow']),
+        particles_to_vtk('wall_particles', snapshot.particles['wall']),
+    )
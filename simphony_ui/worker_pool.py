@@ -0,0 +1,192 @@
+""" A pool of worker processes started as fresh interpreters.
+
+multiprocessing can only fork on Python 2.7. A forked child only gets a
+copy of the calling thread, so that the locks held by the other threads
+of the parent stay locked in the child, and it inherits the GUI state
+and the open file descriptors of the parent. Forking the user interface,
+with its Qt and VTK threads, can therefore deadlock the workers.
+
+The workers of WorkerPool are new Python interpreters running this
+module, without any file descriptor of the parent other than their
+standard streams. Each worker reads pickled tasks from its standard
+input and writes their pickled results to its standard output. The
+functions of the tasks must be importable by the workers: they are sent
+by reference and the workers use the sys.path of the parent.
+"""
+import cPickle as pickle
+import logging
+import os
+import subprocess
+import sys
+import threading
+import traceback
+import Queue
+
+log = logging.getLogger(__name__)
+
+
+class WorkerError(RuntimeError):
+    """ Raised for the tasks of a worker process which stopped, or whose
+    result could not be sent back.
+    """
+
+
+class WorkerPool(object):
+    """ Runs functions in a pool of worker processes, with the submit and
+    shutdown interface of a concurrent.futures executor.
+    """
+
+    def __init__(self, max_workers):
+        """
+        Parameters
+        ----------
+        max_workers : int
+            The number of worker processes
+        """
+        self._tasks = Queue.Queue()
+        self._processes = []
+        self._threads = []
+
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join(sys.path)
+        for _ in range(max_workers):
+            # The file descriptors of the parent, such as the pipes of
+            # other child processes, must not be inherited
+            process = subprocess.Popen(
+                [sys.executable, '-m', __name__],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                close_fds=True, env=env)
+            thread = threading.Thread(
+                target=self._feed, args=(process,), name='WorkerFeeder')
+            thread.daemon = True
+            thread.start()
+            self._processes.append(process)
+            self._threads.append(thread)
+
+    def submit(self, function, *args):
+        """ Schedules a function call in a worker process
+
+        Parameters
+        ----------
+        function : callable
+            The function, which must be importable by the workers
+        args
+            The picklable arguments of the function
+
+        Returns
+        -------
+        future : concurrent.futures.Future
+            The future of the result of the call
+        """
+        from concurrent import futures
+
+        future = futures.Future()
+        self._tasks.put((future, function, args))
+        return future
+
+    def shutdown(self):
+        """ Waits for the submitted tasks and stops the worker processes """
+        for _ in self._threads:
+            self._tasks.put(None)
+        for thread in self._threads:
+            thread.join()
+        for process in self._processes:
+            process.wait()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        return False
+
+    def _feed(self, process):
+        """ Sends the tasks to a worker process and sets their results.
+        This function is run by one thread per worker.
+        """
+        stopped = False
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                break
+            future, function, args = task
+            if not future.set_running_or_notify_cancel():
+                continue
+            if stopped:
+                future.set_exception(WorkerError(
+                    'The worker process stopped with exit code {}'.format(
+                        process.returncode)))
+                continue
+
+            try:
+                data = pickle.dumps((function, args), pickle.HIGHEST_PROTOCOL)
+            except Exception as error:
+                future.set_exception(error)
+                continue
+
+            try:
+                process.stdin.write(data)
+                process.stdin.flush()
+                succeeded, result = pickle.load(process.stdout)
+            except Exception:
+                # The worker stopped, or its output can no longer be read
+                log.exception('Lost the worker process %d', process.pid)
+                if process.poll() is None:
+                    process.kill()
+                process.wait()
+                stopped = True
+                future.set_exception(WorkerError(
+                    'The worker process stopped with exit code {}'.format(
+                        process.returncode)))
+            else:
+                if succeeded:
+                    future.set_result(result)
+                else:
+                    future.set_exception(result)
+
+        if not stopped:
+            process.stdin.close()
+
+
+def serve(tasks, results):
+    """ Runs the tasks read from a stream until its end, writing their
+    results to another stream. This function is run by the worker
+    processes.
+    """
+    while True:
+        try:
+            function, args = pickle.load(tasks)
+        except EOFError:
+            return
+        try:
+            reply = (True, function(*args))
+        except Exception as error:
+            traceback.print_exc()
+            reply = (False, error)
+        try:
+            data = pickle.dumps(reply, pickle.HIGHEST_PROTOCOL)
+        except Exception as error:
+            data = pickle.dumps(
+                (False, WorkerError(
+                    'Unable to send the result of {}: {}'.format(
+                        function.__name__, error))),
+                pickle.HIGHEST_PROTOCOL)
+        results.write(data)
+        results.flush()
+
+
+def main():
+    """ The entry point of the worker processes. The results are written
+    to the original standard output, and the output of the tasks goes to
+    the standard error.
+    """
+    results = os.fdopen(os.dup(sys.stdout.fileno()), 'wb')
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    serve(sys.stdin, results)
+
+
+if __name__ == '__main__':
+    # The module is imported again under its name, so that the pickled
+    # exceptions refer to simphony_ui.worker_pool and not to __main__
+    from simphony_ui import worker_pool
+    worker_pool.main()